@@ -4,17 +4,30 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import time
-import collections
 
-# Import route blueprints
-from routes.market import market_routes
-from routes.news import news_routes
-from routes.portfolio import portfolio_routes
-from routes.llm import llm_routes
-from routes.chat import chat_routes
+# Import route blueprints (timed for the startup report). The chat blueprint
+# defers its LangChain/LangGraph imports until the first chat request.
+from utils.startup import timed_import, finish_startup, startup_report
+market_routes = timed_import('routes.market').market_routes
+news_routes = timed_import('routes.news').news_routes
+portfolio_routes = timed_import('routes.portfolio').portfolio_routes
+llm_routes = timed_import('routes.llm').llm_routes
+chat_routes = timed_import('routes.chat').chat_routes
+stream_routes = timed_import('routes.stream').stream_routes
+alert_routes = timed_import('routes.alerts').alert_routes
+admin_routes = timed_import('routes.admin').admin_routes
 
 # Import configuration
-from utils.config import CORS_ORIGINS
+from utils.config import (
+    CORS_ORIGINS, MAX_LOGS, CHAT_WARMUP,
+    PRICE_INGEST_INTERVAL, FEAR_GREED_SYNC_INTERVAL, NEWS_INGEST_INTERVAL,
+    NEWS_EMBEDDINGS_ENABLED, NEWS_SENTIMENT_ENABLED, PUSH_INTERVAL, TICK_INTERVAL, ALERTS_INTERVAL,
+    PORTFOLIO_SNAPSHOT_INTERVAL
+)
+from utils.background import register_job, start_jobs
+from utils.log_buffer import LogRingBuffer, MemoryLogHandler, parse_cursor, parse_level
+from utils import http, profiling
+from utils.admission import Overloaded
 
 # --- Basic Setup ---
 load_dotenv()
@@ -25,22 +38,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 # --- In-memory Log Storage ---
-log_buffer = collections.deque(maxlen=100)  # Store last 100 logs
-
-# Custom log handler to store logs in memory
-class MemoryLogHandler(logging.Handler):
-    def emit(self, record):
-        log_entry = {
-            "timestamp": int(time.time()),
-            "level": record.levelno,
-            "level_name": record.levelname,
-            "name": record.name,
-            "message": self.format(record)
-        }
-        log_buffer.append(log_entry)
+log_buffer = LogRingBuffer(capacity=MAX_LOGS)  # Store last MAX_LOGS records, formatted on read
 
 # Add memory handler to root logger
-memory_handler = MemoryLogHandler()
+memory_handler = MemoryLogHandler(log_buffer)
 memory_handler.setLevel(logging.INFO)
 logging.getLogger().addHandler(memory_handler)
 
@@ -64,6 +65,14 @@ metrics = {
     "last_updated": int(time.time())
 }
 
+# --- Response Encoding ---
+# orjson serialization, gzip/brotli compression and ETag revalidation for every blueprint
+http.init_app(app)
+
+# --- Request Profiling ---
+# Sampled and slow requests, managed through /api/admin/profiling
+profiling.init_app(app)
+
 # --- CORS Configuration ---
 CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}})
 
@@ -73,6 +82,76 @@ app.register_blueprint(news_routes, url_prefix='/api/news')
 app.register_blueprint(portfolio_routes, url_prefix='/api/portfolio')
 app.register_blueprint(llm_routes, url_prefix='/api/llm')
 app.register_blueprint(chat_routes, url_prefix='/api/chat')
+app.register_blueprint(stream_routes, url_prefix='/api/stream')
+app.register_blueprint(alert_routes, url_prefix='/api/alerts')
+app.register_blueprint(admin_routes, url_prefix='/api/admin')
+
+# --- Optional Warm-up ---
+# Load the heavy chat dependencies now instead of on the first chat request.
+# With gunicorn's preload_app this happens once in the master process.
+if CHAT_WARMUP:
+    try:
+        from routes.chat import warm_up
+        warm_up()
+    except Exception as e:
+        logger.error(f"Chat warm-up failed: {e}")
+
+# --- Background Jobs ---
+# Under gunicorn the jobs are started in each worker after the fork (see
+# gunicorn.conf.py); jobs that must run once per host elect a leader worker.
+def _ingest_prices():
+    from services.price_ingest import run_ingestion
+    run_ingestion()
+
+def _sync_fear_greed():
+    from services.fear_greed_store import fear_greed_store
+    fear_greed_store.sync()
+
+def _ingest_news():
+    from services.news_index import ingest_news
+    ingest_news()
+    if NEWS_EMBEDDINGS_ENABLED:
+        from services.news_embeddings import news_embeddings
+        news_embeddings.embed_pending()
+    if NEWS_SENTIMENT_ENABLED:
+        from services.news_sentiment import news_sentiment
+        news_sentiment.score_pending()
+
+def _produce_updates():
+    from services.live_updates import produce_updates
+    produce_updates()
+
+def _relay_updates():
+    from utils.push import broadcaster
+    broadcaster.relay()
+
+def _refresh_ticks():
+    from services.tick_table import tick_table
+    tick_table.refresh()
+
+def _check_alerts():
+    from services.alerts import check_alerts
+    check_alerts()
+
+def _snapshot_portfolios():
+    from services.portfolio_store import snapshot_portfolios
+    snapshot_portfolios()
+
+register_job("price_ingest", _ingest_prices, PRICE_INGEST_INTERVAL)
+register_job("fear_greed_sync", _sync_fear_greed, FEAR_GREED_SYNC_INTERVAL)
+register_job("news_ingest", _ingest_news, NEWS_INGEST_INTERVAL)
+# One producer per host publishes changes; every worker relays them to its streams
+register_job("push_producer", _produce_updates, PUSH_INTERVAL)
+register_job("push_relay", _relay_updates, 1 if PUSH_INTERVAL > 0 else 0, leader=False)
+# Each worker keeps its own tick table; identical batches share one upstream call
+register_job("tick_refresh", _refresh_ticks, TICK_INTERVAL, leader=False)
+register_job("alert_check", _check_alerts, ALERTS_INTERVAL)
+register_job("portfolio_snapshot", _snapshot_portfolios, PORTFOLIO_SNAPSHOT_INTERVAL)
+
+if not os.environ.get('DEFER_BACKGROUND_JOBS'):
+    start_jobs()
+
+finish_startup()
 
 # --- Root Endpoint ---
 @app.route('/')
@@ -86,19 +165,88 @@ def index():
 def get_metrics():
     """Get application metrics"""
     try:
-        from routes.llm import metrics as llm_metrics
-        # Merge metrics from llm.py if available
-        return jsonify(llm_metrics)
+        from routes.llm import get_metrics_snapshot
+        # Metrics from llm.py are shared across worker processes
+        return jsonify(get_metrics_snapshot())
     except ImportError:
         # Fallback to global metrics
         return jsonify(metrics)
 
+# --- Startup Report Endpoint ---
+@app.route('/api/startup', methods=['GET'])
+def get_startup_report():
+    """Get the import cost breakdown recorded while the app started"""
+    return jsonify(startup_report)
+
 # --- Logs Endpoint ---
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
-    """Get recent application logs"""
-    # Convert to list for JSON serialization
-    return jsonify({"logs": list(log_buffer)})
+    """
+    Get recent application logs
+
+    Query parameters:
+        since: Sequence cursor, only logs newer than this are returned
+            ('pid:seq,pid:seq' with one cursor per worker)
+        level: Minimum level, as a name (WARNING) or number (30)
+        name: Logger name prefix (e.g. 'routes.chat')
+        limit: Maximum number of entries to return
+    """
+    try:
+        since = parse_cursor(request.args.get('since'), os.getpid())
+        limit = request.args.get('limit', type=int)
+        level = parse_level(request.args.get('level'))
+        logs, last_seq = log_buffer.query(
+            since=since,
+            level=level,
+            name=request.args.get('name'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Logs are kept per worker process; report which worker answered (the cursor is per worker)
+    return jsonify({"logs": logs, "next_since": last_seq, "capacity": log_buffer.capacity, "worker": os.getpid()})
+
+# --- Traces Endpoint ---
+@app.route('/api/traces', methods=['GET'])
+def get_traces():
+    """
+    Get recent request traces (newest first)
+
+    Query parameters:
+        name: Root span name prefix (e.g. 'chat.ask')
+        min_ms: Only traces at least this slow
+        limit: Maximum number of traces to return
+    """
+    from utils.tracing import trace_store
+    try:
+        min_ms = request.args.get('min_ms', type=float)
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            raise ValueError(f"Invalid limit: {limit} (must be 0 or more)")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    traces = trace_store.query(name=request.args.get('name'), min_ms=min_ms, limit=limit)
+    return jsonify({"traces": traces, "capacity": trace_store.capacity})
+
+@app.route('/api/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """
+    Get the spans of one trace
+
+    Query parameters:
+        format: 'json' (default), or 'otlp' for an OpenTelemetry OTLP/JSON
+            document (Jaeger, Tempo, OpenTelemetry collectors)
+    """
+    from utils.tracing import trace_store, to_otlp
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'otlp'):
+        return jsonify({"error": f"Unknown format: {fmt} (available: ['json', 'otlp'])"}), 400
+
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        return jsonify({"error": f"Trace {trace_id} not found"}), 404
+    return jsonify(to_otlp([trace]) if fmt == 'otlp' else trace)
 
 # --- Error Handlers ---
 @app.errorhandler(404)
@@ -106,6 +254,11 @@ def not_found(error):
     logger.info(f"404 error: {request.path}")
     return jsonify({"error": "Endpoint not found"}), 404
 
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    logger.warning(f"429 rejected: {error}")
+    return jsonify({"error": str(error), "retry_after": error.retry_after}), 429, {"Retry-After": str(error.retry_after)}
+
 @app.errorhandler(500)
 def server_error(error):
     logger.error(f"500 error: {error}")
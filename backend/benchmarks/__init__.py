@@ -0,0 +1 @@
+# Offline benchmark suite (stub upstream server + load runner)
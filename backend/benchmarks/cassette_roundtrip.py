@@ -0,0 +1,84 @@
+"""
+Record-then-replay check of the upstream cassette
+
+Runs the backend in record mode against the stub upstream, stops the stub,
+then runs it in replay mode the way the benchmark runner does (the
+configured upstream URLs are kept, only the dummy keys are added) and
+checks every route answers with the recorded payloads:
+
+    python -m benchmarks.cassette_roundtrip
+
+Exits with 1 when a route differs or fails in replay.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import requests
+
+from benchmarks.run_benchmarks import ROUTES, start_backend
+from benchmarks.stub_upstream import StubConfig, start_stub_server, upstream_env
+
+# Routes served from upstream payloads (metrics and logs are local)
+DEFAULT_ROUTES = ["market.fear_greed", "market.index", "news.crypto", "news.world",
+                  "news.summarize", "news.sentiment", "portfolio"]
+
+def fetch_all(base_url, route_names):
+    routes = {route[0]: route[1:] for route in ROUTES}
+    responses = {}
+    for name in route_names:
+        method, path, body = routes[name]
+        response = requests.request(method, f"{base_url}{path}", json=body, timeout=60)
+        responses[name] = (response.status_code, response.json())
+    return responses
+
+def stop(process):
+    process.terminate()
+    process.wait(timeout=30)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record upstream responses from the stub, then replay them")
+    parser.add_argument("--routes", default=",".join(DEFAULT_ROUTES), help="Comma-separated routes to check")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    args = parser.parse_args(argv)
+    route_names = [name.strip() for name in args.routes.split(",") if name.strip()]
+
+    cassette = os.path.join(tempfile.mkdtemp(prefix="cassette-"), "upstream.cassette")
+    stub = start_stub_server(StubConfig(seed=0))
+    # The stub URLs stand in for the production URLs a cassette is recorded against
+    urls = {key: value for key, value in upstream_env(stub.base_url).items() if key.endswith(("_URL", "_ENDPOINT"))}
+    try:
+        backend, base_url = start_backend(stub.base_url, args.server, extra_env={
+            "UPSTREAM_MODE": "record", "UPSTREAM_CASSETTE": cassette,
+        })
+        try:
+            recorded = fetch_all(base_url, route_names)
+        finally:
+            stop(backend)
+    finally:
+        stub.shutdown()
+
+    # The stub is down: anything not served from the cassette fails
+    backend, base_url = start_backend(None, args.server, extra_env=dict(urls, **{
+        "UPSTREAM_MODE": "replay", "UPSTREAM_CASSETTE": cassette,
+    }))
+    try:
+        replayed = fetch_all(base_url, route_names)
+    finally:
+        stop(backend)
+
+    failures = []
+    for name in route_names:
+        status, body = replayed[name]
+        ok = recorded[name][0] == 200 and status == 200 and body == recorded[name][1]
+        print(f"{name:<20} recorded={recorded[name][0]} replayed={status} {'ok' if ok else 'MISMATCH'}")
+        if not ok:
+            failures.append(name)
+    if failures:
+        print(f"\nReplay differs from the recording for: {', '.join(failures)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
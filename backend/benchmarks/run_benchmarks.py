@@ -0,0 +1,291 @@
+"""
+Offline throughput/latency benchmark for the /api/* routes
+
+Starts the stub upstream server, launches the backend in a subprocess pointed
+at it (Flask dev server or gunicorn), drives each route at the requested
+concurrency levels and writes a JSON report:
+
+    python -m benchmarks.run_benchmarks --concurrency 1,8,32 --requests 200 --output bench.json
+    python -m benchmarks.run_benchmarks --output new.json --compare bench.json
+    python -m benchmarks.run_benchmarks --replay cassettes/upstream.cassette
+
+No network access or API keys are needed. Replay keeps the configured
+upstream URLs (the ones the cassette was recorded against), so recorded
+requests match; python -m benchmarks.cassette_roundtrip checks this.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_upstream import UPSTREAM_KEYS, add_stub_arguments, config_from_args, start_stub_server, upstream_env
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_ADDRESS = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+SAMPLE_TEXT = ("Bitcoin rallied above its previous high as spot ETF inflows continued, "
+               "while analysts warned that funding rates signal an overheated market. ") * 8
+
+# (name, method, path, json body)
+ROUTES = [
+    ("market.fear_greed", "GET", "/api/market/fear-greed", None),
+    ("market.index", "GET", "/api/market/index", None),
+    ("news.crypto", "GET", "/api/news/crypto", None),
+    ("news.world", "GET", "/api/news/world", None),
+    ("news.summarize", "POST", "/api/news/summarize", {"text": SAMPLE_TEXT}),
+    ("news.sentiment", "POST", "/api/news/sentiment/analyze", {"text": SAMPLE_TEXT}),
+    ("llm.sentiment", "POST", "/api/llm/sentiment/analyze", {"text": SAMPLE_TEXT}),
+    ("portfolio", "GET", f"/api/portfolio/{SAMPLE_ADDRESS}", None),
+    ("metrics", "GET", "/api/metrics", None),
+    ("logs", "GET", "/api/logs", None),
+    # Needs the LangChain dependencies installed; enable with --routes chat.ask
+    ("chat.ask", "POST", "/api/chat/ask", {"question": "How is the crypto market doing today?"}),
+]
+DEFAULT_ROUTES = [route[0] for route in ROUTES if route[0] != "chat.ask"]
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_backend(stub_url, server="flask", workers=2, cache_ttl=0, extra_env=None):
+    """
+    Launch the backend in a subprocess and wait until it answers
+
+    Without stub_url the configured upstream URLs are kept (replay mode:
+    cassette keys include the URLs they were recorded from).
+    """
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(upstream_env(stub_url) if stub_url else UPSTREAM_KEYS)
+    # Every store lives in a per-run directory: stub payloads must never reach backend/data
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    env.update({
+        "PORT": str(port),
+        "RESPONSE_CACHE_TTL": str(cache_ttl),
+        "WEB_CONCURRENCY": str(workers),
+        "SHARED_STATE_PATH": os.path.join(data_dir, "state.db"),
+        "PRICE_STORE_DIR": os.path.join(data_dir, "prices"),
+        "FEAR_GREED_STORE_PATH": os.path.join(data_dir, "fear_greed.bin"),
+        "NEWS_DB_PATH": os.path.join(data_dir, "news.db"),
+        "NEWS_EMBEDDINGS_DIR": os.path.join(data_dir, "news_embeddings"),
+        "CHAT_CACHE_PATH": os.path.join(data_dir, "chat_cache.db"),
+        "ALERTS_DB_PATH": os.path.join(data_dir, "alerts.db"),
+        "PORTFOLIO_STORE_DIR": os.path.join(data_dir, "portfolios"),
+        # Background jobs and caches would skew the measured routes (and
+        # the embedding model would be downloaded)
+        "PRICE_INGEST_INTERVAL": "0",
+        "FEAR_GREED_SYNC_INTERVAL": "0",
+        "NEWS_INGEST_INTERVAL": "0",
+        "ALERTS_INTERVAL": "0",
+        "PORTFOLIO_SNAPSHOT_INTERVAL": "0",
+        "NEWS_EMBEDDINGS_ENABLED": "false",
+        "CHAT_CACHE_ENABLED": "false",
+    })
+    env.update(extra_env or {})
+
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    else:
+        command = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--with-threads"]
+
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited during startup with code {process.returncode}")
+        try:
+            requests.get(f"{base_url}/", timeout=1)
+            return process, base_url
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 60s")
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_load(base_url, method, path, body, concurrency, total_requests, timeout=60):
+    """Send total_requests requests with the given concurrency and collect latencies"""
+    local = threading.local()
+    latencies = []
+    errors = 0
+    status_counts = {}
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.request(method, f"{base_url}{path}", json=body, timeout=timeout)
+            status = response.status_code
+            _ = response.content
+        except requests.exceptions.RequestException:
+            status = "exception"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+            if status == "exception" or status >= 400:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total_requests)))
+    wall_seconds = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "status_counts": status_counts,
+        "duration_s": round(wall_seconds, 3),
+        "rps": round(total_requests / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+def run_suite(base_url, route_names, concurrency_levels, total_requests, warmup_requests=5):
+    results = []
+    routes = {route[0]: route for route in ROUTES}
+    for name in route_names:
+        _, method, path, body = routes[name]
+        if warmup_requests:
+            run_load(base_url, method, path, body, 1, warmup_requests)
+        for concurrency in concurrency_levels:
+            result = run_load(base_url, method, path, body, concurrency, total_requests)
+            result.update({"route": name, "method": method, "path": path, "concurrency": concurrency})
+            results.append(result)
+            print(f"{name:<20} c={concurrency:<4} {result['rps']:>9.1f} req/s  "
+                  f"p50={result['latency_ms']['p50']:>8.1f}ms  p99={result['latency_ms']['p99']:>8.1f}ms  "
+                  f"errors={result['errors']}", flush=True)
+    return results
+
+def compare_reports(baseline, current, threshold=0.10):
+    """
+    Compare two reports route by route
+
+    Returns:
+        List of regression descriptions (throughput drop or p99 increase
+        larger than threshold)
+    """
+    regressions = []
+    baseline_index = {(r["route"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\n{'route':<20} {'c':>4} {'rps old':>10} {'rps new':>10} {'delta':>8} {'p99 old':>10} {'p99 new':>10} {'delta':>8}")
+    for result in current["results"]:
+        key = (result["route"], result["concurrency"])
+        old = baseline_index.get(key)
+        if not old:
+            continue
+        rps_delta = (result["rps"] - old["rps"]) / old["rps"] if old["rps"] else 0.0
+        old_p99 = old["latency_ms"]["p99"]
+        p99_delta = (result["latency_ms"]["p99"] - old_p99) / old_p99 if old_p99 else 0.0
+        print(f"{key[0]:<20} {key[1]:>4} {old['rps']:>10.1f} {result['rps']:>10.1f} {rps_delta:>+8.1%} "
+              f"{old_p99:>10.1f} {result['latency_ms']['p99']:>10.1f} {p99_delta:>+8.1%}")
+        if rps_delta < -threshold or p99_delta > threshold:
+            regressions.append(f"{key[0]} (c={key[1]}): rps {rps_delta:+.1%}, p99 {p99_delta:+.1%}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backend against a local stub upstream")
+    parser.add_argument("--routes", default=",".join(DEFAULT_ROUTES),
+                        help=f"Comma-separated routes to run (available: {', '.join(r[0] for r in ROUTES)})")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and concurrency level")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--cache-ttl", type=int, default=0, help="RESPONSE_CACHE_TTL for the backend (0 disables)")
+    parser.add_argument("--replay", default=None, metavar="CASSETTE",
+                        help="Serve upstream calls from a recorded cassette instead of the stub")
+    parser.add_argument("--base-url", default=None, help="Benchmark an already running backend instead")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold for --compare")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    route_names = [name.strip() for name in args.routes.split(",") if name.strip()]
+    known = {route[0] for route in ROUTES}
+    unknown = [name for name in route_names if name not in known]
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(unknown)}")
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    stub_config = config_from_args(args)
+    stub = start_stub_server(stub_config)
+    backend = None
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            extra_env = {"UPSTREAM_MODE": "replay", "UPSTREAM_CASSETTE": os.path.abspath(args.replay)} if args.replay else None
+            stub_url = None if args.replay else stub.base_url
+            backend, base_url = start_backend(stub_url, args.server, args.workers, args.cache_ttl, extra_env)
+        results = run_suite(base_url, route_names, concurrency_levels, args.requests)
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=30)
+        stub.shutdown()
+
+    report = {
+        "meta": {
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "server": "external" if args.base_url else args.server,
+            "workers": args.workers,
+            "cache_ttl": args.cache_ttl,
+            "replay": args.replay,
+            "stub": {
+                "latency_ms": stub_config.latency_ms,
+                "jitter_ms": stub_config.jitter_ms,
+                "error_rate": stub_config.error_rate,
+                "upstream_latency": stub_config.upstream_latency,
+                "request_counts": stub_config.request_counts,
+            },
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
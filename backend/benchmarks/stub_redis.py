@@ -0,0 +1,128 @@
+"""
+Local stand-in for a Redis server
+
+Speaks enough of the Redis protocol (RESP) for the cache backend: PING,
+AUTH, SELECT, GET, SET (EX/PX/NX), DEL, DBSIZE and FLUSHDB, with key
+expiry. Lets the networked cache tier be tested and benchmarked (e.g. with
+several backends sharing it) without a real Redis:
+
+    python -m benchmarks.stub_redis --port 6390
+"""
+import argparse
+import logging
+import socketserver
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class StubRedisStore:
+    """Keys shared by all connections, with optional expiry"""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        command = args[0].upper()
+        now = time.time()
+        with self.lock:
+            self.commands += 1
+            if command == b"PING":
+                return b"+PONG\r\n"
+            if command in (b"AUTH", b"SELECT"):
+                return b"+OK\r\n"
+            if command == b"GET":
+                entry = self._live(args[1], now)
+                return encode_bulk(None if entry is None else entry[0])
+            if command == b"SET":
+                key, value, expires_at, only_new = args[1], args[2], None, False
+                options = [a.upper() for a in args[3:]]
+                for i, option in enumerate(options):
+                    if option == b"EX":
+                        expires_at = now + int(args[4 + i])
+                    elif option == b"PX":
+                        expires_at = now + int(args[4 + i]) / 1000
+                    elif option == b"NX":
+                        only_new = True
+                if only_new and self._live(key, now) is not None:
+                    return encode_bulk(None)
+                self.data[key] = (value, expires_at)
+                return b"+OK\r\n"
+            if command == b"DEL":
+                removed = sum(1 for key in args[1:] if self._live(key, now) is not None and self.data.pop(key))
+                return b":%d\r\n" % removed
+            if command == b"DBSIZE":
+                return b":%d\r\n" % sum(1 for key in list(self.data) if self._live(key, now) is not None)
+            if command == b"FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+        return b"-ERR unknown command '" + command + b"'\r\n"
+
+def encode_bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class StubRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                # Inline command (e.g. from telnet)
+                args = line.split()
+            else:
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2])
+            if args:
+                self.wfile.write(self.server.store.execute(args))
+
+class StubRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address):
+        super().__init__(address, StubRedisHandler)
+        self.store = StubRedisStore()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+def start_stub_redis(host="127.0.0.1", port=0):
+    """Start the stub Redis server in a background thread and return it"""
+    server = StubRedisServer((host, port))
+    thread = threading.Thread(target=server.serve_forever, name="stub-redis", daemon=True)
+    thread.start()
+    logger.info(f"Stub Redis server listening on {server.url}")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Redis server for the cache backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    server = StubRedisServer((args.host, args.port))
+    logger.info(f"Stub Redis server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Local stand-in for the third-party APIs used by the backend
+
+Serves canned CoinGecko, Etherscan, Cryptopanic, NewsAPI, FMP, alternative.me
+and Hugging Face inference responses under a path prefix per upstream, with
+configurable latency and error injection. Used by the benchmark runner, and
+can be started on its own:
+
+    python -m benchmarks.stub_upstream --port 8999 --latency-ms 50 --error-rate 0.01
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Path prefix of each upstream on the stub server
+UPSTREAMS = ["coingecko", "etherscan", "cryptopanic", "newsapi", "fmp", "feargreed", "hf"]
+
+# Dummy keys so the routes don't short-circuit on missing configuration
+UPSTREAM_KEYS = {
+    "ETHERSCAN_API_KEY": "stub",
+    "HUGGINGFACE_API_KEY": "stub",
+    "CRYPTOPANIC_API_KEY": "stub",
+    "FMP_API_KEY": "stub",
+    "NEWSAPI_API_KEY": "stub",
+}
+
+def upstream_env(base_url):
+    """Environment variables pointing the backend at a stub server"""
+    return {
+        "COINGECKO_API_URL": f"{base_url}/coingecko",
+        "ETHERSCAN_API_URL": f"{base_url}/etherscan/api",
+        "CRYPTOPANIC_API_URL": f"{base_url}/cryptopanic",
+        "NEWSAPI_URL": f"{base_url}/newsapi",
+        "FMP_API_URL": f"{base_url}/fmp",
+        "FEAR_GREED_API_URL": f"{base_url}/feargreed/fng/",
+        "HUGGINGFACE_INFERENCE_API_URL": f"{base_url}/hf/models/",
+        "HF_INFERENCE_ENDPOINT": f"{base_url}/hf",
+        **UPSTREAM_KEYS,
+    }
+
+class StubConfig:
+    """Latency and error injection settings, shared by all handler threads"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, upstream_latency=None,
+                 articles=50, token_transfers=100, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.upstream_latency = upstream_latency or {}
+        self.articles = articles
+        self.token_transfers = token_transfers
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_counts = {name: 0 for name in UPSTREAMS}
+
+    def delay_for(self, upstream):
+        base = self.upstream_latency.get(upstream, self.latency_ms)
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, base + jitter) / 1000
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def count(self, upstream):
+        with self.lock:
+            self.request_counts[upstream] = self.request_counts.get(upstream, 0) + 1
+
+# --- Canned payloads ---
+_SUBJECTS = ["Bitcoin", "Ethereum", "Solana", "Regulators", "Central banks", "Exchanges", "Miners", "Stablecoin issuers",
+             "Investors", "Lawmakers", "DeFi protocols", "Asset managers", "Developers"]
+_ACTIONS = ["rally after", "slide on", "brace for", "react to", "shrug off", "weigh", "push back against", "bet on",
+            "scramble over", "cheer"]
+_TOPICS = ["ETF inflows", "a surprise rate decision", "record trading volume", "new custody rules", "a major hack",
+           "the halving", "tariff headlines", "quarterly earnings", "a network upgrade", "liquidity worries", "an audit"]
+
+def headline(i):
+    """Distinct, deterministic headline; every 5th one re-reports the previous story"""
+    story = i - 1 if i % 5 == 4 else i
+    title = f"{_SUBJECTS[story % 13]} {_ACTIONS[(story // 13) % 10]} {_TOPICS[(story * 7) % 11]} (story {story})"
+    return f"Report: {title}" if story != i else title
+
+def _coingecko(path, query, config):
+    if path.startswith("/simple/price"):
+        ids = query.get("ids", ["ethereum"])[0].split(",")
+        currencies = query.get("vs_currencies", ["usd"])[0].split(",")
+        return {coin_id: {currency: round(100 + (zlib.crc32(coin_id.encode()) % 5000) / 3, 2) for currency in currencies} for coin_id in ids}
+    if path.startswith("/coins/") and path.endswith("/market_chart"):
+        days = float(query.get("days", ["1"])[0])
+        step = 300 if days <= 1 else 3600 if days <= 90 else 86400
+        now = int(time.time()) // step * step
+        points = int(days * 86400 // step)
+        prices = [[(now - i * step) * 1000, 100 + (i % 97) * 0.5] for i in range(points, -1, -1)]
+        volumes = [[t, 1e9 + (i % 13) * 1e7] for i, (t, _) in enumerate(prices)]
+        return {"prices": prices, "market_caps": [], "total_volumes": volumes}
+    return {"error": "not found"}, 404
+
+def _etherscan(path, query, config):
+    action = query.get("action", [""])[0]
+    if action == "balance":
+        return {"status": "1", "message": "OK", "result": "12345678900000000000"}
+    if action == "tokentx":
+        address = query.get("address", ["0x0"])[0]
+        result = [{
+            "blockNumber": str(19000000 - i),
+            "timeStamp": str(1700000000 - i * 60),
+            "hash": f"0x{i:064x}",
+            "from": address,
+            "to": f"0x{i:040x}",
+            "contractAddress": f"0x{(i % 20):040x}",
+            "value": str(10 ** 18 * (i + 1)),
+            "tokenName": f"Token {i % 20}",
+            "tokenSymbol": f"TK{i % 20}",
+            "tokenDecimal": "18",
+        } for i in range(config.token_transfers)]
+        return {"status": "1", "message": "OK", "result": result}
+    return {"status": "0", "message": "NOTOK", "result": "Unknown action"}
+
+def _cryptopanic(path, query, config):
+    count = int(query.get("posts_per_page", [config.articles])[0])
+    codes = ["BTC", "ETH", "SOL", "XRP", "ADA"]
+    results = [{
+        "id": i,
+        "kind": "news",
+        "title": headline(i),
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - i * 300)),
+        "url": f"https://example.com/crypto/{i}",
+        "source": {"title": f"Outlet {i % 7}", "domain": f"outlet{i % 7}.example.com"},
+        "currencies": [{"code": codes[i % len(codes)], "title": codes[i % len(codes)]}],
+    } for i in range(count)]
+    return {"count": len(results), "next": None, "previous": None, "results": results}
+
+def _newsapi(path, query, config):
+    count = int(query.get("pageSize", [config.articles])[0])
+    articles = [{
+        "source": {"id": None, "name": f"Paper {i % 5}"},
+        "author": f"Author {i}",
+        "title": headline(i + 1000),
+        "description": f"Coverage of how {headline(i + 1000).lower()} is playing out.",
+        "url": f"https://example.com/world/{i}",
+        "urlToImage": None,
+        "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - i * 600)),
+        "content": ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20).strip(),
+    } for i in range(count)]
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+def _fmp(path, query, config):
+    if path.startswith("/quote/"):
+        symbols = path[len("/quote/"):].split(",")
+        return [{
+            "symbol": symbol,
+            "name": f"{symbol} Inc.",
+            "price": 150.0 + len(symbol),
+            "changesPercentage": 0.42,
+            "change": 0.63,
+            "dayLow": 148.1,
+            "dayHigh": 151.9,
+            "yearHigh": 199.6,
+            "yearLow": 124.2,
+            "marketCap": 2400000000000,
+            "timestamp": int(time.time()),
+        } for symbol in symbols if symbol]
+    return {"Error Message": "not found"}, 404
+
+def _feargreed(path, query, config):
+    limit = int(query.get("limit", ["1"])[0] or 1)
+    limit = limit if limit > 0 else 2000
+    now = int(time.time()) // 86400 * 86400
+    labels = [(25, "Extreme Fear"), (45, "Fear"), (55, "Neutral"), (75, "Greed"), (100, "Extreme Greed")]
+    data = [{
+        "value": str(20 + (i * 37) % 60),
+        "value_classification": next(label for limit, label in labels if 20 + (i * 37) % 60 <= limit),
+        "timestamp": str(now - i * 86400),
+        "time_until_update": "3600",
+    } for i in range(limit)]
+    return {"name": "Fear and Greed Index", "data": data, "metadata": {"error": None}}
+
+def _hf(path, query, config, body=None):
+    model_id = path[len("/models/"):] if path.startswith("/models/") else path.lstrip("/")
+    model_lower = model_id.lower()
+    if any(name in model_lower for name in ("bart", "pegasus")):
+        return [{"summary_text": "Stub summary of the provided text."}]
+    if any(name in model_lower for name in ("sentiment", "sst-2", "bertweet", "roberta")):
+        inputs = (body or {}).get("inputs") if isinstance(body, dict) else None
+        texts = inputs if isinstance(inputs, list) else [inputs or ""]
+        results = []
+        for text in texts:
+            # Deterministic per-text score so batched and single calls agree
+            positive = 0.05 + 0.9 * ((zlib.crc32(str(text).encode("utf-8")) % 1000) / 999)
+            results.append([{"label": "POSITIVE", "score": positive}, {"label": "NEGATIVE", "score": 1 - positive}])
+        return results
+    return [{"generated_text": "Stub answer from the language model."}]
+
+HANDLERS = {
+    "coingecko": _coingecko,
+    "etherscan": _etherscan,
+    "cryptopanic": _cryptopanic,
+    "newsapi": _newsapi,
+    "fmp": _fmp,
+    "feargreed": _feargreed,
+    "hf": _hf,
+}
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StubUpstream/1.0"
+
+    def log_message(self, format, *args):
+        # Keep the benchmark output clean
+        pass
+
+    def _dispatch(self, body=None):
+        parsed = urlparse(self.path)
+        parts = parsed.path.split("/", 2)
+        upstream = parts[1] if len(parts) > 1 else ""
+        sub_path = "/" + parts[2] if len(parts) > 2 else "/"
+        handler = HANDLERS.get(upstream)
+        config = self.server.config
+
+        if handler is None:
+            return self._send({"error": f"Unknown upstream: {upstream}"}, 404)
+
+        config.count(upstream)
+        delay = config.delay_for(upstream)
+        if delay:
+            time.sleep(delay)
+        if config.should_fail():
+            return self._send({"error": "Injected upstream failure"}, 503)
+
+        query = parse_qs(parsed.query)
+        result = handler(sub_path, query, config, body) if upstream == "hf" else handler(sub_path, query, config)
+        status = 200
+        if isinstance(result, tuple):
+            result, status = result
+        return self._send(result, status)
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            body = None
+        self._dispatch(body)
+
+class StubUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, StubRequestHandler)
+        self.config = config
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Start the stub server in a background thread and return it"""
+    server = StubUpstreamServer((host, port), config or StubConfig())
+    thread = threading.Thread(target=server.serve_forever, name="stub-upstream", daemon=True)
+    thread.start()
+    logger.info(f"Stub upstream server listening on {server.base_url}")
+    return server
+
+def parse_upstream_latency(values):
+    """Parse repeated 'name=ms' options into a dict"""
+    latency = {}
+    for value in values or []:
+        name, _, ms = value.partition("=")
+        if name not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream '{name}', expected one of {', '.join(UPSTREAMS)}")
+        latency[name] = float(ms)
+    return latency
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Base upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Uniform latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls failing with 503")
+    parser.add_argument("--upstream-latency", action="append", metavar="NAME=MS",
+                        help=f"Per-upstream latency override ({', '.join(UPSTREAMS)})")
+    parser.add_argument("--articles", type=int, default=50, help="Articles per news page")
+    parser.add_argument("--token-transfers", type=int, default=100, help="Transfers per tokentx page")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for jitter and errors")
+
+def config_from_args(args):
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        upstream_latency=parse_upstream_latency(args.upstream_latency),
+        articles=args.articles,
+        token_transfers=args.token_transfers,
+        seed=args.seed,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stub upstream server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    add_stub_arguments(parser)
+    cli_args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stub = StubUpstreamServer((cli_args.host, cli_args.port), config_from_args(cli_args))
+    for key, value in upstream_env(stub.base_url).items():
+        print(f"{key}={value}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
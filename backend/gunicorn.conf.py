@@ -0,0 +1,37 @@
+# Gunicorn configuration for the production (multi-worker) mode
+import multiprocessing
+import os
+
+# Background jobs must not start in the preloaded master (threads don't
+# survive fork); they are started in post_fork instead
+os.environ["DEFER_BACKGROUND_JOBS"] = "1"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3001)}"
+
+# One process per core by default; each worker also runs a few threads so slow
+# upstream/LLM calls don't block the whole process. Every open push stream
+# (/api/stream) holds a thread, up to PUSH_MAX_CLIENTS per worker.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) + int(os.environ.get('PUSH_MAX_CLIENTS', 8))
+
+# Load the app once in the master and fork workers from it
+preload_app = True
+
+# Chat requests can run several LLM/tool round trips
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    """Start each deployment with fresh shared metrics, model selection and caches"""
+    from utils.shared_state import shared_store
+    shared_store.reset()
+
+def post_fork(server, worker):
+    server.log.info(f"Worker spawned (pid: {worker.pid})")
+    from utils.background import start_jobs
+    start_jobs()
@@ -0,0 +1,81 @@
+from flask import Blueprint, Response, jsonify, request
+import hmac
+import logging
+from utils.config import ADMIN_TOKEN
+from utils.profiling import profiler, collapsed_stacks
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+admin_routes = Blueprint('admin', __name__)
+
+@admin_routes.before_request
+def require_admin():
+    """Reject requests without the admin token (every admin endpoint)"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin API disabled (set ADMIN_TOKEN)"}), 403
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        logger.warning(f"Rejected admin request to {request.path}")
+        return jsonify({"error": "Invalid or missing X-Admin-Token"}), 401
+
+@admin_routes.route('/profiling', methods=['GET'])
+def get_profiling():
+    """Profiling settings and the stored profiles, newest first"""
+    try:
+        return jsonify({"settings": profiler.current_settings(), "profiles": profiler.list()})
+    except Exception as e:
+        logger.error(f"Error listing profiles: {e}")
+        return jsonify({"error": "Failed to list profiles", "details": str(e)}), 500
+
+@admin_routes.route('/profiling', methods=['PUT'])
+def configure_profiling():
+    """
+    Change the profiling settings of every worker
+
+    JSON body (all optional):
+        enabled: Turn request profiling on or off
+        sample_rate: Fraction of requests profiled and kept (0 to 1)
+        slow_ms: Requests slower than this are kept (0 disables)
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    try:
+        settings = profiler.configure(data.get('enabled'), data.get('sample_rate'), data.get('slow_ms'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info(f"Profiling settings changed: {settings}")
+    return jsonify({"settings": settings})
+
+@admin_routes.route('/profiling', methods=['DELETE'])
+def clear_profiles():
+    """Remove every stored profile"""
+    profiler.clear()
+    return jsonify({"success": True})
+
+@admin_routes.route('/profiling/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Download a stored profile
+
+    Query parameters:
+        format: 'collapsed' (default): one 'frame;frame;frame count' line per
+            stack, for flamegraph.pl, speedscope or inferno; 'json': the
+            request summary with the stacks
+    """
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in ('collapsed', 'json'):
+        return jsonify({"error": f"Unknown format: {fmt} (available: ['collapsed', 'json'])"}), 400
+
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile {profile_id} not found"}), 404
+    if fmt == 'json':
+        return jsonify(profile)
+    return Response(
+        collapsed_stacks(profile), mimetype='text/plain',
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
@@ -0,0 +1,93 @@
+from flask import Blueprint, jsonify, request
+import logging
+import re
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+alert_routes = Blueprint('alerts', __name__)
+
+_COIN_ID_RE = re.compile(r"[a-z0-9][a-z0-9-]{0,63}")
+_STOCK_SYMBOL_RE = re.compile(r"[A-Z0-9^][A-Z0-9.^-]{0,15}")
+_CURRENCY_RE = re.compile(r"[A-Za-z0-9]{1,16}")
+
+@alert_routes.route('', methods=['GET'])
+def list_alerts():
+    """
+    List registered alerts
+
+    Query parameters:
+        active: 'true' for alerts still waiting to fire, 'false' for finished ones
+    """
+    from services.alerts import alert_engine
+
+    active = request.args.get('active')
+    try:
+        alerts = alert_engine.list(None if active is None else active.lower() in ('1', 'true', 'yes'))
+        return jsonify({"alerts": alerts})
+    except Exception as e:
+        logger.error(f"Error listing alerts: {e}")
+        return jsonify({"error": "Failed to list alerts", "details": str(e)}), 500
+
+@alert_routes.route('', methods=['POST'])
+def create_alert():
+    """
+    Register a threshold alert
+
+    JSON body:
+        kind: price, fear_greed or sentiment
+        asset: CoinGecko id (bitcoin) or stock symbol (AAPL) for price
+            alerts, currency code (BTC) for sentiment alerts
+        direction: above or below
+        threshold: Value to compare with (sentiment is in [-1, 1])
+        repeat: Fire again each time the value crosses back and returns (default false)
+        webhook: Optional public http(s) URL receiving a POST when the alert fires
+        note: Optional text sent with the alert
+
+    Fired alerts are also pushed on /api/stream (topic `alerts`).
+    """
+    from services.alerts import alert_engine
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    kind = data.get('kind')
+    asset = data.get('asset')
+    if data.get('threshold') is None or not data.get('direction'):
+        return jsonify({"error": "Missing 'direction' or 'threshold' field"}), 400
+    if kind == "price" and asset and not (_COIN_ID_RE.fullmatch(asset) or _STOCK_SYMBOL_RE.fullmatch(asset)):
+        return jsonify({"error": f"Invalid asset: {asset} (use a CoinGecko id or an upper-case stock symbol)"}), 400
+    if kind == "sentiment" and asset and not _CURRENCY_RE.fullmatch(asset):
+        return jsonify({"error": f"Invalid currency code: {asset}"}), 400
+
+    try:
+        alert = alert_engine.create(
+            kind, data['direction'], data['threshold'], asset=asset,
+            webhook=data.get('webhook'), note=data.get('note'), repeat=bool(data.get('repeat'))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating alert: {e}")
+        return jsonify({"error": "Failed to create alert", "details": str(e)}), 500
+
+    if kind == "price":
+        # Start refreshing the asset's price right away
+        from services.tick_table import tick_table
+        tick_table.lookup(*([[], [asset]] if asset.isupper() else [[asset], []]))
+    return jsonify(alert), 201
+
+@alert_routes.route('/<int:alert_id>', methods=['DELETE'])
+def delete_alert(alert_id):
+    """Remove an alert"""
+    from services.alerts import alert_engine
+
+    try:
+        if not alert_engine.delete(alert_id):
+            return jsonify({"error": f"Alert {alert_id} not found"}), 404
+        return jsonify({"success": True})
+    except Exception as e:
+        logger.error(f"Error deleting alert: {e}")
+        return jsonify({"error": "Failed to delete alert", "details": str(e)}), 500
@@ -1,19 +1,20 @@
 from flask import Blueprint, jsonify, request
 import logging
+import threading
 import time
+from contextlib import nullcontext
 from utils.config import HUGGINGFACE_API_KEY, CHAT_MODEL, CHAT_MODELS
-from langchain_huggingface import HuggingFaceEndpoint
 from typing import Annotated, List, TypedDict, Dict, Any
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
-from langchain_core.tools import tool
-from langchain_community.tools import DuckDuckGoSearchRun
-from langgraph.graph import END, StateGraph, START
-from langgraph.graph.message import add_messages
 from utils.api_client import make_request
+from utils.shared_state import shared_store
 from utils.config import (
     CRYPTOPANIC_API_KEY, CRYPTOPANIC_API_URL,
-    FMP_API_KEY, FMP_API_URL
+    FMP_API_KEY, FMP_API_URL, RESPONSE_CACHE_TTL, NEWS_INGEST_INTERVAL,
+    CHAT_CACHE_ENABLED, CHAT_CACHE_DEFAULT_TTL, CHAT_PRELOAD_MODELS, TRACING_ENABLED
 )
+from services.model_pool import ModelPool
+from utils.admission import admit, Overloaded
+from utils.tracing import span, start_trace, current_span
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -21,20 +22,78 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 chat_routes = Blueprint('chat', __name__)
 
-# Current model cache
-current_model = {
-    "id": CHAT_MODEL,
-    "instance": None
-}
+# The selected model id is kept in the shared store so every worker serves
+# the same default model; instances live in the per-process model pool
+CURRENT_MODEL_KEY = "chat:current_model"
+
+def get_current_model_id() -> str:
+    """Get the chat model id currently selected across all workers"""
+    try:
+        return shared_store.get(CURRENT_MODEL_KEY, CHAT_MODEL)
+    except Exception as e:
+        logger.error(f"Error reading selected chat model: {e}")
+        return CHAT_MODEL
+
+def set_current_model_id(model_id: str):
+    """Select the chat model for all workers"""
+    try:
+        shared_store.set(CURRENT_MODEL_KEY, model_id)
+    except Exception as e:
+        logger.error(f"Error storing selected chat model: {e}")
+
+# --- Lazy Imports ---
+# LangChain, LangGraph and the HF/DuckDuckGo integrations are slow to import,
+# so they are only loaded on the first chat request (or by warm_up())
+HEAVY_MODULES = [
+    "langchain_core.messages",
+    "langchain_core.tools",
+    "langchain_huggingface",
+    "langchain_community.tools",
+    "langgraph.graph",
+]
+_lazy_lock = threading.Lock()
+_tools = None
+
+def get_tools() -> list:
+    """Get the LangChain tools, importing LangChain on first use"""
+    global _tools
+    if _tools is None:
+        with _lazy_lock:
+            if _tools is None:
+                from langchain_core.tools import tool
+                _tools = [tool(fn) for fn in TOOL_FUNCTIONS]
+    return _tools
+
+def warm_up():
+    """Import the heavy chat dependencies ahead of the first chat request"""
+    from utils.startup import timed_import, record_warmup
+    start_time = time.perf_counter()
+    for module_name in HEAVY_MODULES:
+        timed_import(module_name)
+    get_tools()
+    model_pool.preload(CHAT_PRELOAD_MODELS, **GENERATION_PARAMS)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    record_warmup(elapsed_ms, HEAVY_MODULES)
+    logger.info(f"Chat dependencies warmed up in {elapsed_ms:.0f}ms")
 
 # --- Tool Definitions ---
-@tool
 def search_web(query: str) -> str:
     """Search the web for current information about crypto markets."""
+    from langchain_community.tools import DuckDuckGoSearchRun
     search = DuckDuckGoSearchRun()
     return search.run(query)
 
-@tool
+def search_news_archive(query: str) -> str:
+    """Search the local archive of crypto and financial news and return the most relevant article passages with their sources. Prefer this over search_web for questions about news, events or market sentiment."""
+    logger.info(f"[Tool] Searching news archive for: {query}")
+    try:
+        from services.news_retrieval import build_context
+        context = build_context(query)
+    except Exception as e:
+        logger.error(f"[Tool] News archive search error: {e}")
+        return f"Error searching the news archive: {e}"
+    return context or "No archived news articles match this query."
+
 def get_latest_crypto_news_headlines() -> str:
     """Get the latest cryptocurrency news headlines."""
     logger.info("[Tool] Fetching crypto news...")
@@ -54,7 +113,6 @@ def get_latest_crypto_news_headlines() -> str:
         logger.error(f"[Tool] Crypto news fetch error: {e}")
         return f"Error fetching crypto news: {e}"
 
-@tool
 def get_current_market_index() -> str:
     """Get the current market index value and trend."""
     logger.info("[Tool] Fetching market index...")
@@ -81,28 +139,61 @@ def get_current_market_index() -> str:
         logger.error(f"[Tool] Market data fetch error: {e}")
         return f"Error fetching market data: {e}"
 
-tools = [search_web, get_latest_crypto_news_headlines, get_current_market_index]
+def get_technical_indicators(asset: str) -> str:
+    """Get technical indicators (RSI, MACD, SMA/EMA, Bollinger bands) on hourly bars for a crypto asset, given its CoinGecko id such as 'bitcoin' or 'ethereum'."""
+    logger.info(f"[Tool] Computing indicators for {asset}...")
+    try:
+        from services.indicators import indicator_engine
+        values = indicator_engine.latest(asset.strip().lower(), 3600)
+    except LookupError:
+        return f"No local price history available for {asset}."
+    except Exception as e:
+        logger.error(f"[Tool] Indicator error: {e}")
+        return f"Error computing indicators: {e}"
+    
+    def fmt(value):
+        return "n/a" if value is None else f"{value:,.2f}"
+    
+    return (
+        f"{asset} hourly indicators: price {fmt(values['close'])}, "
+        f"SMA20 {fmt(values['sma'])}, EMA20 {fmt(values['ema'])}, RSI14 {fmt(values['rsi'])}, "
+        f"MACD {fmt(values['macd'])} (signal {fmt(values['macd_signal'])}, histogram {fmt(values['macd_hist'])}), "
+        f"Bollinger bands {fmt(values['bb_lower'])} - {fmt(values['bb_upper'])}."
+    )
+
+# Plain functions, wrapped as LangChain tools by get_tools()
+TOOL_FUNCTIONS = [
+    search_news_archive, search_web, get_latest_crypto_news_headlines,
+    get_current_market_index, get_technical_indicators
+]
+
+# How long (seconds) an answer built on each tool's output stays valid in the
+# chat response cache; an answer expires with the freshest tool it used
+TOOL_FRESHNESS = {
+    "search_news_archive": NEWS_INGEST_INTERVAL or 600,
+    "search_web": 900,
+    "get_latest_crypto_news_headlines": RESPONSE_CACHE_TTL,
+    "get_current_market_index": RESPONSE_CACHE_TTL,
+    "get_technical_indicators": 300,
+}
+
+def answer_ttl(tools_used) -> int:
+    """Cache lifetime of an answer given the tools used to produce it"""
+    return min([TOOL_FRESHNESS.get(name, RESPONSE_CACHE_TTL) for name in tools_used] or [CHAT_CACHE_DEFAULT_TTL])
 
 # --- LangGraph Implementation ---
-class State(TypedDict):
-    """The state of our graph."""
-    messages: Annotated[List, add_messages]
+# Reply used when the LLM call fails (never cached)
+LLM_ERROR_REPLY = "I apologize, but I'm having trouble processing your request right now. Please try again later."
 
-def get_model_instance(model_id: str = None) -> HuggingFaceEndpoint:
-    """Get an instance of the specified model, or use the current one if no ID is provided"""
-    global current_model
-    
-    # If no model_id specified, use the current model
-    if not model_id:
-        model_id = current_model["id"]
-    
-    # If requesting the already instantiated model, return it
-    if model_id == current_model["id"] and current_model["instance"]:
-        return current_model["instance"]
-    
-    # Create new model instance with appropriate configuration
-    logger.info(f"Initializing new chat model: {model_id}")
-    
+# Generation settings shared by every chat model
+GENERATION_PARAMS = {
+    "max_new_tokens": 250,  # Use 250 as maximum for all models to prevent API errors
+    "temperature": 0.7,
+    "top_p": 0.95,
+}
+
+def build_model(model_id: str, **params):
+    """Create a chat model client for the given model id and generation settings"""
     # Get model-specific configuration
     task_type = "text-generation"  # Default task type
     
@@ -128,39 +219,64 @@ def get_model_instance(model_id: str = None) -> HuggingFaceEndpoint:
     logger.info(f"Using task type: {task_type} for model: {model_id}")
     
     # Create model instance
-    model = HuggingFaceEndpoint(
+    from langchain_huggingface import HuggingFaceEndpoint
+    return HuggingFaceEndpoint(
         repo_id=model_id,
         huggingfacehub_api_token=HUGGINGFACE_API_KEY,
-        max_new_tokens=250,  # Use 250 as maximum for all models to prevent API errors
         task=task_type,
-        temperature=0.7,
-        top_p=0.95
+        **params
     )
+
+# Model instances of this process, keyed by model id and generation settings
+model_pool = ModelPool(build_model)
+
+def get_model_instance(model_id: str = None):
+    """Get a pooled instance of the specified model, or of the selected one if no ID is provided"""
+    return model_pool.get(model_id or get_current_model_id(), **GENERATION_PARAMS)
+
+def create_graph(model_id: str = None, trace_parent=None):
+    """
+    Create a new LangGraph with specified LLM model (the selected model if not given).
+
+    Node spans are attached to trace_parent when LangGraph runs them in a
+    thread without the request context.
+    """
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langgraph.graph import END, StateGraph, START
+    from langgraph.graph.message import add_messages
     
-    # Update current model cache
-    current_model["id"] = model_id
-    current_model["instance"] = model
+    class State(TypedDict):
+        """The state of our graph."""
+        messages: Annotated[List, add_messages]
+    
+    tools = get_tools()
     
-    return model
-
-def create_graph(model_id: str = None):
-    """Create a new LangGraph with specified LLM model."""
     # Initialize the state graph
     graph_builder = StateGraph(State)
     
-    # Initialize LLM
-    llm = get_model_instance(model_id)
+    # Resolve the model once, so a concurrent model selection cannot change it mid-request
+    model_id = model_id or get_current_model_id()
     
     # Define chatbot node - processes messages and generates responses
     def chatbot(state):
         messages = state["messages"]
-        try:
-            response = llm.invoke(messages)
-            return {"messages": [response]}
-        except Exception as e:
-            logger.error(f"Error invoking LLM: {e}")
-            # Fallback to simple response
-            return {"messages": [AIMessage(content=f"I apologize, but I'm having trouble processing your request right now. Please try again later.")]}
+        iteration = sum(1 for message in messages if isinstance(message, AIMessage)) + 1
+        with span("chatbot", parent=trace_parent, model=model_id, iteration=iteration) as node:
+            try:
+                # Hold one of the model's concurrency slots for the duration of the call
+                # (time spent waiting for it is the gap before the llm.generate span)
+                with model_pool.lease(model_id, **GENERATION_PARAMS) as llm:
+                    with span("llm.generate", model=model_id, messages=len(messages)):
+                        response = llm.invoke(messages)
+                if node is not None:
+                    node.set(tool_calls=len(getattr(response, "tool_calls", None) or []))
+                return {"messages": [response]}
+            except Exception as e:
+                logger.error(f"Error invoking LLM: {e}")
+                if node is not None:
+                    node.set(fallback=True)
+                # Fallback to simple response
+                return {"messages": [AIMessage(content=LLM_ERROR_REPLY)]}
     
     # Define tools node - handles tool execution
     def tools_executor(state):
@@ -170,46 +286,50 @@ def create_graph(model_id: str = None):
         
         # If the message has tool calls
         if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-            tool_results = []
-            for tool_call in last_message.tool_calls:
-                tool_name = tool_call.name
-                tool_args = tool_call.args if hasattr(tool_call, "args") else {}
-                
-                # Find the matching tool
-                matching_tool = None
-                for tool_fn in tools:
-                    if tool_fn.name == tool_name:
-                        matching_tool = tool_fn
-                        break
-                
-                if matching_tool:
-                    try:
-                        tool_result = matching_tool.invoke(tool_args)
-                        tool_results.append(
-                            ToolMessage(
-                                content=str(tool_result),
-                                name=tool_name
+            with span("tools", parent=trace_parent, calls=len(last_message.tool_calls)):
+                tool_results = []
+                for tool_call in last_message.tool_calls:
+                    tool_name = tool_call.name
+                    tool_args = tool_call.args if hasattr(tool_call, "args") else {}
+                    
+                    # Find the matching tool
+                    matching_tool = None
+                    for tool_fn in tools:
+                        if tool_fn.name == tool_name:
+                            matching_tool = tool_fn
+                            break
+                    
+                    if matching_tool:
+                        try:
+                            with span(f"tool.{tool_name}", args=str(tool_args)[:200]) as tool_span:
+                                tool_result = matching_tool.invoke(tool_args)
+                                if tool_span is not None:
+                                    tool_span.set(result_chars=len(str(tool_result)))
+                            tool_results.append(
+                                ToolMessage(
+                                    content=str(tool_result),
+                                    name=tool_name
+                                )
                             )
-                        )
-                    except Exception as e:
-                        logger.error(f"Error executing tool {tool_name}: {e}")
+                        except Exception as e:
+                            logger.error(f"Error executing tool {tool_name}: {e}")
+                            tool_results.append(
+                                ToolMessage(
+                                    content=f"Error executing {tool_name}: {str(e)}",
+                                    name=tool_name
+                                )
+                            )
+                    else:
+                        # Tool not found
                         tool_results.append(
                             ToolMessage(
-                                content=f"Error executing {tool_name}: {str(e)}",
+                                content=f"Tool '{tool_name}' not found.",
                                 name=tool_name
                             )
                         )
-                else:
-                    # Tool not found
-                    tool_results.append(
-                        ToolMessage(
-                            content=f"Tool '{tool_name}' not found.",
-                            name=tool_name
-                        )
-                    )
+                
+                return {"messages": tool_results}
             
-            return {"messages": tool_results}
-        
         # If no tool calls, return empty message list (no update)
         return {"messages": []}
     
@@ -245,7 +365,7 @@ def create_graph(model_id: str = None):
 def get_chat_models():
     """Get available chat models"""
     try:
-        return jsonify({"models": CHAT_MODELS, "current": current_model["id"]})
+        return jsonify({"models": CHAT_MODELS, "current": get_current_model_id(), "pool": model_pool.stats()})
     except Exception as e:
         logger.error(f"Error retrieving chat models: {e}")
         return jsonify({"error": "Failed to retrieve chat models"}), 500
@@ -273,28 +393,49 @@ def select_chat_model():
         return jsonify({"error": f"Invalid model_id: {model_id}"}), 400
     
     try:
-        # Update the current model
-        global current_model
-        current_model["id"] = model_id
-        current_model["instance"] = None  # Clear instance to force recreation
-        
-        # Initialize the model to validate it works
+        # Initialize the model to validate it works (reused if already pooled)
         get_model_instance(model_id)
         
+        # Update the selected model
+        set_current_model_id(model_id)
+        
         return jsonify({"success": True, "model_id": model_id})
     except Exception as e:
         logger.error(f"Error selecting chat model: {e}")
         return jsonify({"error": f"Failed to select chat model: {str(e)}"}), 500
 
+@chat_routes.route('/cache', methods=['GET'])
+def get_chat_cache_stats():
+    """Get chat response cache statistics (hit rate, latency saved)"""
+    try:
+        from services.chat_cache import chat_cache
+        return jsonify(dict(chat_cache.stats(), enabled=CHAT_CACHE_ENABLED))
+    except Exception as e:
+        logger.error(f"Error retrieving chat cache stats: {e}")
+        return jsonify({"error": "Failed to retrieve chat cache stats"}), 500
+
 @chat_routes.route('/ask', methods=['POST'])
 def ask_question():
-    """Process a question using LangGraph"""
+    """
+    Process a question using LangGraph
+
+    JSON body:
+        question: The question
+        model_id: Optional chat model (default the selected one)
+        cache: false to skip the answer cache
+        trace: true to return the request trace (LangGraph nodes, tools,
+            upstream calls) with the answer
+
+    Traces are also kept for /api/traces when TRACING_ENABLED.
+    """
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
     
     data = request.get_json()
     question = data.get('question')
     model_id = data.get('model_id')  # Optional - use specified model or default if not provided
+    use_cache = CHAT_CACHE_ENABLED and data.get('cache', True) is not False
+    want_trace = data.get('trace') is True
     
     if not question:
         return jsonify({"error": "Missing 'question' field"}), 400
@@ -305,9 +446,27 @@ def ask_question():
         logger.error("Hugging Face API key not configured")
         return jsonify({"error": "Hugging Face API key not configured"}), 500
     
+    trace_context = start_trace("chat.ask", question_chars=len(question)) if TRACING_ENABLED or want_trace else nullcontext()
+    with trace_context as trace:
+        body, status = answer_question(question, model_id, use_cache)
+        if trace is not None:
+            trace.root.set(model=body.get("model"), cached=body.get("cached"), status=status)
+            if status >= 500:
+                trace.root.error = body.get("error")
+    
+    if trace is None:
+        return jsonify(body), status
+    if want_trace:
+        body["trace"] = trace.to_dict()
+    return jsonify(body), status, {"X-Trace-Id": trace.trace_id}
+
+def answer_question(question, model_id, use_cache):
+    """Answer a chat question; returns the response body and status (raises Overloaded)"""
     start_time = time.time()
     
     try:
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+        
         # Validate model_id if provided
         if model_id:
             valid_model = False
@@ -320,8 +479,42 @@ def ask_question():
                 logger.warning(f"Invalid model_id requested: {model_id}, using default")
                 model_id = CHAT_MODEL
         
-        # Create a graph with the selected model
-        graph = create_graph(model_id)
+        # Serve the whole request with one model, even if another is selected meanwhile
+        model_id = model_id or get_current_model_id()
+        
+        # Reuse a recent answer to a similar question when one is cached
+        if use_cache:
+            try:
+                from services.chat_cache import chat_cache
+                with span("chat_cache.lookup") as lookup:
+                    hit = chat_cache.lookup(question, model_id)
+                    if lookup is not None:
+                        lookup.set(hit=hit is not None)
+            except Exception as e:
+                logger.error(f"Chat cache lookup failed: {e}")
+                hit = None
+            if hit:
+                execution_time = time.time() - start_time
+                logger.info(f"Chat answer served from cache (similarity {hit['similarity']}) in {execution_time:.3f}s")
+                return {
+                    "answer": hit["answer"],
+                    "execution_time": f"{execution_time:.2f}s",
+                    "model": model_id,
+                    "cached": True,
+                    "cache": {
+                        "question": hit["question"],
+                        "similarity": hit["similarity"],
+                        "age_s": hit["age_s"],
+                        "tools": hit["tools"],
+                        "latency_saved_s": round(max(hit["execution_time"] - execution_time, 0), 2),
+                    }
+                }, 200
+        
+        # Create a graph with the selected model (node spans join the request span,
+        # not graph.build which has ended by the time the graph runs)
+        request_span = current_span()
+        with span("graph.build", model=model_id):
+            graph = create_graph(model_id, trace_parent=request_span)
         
         # Create initial state with system message and user question
         initial_state = {
@@ -331,8 +524,10 @@ def ask_question():
             ]
         }
         
-        # Execute the graph
-        result = graph.invoke(initial_state)
+        # Execute the graph (cache hits above don't take a chat slot)
+        with admit("chat"):
+            with span("graph.invoke", model=model_id):
+                result = graph.invoke(initial_state)
         execution_time = time.time() - start_time
         
         logger.info(f"Chat response generated in {execution_time:.2f}s")
@@ -354,14 +549,30 @@ def ask_question():
             # If metrics function is not available, just log it
             logger.info("Metrics tracking not available for chat")
         
+        # Cache the answer for as long as the data from its tools stays fresh
+        # (not when a tool failed: the answer is built from its error message)
+        tool_messages = [message for message in messages if isinstance(message, ToolMessage)]
+        tools_used = {message.name for message in tool_messages}
+        tool_failed = any(str(message.content).startswith("Error") for message in tool_messages)
+        if use_cache and not tool_failed and response and response != LLM_ERROR_REPLY and response != "No response generated.":
+            try:
+                from services.chat_cache import chat_cache
+                chat_cache.store(question, model_id, response, tools_used, execution_time, answer_ttl(tools_used))
+            except Exception as e:
+                logger.error(f"Chat cache store failed: {e}")
+        
         result = {
             "answer": response,
             "execution_time": f"{execution_time:.2f}s",
-            "model": current_model["id"]
+            "model": model_id,
+            "cached": False
         }
         
-        return jsonify(result)
+        return result, 200
     
+    except Overloaded:
+        # Answered with 429 by the app error handler
+        raise
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Error in chat agent: {e}")
@@ -377,14 +588,12 @@ def ask_question():
         elif "task" in error_msg.lower() and "support" in error_msg.lower():
             user_error = "There was an issue with the selected model. The system will fall back to a recommended model."
             # Try to use a different model
-            current_model_id = current_model["id"]  # Save current
             try:
-                current_model["id"] = "meta-llama/Meta-Llama-3-8B-Instruct"  # Default fallback to Llama 3
-                current_model["instance"] = None
+                if model_id:
+                    model_pool.evict(model_id)
+                set_current_model_id("meta-llama/Meta-Llama-3-8B-Instruct")  # Default fallback to Llama 3
             except Exception as model_err:
                 logger.error(f"Error while setting fallback model: {model_err}")
-                # Restore original
-                current_model["id"] = current_model_id
         
         # Update error metrics
         try:
@@ -393,9 +602,9 @@ def ask_question():
         except ImportError:
             logger.info("Error metrics tracking not available for chat")
             
-        return jsonify({
+        return {
             "error": f"Failed to process question: {str(e)}",
             "answer": f"{user_error} Technical details: {error_msg[:100]}...",
             "execution_time": f"{execution_time:.2f}s",
-            "model": current_model["id"]
-        }), 500
\ No newline at end of file
+            "model": model_id or get_current_model_id()
+        }, 500
\ No newline at end of file
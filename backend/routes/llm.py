@@ -1,13 +1,18 @@
 from flask import Blueprint, jsonify, request
+import copy
 import logging
 import time
 from utils.config import (
     AVAILABLE_MODELS,
     HUGGINGFACE_API_KEY,
+    HUGGINGFACE_INFERENCE_API_URL,
     SENTIMENT_MODELS,
     SUMMARIZATION_MODELS
 )
+from utils.admission import admitted, admission_metrics
 from utils.api_client import make_request
+from utils.cache import cache
+from utils.shared_state import shared_store
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -15,7 +20,9 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 llm_routes = Blueprint('llm', __name__)
 
-# Simple in-memory metrics storage
+# Initial metrics values; live metrics are kept in the shared store so that
+# every worker process reports the same numbers
+METRICS_KEY = "metrics:llm"
 metrics = {
     "sentiment": {
         "calls": 0,
@@ -38,31 +45,49 @@ metrics = {
     "last_updated": int(time.time())
 }
 
+def get_metrics_snapshot():
+    """Return the current LLM metrics shared by all workers, with admission queue and cache statistics"""
+    try:
+        snapshot = shared_store.get(METRICS_KEY) or copy.deepcopy(metrics)
+    except Exception as e:
+        logger.error(f"Error reading shared metrics: {e}")
+        snapshot = copy.deepcopy(metrics)
+    snapshot["admission"] = admission_metrics()
+    snapshot["cache"] = cache.stats()
+    return snapshot
+
 def update_metrics(operation, duration, error=False):
     """Update metrics for a specific LLM operation"""
-    global metrics
-    
-    # Update call count
-    metrics[operation]["calls"] = metrics[operation].get("calls", 0) + 1
-    
-    # Update success/error count
-    if error:
-        metrics[operation]["failures"] = metrics[operation].get("failures", 0) + 1
-    else:
-        metrics[operation]["success"] = metrics[operation].get("success", 0) + 1
-    
-    # Update average time
-    current_avg = metrics[operation].get("average_time", 0)
-    
-    # Calculate new average
-    if current_avg == 0:
-        metrics[operation]["average_time"] = duration
-    else:
-        # Weighted average favoring recent calls
-        metrics[operation]["average_time"] = (current_avg * 0.7) + (duration * 0.3)
+    def apply(current):
+        op_metrics = current.setdefault(operation, {"calls": 0, "success": 0, "failures": 0, "average_time": 0})
+        
+        # Update call count
+        op_metrics["calls"] = op_metrics.get("calls", 0) + 1
+        
+        # Update success/error count
+        if error:
+            op_metrics["failures"] = op_metrics.get("failures", 0) + 1
+        else:
+            op_metrics["success"] = op_metrics.get("success", 0) + 1
+        
+        # Update average time
+        current_avg = op_metrics.get("average_time", 0)
+        
+        # Calculate new average
+        if current_avg == 0:
+            op_metrics["average_time"] = duration
+        else:
+            # Weighted average favoring recent calls
+            op_metrics["average_time"] = (current_avg * 0.7) + (duration * 0.3)
+        
+        # Update timestamp
+        current["last_updated"] = int(time.time())
+        return current
     
-    # Update timestamp
-    metrics["last_updated"] = int(time.time())
+    try:
+        shared_store.update(METRICS_KEY, apply, default=copy.deepcopy(metrics))
+    except Exception as e:
+        logger.error(f"Error updating shared metrics: {e}")
 
 @llm_routes.route('/models', methods=['GET'])
 def get_available_models():
@@ -86,12 +111,13 @@ def get_available_models():
 def get_metrics():
     """Get LLM usage metrics"""
     try:
-        return jsonify(metrics)
+        return jsonify(get_metrics_snapshot())
     except Exception as e:
         logger.error(f"Error retrieving metrics: {e}")
         return jsonify({"error": "Failed to retrieve metrics"}), 500
 
 @llm_routes.route('/sentiment/analyze', methods=['POST'])
+@admitted("sentiment")
 def analyze_sentiment():
     """Analyzes sentiment of provided text using Hugging Face models"""
     if not request.is_json:
@@ -112,7 +138,7 @@ def analyze_sentiment():
     
     try:
         # Call Hugging Face API for sentiment analysis
-        url = f"https://api-inference.huggingface.co/models/{model_id}"
+        url = f"{HUGGINGFACE_INFERENCE_API_URL}{model_id}"
         headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
         payload = {"inputs": text}
         
@@ -138,6 +164,7 @@ def analyze_sentiment():
             return jsonify({"error": "Failed to analyze sentiment"}), 500
     
     except Exception as e:
+        duration = time.time() - start_time if 'start_time' in locals() else 0
         logger.error(f"Error during sentiment analysis: {e}")
         update_metrics("sentiment", duration, error=True)
         return jsonify({"error": f"Failed to analyze sentiment: {str(e)}"}), 500 
\ No newline at end of file
@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import logging
+import re
+import time
 from utils.api_client import make_request
-from utils.config import FMP_API_KEY, FMP_API_URL
+from utils.config import FMP_API_KEY, FMP_API_URL, FEAR_GREED_API_URL, RESPONSE_CACHE_TTL, MAX_HISTORY_POINTS, TICK_MAX_REQUEST
+from utils.cache import cache
+from utils.http import cached_json
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -9,59 +13,253 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 market_routes = Blueprint('market', __name__)
 
+def fetch_fear_greed():
+    """Latest Fear & Greed value: today's local record when synced, else the live API (cached)"""
+    try:
+        from services.fear_greed_store import fear_greed_store
+        latest = fear_greed_store.latest()
+        if latest and latest["timestamp"] >= int(time.time()) // 86400 * 86400:
+            return {
+                "value": str(latest["value"]),
+                "value_classification": latest["value_classification"],
+                "timestamp": str(latest["timestamp"])
+            }
+    except Exception as e:
+        logger.error(f"Error reading Fear & Greed store: {e}")
+    
+    url = FEAR_GREED_API_URL
+    data = cache.get_or_set("upstream", "market:fear_greed", lambda: make_request(url, params={'limit': 1}), ttl=RESPONSE_CACHE_TTL)
+    if data and 'data' in data and len(data['data']) > 0:
+        return data['data'][0]
+    logger.error(f"Fear & Greed API returned unexpected data format: {data}")
+    raise ValueError("Invalid data format from Fear & Greed API")
+
 @market_routes.route('/fear-greed', methods=['GET'])
 def get_fear_greed():
     """Get the latest Fear & Greed index value"""
     logger.info("Fetching Fear & Greed index...")
-    url = 'https://api.alternative.me/fng/?limit=1'
     try:
-        data = make_request(url)
-        if data and 'data' in data and len(data['data']) > 0:
-            logger.info("Fear & Greed data fetched successfully.")
-            return jsonify(data['data'][0])
-        else:
-            logger.error(f"Fear & Greed API returned unexpected data format: {data}")
-            return jsonify({"error": "Invalid data format from Fear & Greed API"}), 500
+        data = fetch_fear_greed()
+        logger.info("Fear & Greed data fetched successfully.")
+        return jsonify(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         logger.error(f"Error processing Fear & Greed data: {e}")
         return jsonify({"error": "Failed to fetch Fear & Greed data", "details": str(e)}), 500
 
+@market_routes.route('/fear-greed/history', methods=['GET'])
+def get_fear_greed_history():
+    """
+    Get daily Fear & Greed values from the local history
+
+    Query parameters:
+        start, end: Unix seconds (default: the last 90 days)
+        windows: Comma-separated rolling mean windows in days (7, 30, 90, 365)
+    """
+    from services.fear_greed_store import fear_greed_store, ROLLING_WINDOWS
+    
+    try:
+        end = request.args.get('end', type=int) or int(time.time())
+        start = request.args.get('start', type=int) or end - 90 * 86400
+        windows = [int(w) for w in request.args.get('windows', '').split(',') if w.strip()]
+        invalid = [w for w in windows if w not in ROLLING_WINDOWS]
+        if invalid:
+            raise ValueError(f"Unsupported rolling windows: {invalid} (available: {ROLLING_WINDOWS})")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    history = fear_greed_store.history(start, end, windows)
+    return jsonify({"start": start, "end": end, "count": len(history["ts"]), **history})
+
+@market_routes.route('/fear-greed/stats', methods=['GET'])
+def get_fear_greed_stats():
+    """Get precomputed Fear & Greed statistics (rolling means, percentiles, regime changes)"""
+    from services.fear_greed_store import fear_greed_store
+    
+    stats = fear_greed_store.stats()
+    if not stats:
+        return jsonify({"error": "Fear & Greed history not synced yet"}), 404
+    return jsonify(stats)
+
+# Apple stock stands in for a market index since ^DJI is not on the free plan
+MARKET_INDEX_SYMBOL = "AAPL"
+
+def fetch_market_index(symbol=MARKET_INDEX_SYMBOL):
+    """Fetch and format a stock quote from FMP (cached; raises on upstream errors)"""
+    url = f"{FMP_API_URL}/quote/{symbol}"
+    params = {'apikey': FMP_API_KEY}
+    
+    data = cache.get_or_set("upstream", f"market:quote:{symbol}", lambda: make_request(url, params=params), ttl=RESPONSE_CACHE_TTL)
+    if not data or not isinstance(data, list) or len(data) == 0:
+        logger.error(f"FMP API returned unexpected data format: {data}")
+        raise ValueError("Invalid data format from FMP API")
+    
+    market_data = data[0]
+    return {
+        "symbol": market_data.get("symbol", symbol),
+        "name": market_data.get("name", "Apple Inc."),
+        "price": market_data.get("price", 0),
+        "change": market_data.get("change", 0),
+        "change_percent": market_data.get("changesPercentage", 0),
+        "day_low": market_data.get("dayLow", 0),
+        "day_high": market_data.get("dayHigh", 0),
+        "year_high": market_data.get("yearHigh", 0),
+        "year_low": market_data.get("yearLow", 0),
+        "market_cap": market_data.get("marketCap", 0),
+        "last_updated": market_data.get("timestamp", 0),
+    }
+
 @market_routes.route('/index', methods=['GET'])
 def get_market_index():
     """Get latest market index data (Apple stock as indicator)"""
-    # Change from ^DJI (index) to AAPL (stock) which works with the free plan
-    symbol = "AAPL"  
+    symbol = MARKET_INDEX_SYMBOL
     logger.info(f"Fetching {symbol} data as market indicator...")
     
     if not FMP_API_KEY:
         logger.error("FMP API key not configured.")
         return jsonify({"error": "API key for market index not configured"}), 500
     
-    url = f"{FMP_API_URL}/quote/{symbol}"
-    params = {'apikey': FMP_API_KEY}
+    try:
+        _, response = cached_json("responses", f"market:index:{symbol}", lambda: fetch_market_index(symbol), ttl=RESPONSE_CACHE_TTL)
+        logger.info(f"{symbol} data fetched successfully.")
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        logger.error(f"Error processing {symbol} data: {e}")
+        return jsonify({"error": f"Failed to fetch market data", "details": str(e)}), 500
+
+_COIN_ID_RE = re.compile(r"[a-z0-9][a-z0-9-]{0,63}")
+_STOCK_SYMBOL_RE = re.compile(r"[A-Z0-9^][A-Z0-9.^-]{0,15}")
+
+def _parse_assets(value, pattern):
+    assets = list(dict.fromkeys(a.strip() for a in (value or "").split(",") if a.strip()))
+    invalid = [a for a in assets if not pattern.fullmatch(a)]
+    if invalid:
+        raise ValueError(f"Invalid asset ids: {invalid[:5]}")
+    return assets
+
+@market_routes.route('/prices', methods=['GET'])
+def get_prices():
+    """
+    Get the latest prices of several coins and stocks at once
+
+    Query parameters:
+        coins: Comma-separated CoinGecko ids (e.g. bitcoin,ethereum)
+        stocks: Comma-separated stock symbols (e.g. AAPL,MSFT)
+
+    Prices come from the in-memory tick table (services.tick_table), which
+    a background job refreshes with batched upstream calls; this endpoint
+    never calls the upstream APIs. Assets not watched yet are listed under
+    `pending` and included from the next refresh on.
+    """
+    from services.tick_table import tick_table
+
+    try:
+        coins = _parse_assets(request.args.get('coins', '').lower(), _COIN_ID_RE)
+        stocks = _parse_assets(request.args.get('stocks', '').upper(), _STOCK_SYMBOL_RE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not coins and not stocks:
+        return jsonify({"error": "Missing 'coins' or 'stocks' parameter"}), 400
+    if len(coins) + len(stocks) > TICK_MAX_REQUEST:
+        return jsonify({"error": f"At most {TICK_MAX_REQUEST} assets per request"}), 400
+
+    try:
+        prices, pending = tick_table.lookup(coins, stocks)
+        return jsonify({
+            "coins": prices["coins"],
+            "stocks": prices["stocks"],
+            "pending": [{"type": kind, "id": asset_id} for kind, asset_id in pending],
+            "refreshed_at": tick_table.refreshed_at,
+        })
+    except Exception as e:
+        logger.error(f"Error reading price ticks: {e}")
+        return jsonify({"error": "Failed to read prices", "details": str(e)}), 500
+
+@market_routes.route('/history', methods=['GET'])
+def get_price_history():
+    """
+    Get OHLCV history for an asset from the local price store
+
+    Query parameters:
+        asset: CoinGecko id (e.g. 'bitcoin')
+        start, end: Unix seconds (default: the last 7 days)
+        resolution: Bucket size, e.g. '1m', '15m', '1h', '1d' (default '1h')
+    """
+    from services.price_store import price_store, parse_resolution
+    
+    asset = request.args.get('asset', '').lower()
+    if not asset:
+        return jsonify({"error": "Missing 'asset' parameter"}), 400
     
     try:
-        data = make_request(url, params=params)
-        if data and isinstance(data, list) and len(data) > 0:
-            market_data = data[0]
-            formatted_data = {
-                "symbol": market_data.get("symbol", symbol),
-                "name": market_data.get("name", "Apple Inc."),
-                "price": market_data.get("price", 0),
-                "change": market_data.get("change", 0),
-                "change_percent": market_data.get("changesPercentage", 0),
-                "day_low": market_data.get("dayLow", 0),
-                "day_high": market_data.get("dayHigh", 0),
-                "year_high": market_data.get("yearHigh", 0),
-                "year_low": market_data.get("yearLow", 0),
-                "market_cap": market_data.get("marketCap", 0),
-                "last_updated": market_data.get("timestamp", 0),
+        end = request.args.get('end', type=int) or int(time.time())
+        start = request.args.get('start', type=int) or end - 7 * 86400
+        resolution = parse_resolution(request.args.get('resolution', '1h'))
+        if start > end:
+            raise ValueError("'start' must be before 'end'")
+        if (end - start) // resolution > MAX_HISTORY_POINTS:
+            raise ValueError(f"Range too large for resolution (max {MAX_HISTORY_POINTS} points)")
+        
+        query_start = time.perf_counter()
+        columns = price_store.query(asset, start, end, resolution)
+        query_ms = (time.perf_counter() - query_start) * 1000
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading price history for {asset}: {e}")
+        return jsonify({"error": "Failed to read price history", "details": str(e)}), 500
+    
+    logger.info(f"Price history for {asset}: {len(columns['ts'])} points in {query_ms:.2f}ms")
+    return jsonify({
+        "asset": asset,
+        "start": start,
+        "end": end,
+        "resolution": resolution,
+        "count": len(columns['ts']),
+        "ts": [int(t) for t in columns['ts']],
+        "open": [float(v) for v in columns['open']],
+        "high": [float(v) for v in columns['high']],
+        "low": [float(v) for v in columns['low']],
+        "close": [float(v) for v in columns['close']],
+        "volume": [float(v) for v in columns['volume']],
+    })
+
+@market_routes.route('/indicators', methods=['GET'])
+def get_indicators():
+    """
+    Get technical indicators (SMA/EMA/RSI/MACD/Bollinger) for an asset
+
+    Query parameters:
+        asset: CoinGecko id (e.g. 'bitcoin')
+        resolution: Bar size, e.g. '15m', '1h', '1d' (default '1h')
+        series: If 'true', also return the last `points` bars of every indicator
+        points: Number of bars for the series (default 200)
+    """
+    from services.price_store import parse_resolution
+    from services.indicators import indicator_engine
+    
+    asset = request.args.get('asset', '').lower()
+    if not asset:
+        return jsonify({"error": "Missing 'asset' parameter"}), 400
+    
+    try:
+        resolution = parse_resolution(request.args.get('resolution', '1h'))
+        result = indicator_engine.latest(asset, resolution)
+        if request.args.get('series', 'false').lower() == 'true':
+            points = min(request.args.get('points', 200, type=int), MAX_HISTORY_POINTS)
+            series = indicator_engine.series(asset, resolution, points)
+            result["series"] = {
+                name: [int(v) for v in values] if name == "ts" else [None if v != v else float(v) for v in values]  # NaN -> null
+                for name, values in series.items()
             }
-            logger.info(f"{symbol} data fetched successfully.")
-            return jsonify(formatted_data)
-        else:
-            logger.error(f"FMP API returned unexpected data format: {data}")
-            return jsonify({"error": "Invalid data format from FMP API"}), 500
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
-        logger.error(f"Error processing {symbol} data: {e}")
-        return jsonify({"error": f"Failed to fetch market data", "details": str(e)}), 500 
\ No newline at end of file
+        logger.error(f"Error computing indicators for {asset}: {e}")
+        return jsonify({"error": "Failed to compute indicators", "details": str(e)}), 500
@@ -5,8 +5,12 @@ from utils.config import (
     CRYPTOPANIC_API_KEY, CRYPTOPANIC_API_URL,
     NEWSAPI_API_KEY, NEWSAPI_URL,
     HUGGINGFACE_API_KEY, HUGGINGFACE_INFERENCE_API_URL,
-    SUMMARIZATION_MODEL
+    SUMMARIZATION_MODEL, RESPONSE_CACHE_TTL
 )
+from utils.cache import cache
+from utils.http import cached_json
+from services.news_dedup import dedup_articles
+from utils.admission import admitted
 import time
 
 # Configure logger
@@ -15,74 +19,230 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 news_routes = Blueprint('news', __name__)
 
+def fetch_crypto_articles():
+    """Fetch and normalize the latest Cryptopanic posts (raises on upstream errors)"""
+    url = f"{CRYPTOPANIC_API_URL}/posts/"
+    params = {'auth_token': CRYPTOPANIC_API_KEY, 'public': 'true'}
+    
+    data = cache.get_or_set("upstream", "news:crypto", lambda: make_request(url, params=params), ttl=RESPONSE_CACHE_TTL)
+    if not data or 'results' not in data:
+        logger.error(f"Cryptopanic API returned unexpected data format: {data}")
+        raise ValueError("Invalid data format from Cryptopanic API")
+    
+    return [{
+        "source": (article.get("source") or {}).get("title"),
+        "domain": (article.get("source") or {}).get("domain"),
+        "title": article.get("title"),
+        "published_at": article.get("published_at"),
+        "url": article.get("url"),
+        "currencies": [c.get("code") for c in article.get("currencies") or [] if c],
+    } for article in data['results']]
+
+def fetch_world_articles():
+    """Fetch and normalize the latest NewsAPI headlines (raises on upstream errors)"""
+    url = f"{NEWSAPI_URL}/top-headlines"
+    params = {'apiKey': NEWSAPI_API_KEY, 'category': 'general', 'language': 'en', 'pageSize': 15}
+    headers = {'Accept': 'application/json'}
+    
+    data = cache.get_or_set("upstream", "news:world", lambda: make_request(url, params=params, headers=headers), ttl=RESPONSE_CACHE_TTL)
+    if not data or 'articles' not in data:
+        logger.error(f"NewsAPI returned unexpected data format: {data}")
+        raise ValueError("Invalid data format from NewsAPI")
+    
+    return [{
+        "source": (article.get("source") or {}).get("name"),
+        "author": article.get("author"),
+        "title": article.get("title"),
+        "description": article.get("description"),
+        "url": article.get("url"),
+        "urlToImage": article.get("urlToImage"),
+        "publishedAt": article.get("publishedAt"),
+        "content": article.get("content")
+    } for article in data['articles']]
+
+def _dedup_enabled():
+    return request.args.get('dedup', 'true').lower() != 'false'
+
 @news_routes.route('/crypto', methods=['GET'])
 def get_crypto_news():
-    """Get latest crypto news from Cryptopanic"""
+    """Get latest crypto news from Cryptopanic (near-duplicates collapsed unless ?dedup=false)"""
     logger.info("Fetching crypto news from Cryptopanic...")
     if not CRYPTOPANIC_API_KEY:
         logger.error("Cryptopanic API key not configured.")
         return jsonify({"error": "API key for Cryptopanic not configured"}), 500
-
-    url = f"{CRYPTOPANIC_API_URL}/posts/"
-    params = {'auth_token': CRYPTOPANIC_API_KEY, 'public': 'true'}
     
     try:
-        data = make_request(url, params=params)
-        if data and 'results' in data:
-            articles = [{
-                "source": article.get("source", {}).get("title"),
-                "domain": article.get("source", {}).get("domain"),
-                "title": article.get("title"),
-                "published_at": article.get("published_at"),
-                "url": article.get("url"),
-                "currencies": [c.get("code") for c in article.get("currencies", []) if c],
-            } for article in data['results'][:15]]
-            logger.info(f"Fetched {len(articles)} crypto news articles.")
-            return jsonify({"articles": articles})
-        else:
-            logger.error(f"Cryptopanic API returned unexpected data format: {data}")
-            return jsonify({"error": "Invalid data format from Cryptopanic API"}), 500
+        dedup = _dedup_enabled()
+        
+        def produce():
+            articles = fetch_crypto_articles()
+            if dedup:
+                articles = dedup_articles(articles)
+            return {"articles": articles[:15]}
+        data, response = cached_json("responses", f"news:crypto:{dedup}", produce, ttl=RESPONSE_CACHE_TTL)
+        logger.info(f"Fetched {len(data['articles'])} crypto news articles.")
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         logger.error(f"Error processing Cryptopanic news data: {e}")
         return jsonify({"error": "Failed to fetch crypto news", "details": str(e)}), 500
 
 @news_routes.route('/world', methods=['GET'])
 def get_world_news():
-    """Get latest world news from NewsAPI"""
+    """Get latest world news from NewsAPI (near-duplicates collapsed unless ?dedup=false)"""
     logger.info("Fetching world news from NewsAPI...")
     if not NEWSAPI_API_KEY:
         logger.error("NewsAPI key not configured.")
         return jsonify({"error": "API key for NewsAPI not configured"}), 500
-
-    url = f"{NEWSAPI_URL}/top-headlines"
-    params = {'apiKey': NEWSAPI_API_KEY, 'category': 'general', 'language': 'en', 'pageSize': 15}
-    headers = {'Accept': 'application/json'}
     
     try:
-        data = make_request(url, params=params, headers=headers)
-        if data and 'articles' in data:
-            articles = [{
-                "source": article.get("source", {}).get("name"),
-                "author": article.get("author"),
-                "title": article.get("title"),
-                "description": article.get("description"),
-                "url": article.get("url"),
-                "urlToImage": article.get("urlToImage"),
-                "publishedAt": article.get("publishedAt"),
-                "content": article.get("content")
-            } for article in data['articles']]
-            logger.info(f"Fetched {len(articles)} world news articles.")
-            return jsonify({"articles": articles})
-        else:
-            logger.error(f"NewsAPI returned unexpected data format: {data}")
-            return jsonify({"error": "Invalid data format from NewsAPI"}), 500
+        dedup = _dedup_enabled()
+        
+        def produce():
+            articles = fetch_world_articles()
+            return {"articles": dedup_articles(articles) if dedup else articles}
+        data, response = cached_json("responses", f"news:world:{dedup}", produce, ttl=RESPONSE_CACHE_TTL)
+        logger.info(f"Fetched {len(data['articles'])} world news articles.")
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         logger.error(f"Error processing NewsAPI data: {e}")
         return jsonify({"error": "Failed to fetch world news", "details": str(e)}), 500
 
+@news_routes.route('/combined', methods=['GET'])
+def get_combined_news():
+    """Get crypto and world news merged, with the same story from different feeds collapsed"""
+    articles = []
+    errors = []
+    
+    if CRYPTOPANIC_API_KEY:
+        try:
+            articles.extend({
+                "origin": "crypto",
+                "source": a["source"],
+                "title": a["title"],
+                "description": None,
+                "url": a["url"],
+                "published_at": a["published_at"],
+                "currencies": a["currencies"],
+            } for a in fetch_crypto_articles())
+        except Exception as e:
+            logger.error(f"Error fetching crypto news for combined feed: {e}")
+            errors.append(f"crypto: {e}")
+    
+    if NEWSAPI_API_KEY:
+        try:
+            articles.extend({
+                "origin": "world",
+                "source": a["source"],
+                "title": a["title"],
+                "description": a["description"],
+                "url": a["url"],
+                "published_at": a["publishedAt"],
+                "currencies": [],
+            } for a in fetch_world_articles())
+        except Exception as e:
+            logger.error(f"Error fetching world news for combined feed: {e}")
+            errors.append(f"world: {e}")
+    
+    if not articles and errors:
+        return jsonify({"error": "Failed to fetch news", "details": "; ".join(errors)}), 500
+    
+    stories = dedup_articles(articles) if _dedup_enabled() else articles
+    return jsonify({"articles": stories, "total_articles": len(articles), "errors": errors})
+
+@news_routes.route('/search', methods=['GET'])
+def search_news():
+    """
+    Search archived news
+
+    Query parameters:
+        q: Full-text query (title, description, content)
+        currency: Currency code, e.g. BTC
+        source: Source name
+        start, end: Published time range (Unix seconds)
+        sort: 'relevance' (default with q) or 'recent'
+        limit: Maximum results (default 20, max 100)
+    """
+    from services.news_index import news_index
+    
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    sort = request.args.get('sort', 'relevance' if query else 'recent')
+    if sort not in ('relevance', 'recent'):
+        return jsonify({"error": "Invalid 'sort', expected 'relevance' or 'recent'"}), 400
+    
+    try:
+        start_time = time.time()
+        articles = news_index.search(
+            query=query or None,
+            currency=request.args.get('currency'),
+            source=request.args.get('source'),
+            start=request.args.get('start', type=int),
+            end=request.args.get('end', type=int),
+            limit=limit,
+            sort=sort
+        )
+        elapsed_ms = (time.time() - start_time) * 1000
+        logger.info(f"News search returned {len(articles)} articles in {elapsed_ms:.2f}ms")
+        return jsonify({"articles": articles, "count": len(articles), "query_ms": round(elapsed_ms, 2)})
+    except Exception as e:
+        logger.error(f"Error searching news: {e}")
+        return jsonify({"error": "Failed to search news", "details": str(e)}), 500
+
+@news_routes.route('/similar', methods=['GET'])
+def similar_news():
+    """
+    Semantic search over archived news (cosine similarity of embeddings)
+
+    Query parameters:
+        q: Free-text query, or
+        id: Archived article id to find related stories for
+        k: Number of results (default 10, max 50)
+        exact: Scan every embedding instead of the approximate index
+    """
+    from services.news_embeddings import news_embeddings
+    from services.news_index import news_index
+    
+    text = request.args.get('q', '').strip()
+    article_id = request.args.get('id', type=int)
+    k = max(1, min(request.args.get('k', 10, type=int), 50))
+    exact = request.args.get('exact', 'false').lower() in ('1', 'true', 'yes')
+    if not text and article_id is None:
+        return jsonify({"error": "Provide 'q' or 'id'"}), 400
+    
+    try:
+        start_time = time.time()
+        if article_id is not None:
+            matches = news_embeddings.related(article_id, k, exact=exact)
+        else:
+            matches = news_embeddings.similar(text, k, exact=exact)
+        search_ms = (time.time() - start_time) * 1000
+        scores = dict(matches)
+        articles = news_index.get_articles([match_id for match_id, _ in matches])
+        for article in articles:
+            article["score"] = round(scores[article["id"]], 4)
+        logger.info(f"Similar news search returned {len(articles)} articles in {search_ms:.2f}ms")
+        return jsonify({"articles": articles, "count": len(articles), "search_ms": round(search_ms, 2)})
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        logger.error(f"Error in similar news search: {e}")
+        return jsonify({"error": "Failed to search similar news", "details": str(e)}), 500
+
 @news_routes.route('/summarize', methods=['POST'])
+@admitted("summarization")
 def summarize_news():
-    """Summarizes provided text using a selected or default Hugging Face model"""
+    """
+    Summarizes provided text using a selected or default Hugging Face model
+
+    Texts longer than the model input are split into token-sized chunks,
+    summarized in parallel and combined (see services.summarizer); the
+    response reports the number of chunks, how many came from the cache,
+    the token count and whether the text was cut to the token budget.
+    """
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
     
@@ -100,31 +260,19 @@ def summarize_news():
         return jsonify({"error": "API key for Hugging Face not configured"}), 500
 
     try:
+        from services.summarizer import summarize
+        
         # Use the requested model or fall back to default
         model_id = model_id_req if model_id_req else SUMMARIZATION_MODEL
-        url = f"{HUGGINGFACE_INFERENCE_API_URL}{model_id}"
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-        payload = {"inputs": text_to_summarize, "parameters": {"max_length": 150, "min_length": 30}}
         
         # Track time
         start_time = time.time()
-        summary_data = make_request(url, headers=headers, method='POST', json_data=payload)
-        execution_time = time.time() - start_time
-        
-        if isinstance(summary_data, list) and len(summary_data) > 0:
-            summary = summary_data[0].get('summary_text', '')
-            logger.info(f"Summarization successful. Summary length: {len(summary)}")
-            
-            # Update metrics
-            try:
-                from routes.llm import update_metrics
-                update_metrics("summarization", execution_time)
-            except ImportError:
-                logger.info("Metrics tracking not available for summarization")
-                
-            return jsonify({"summary": summary})
-        else:
-            logger.error(f"Unexpected response format from summarization model: {summary_data}")
+        try:
+            # Long texts are summarized chunk by chunk, then the partial summaries combined
+            result = summarize(text_to_summarize, model_id)
+        except ValueError as e:
+            execution_time = time.time() - start_time
+            logger.error(str(e))
             
             # Update error metrics
             try:
@@ -134,6 +282,25 @@ def summarize_news():
                 logger.info("Error metrics tracking not available for summarization")
                 
             return jsonify({"error": "Failed to generate summary"}), 500
+        execution_time = time.time() - start_time
+        
+        summary = result["summary"]
+        logger.info(f"Summarization successful ({result['chunks']} chunks, {result['cached_chunks']} cached). Summary length: {len(summary)}")
+        
+        # Update metrics
+        try:
+            from routes.llm import update_metrics
+            update_metrics("summarization", execution_time)
+        except ImportError:
+            logger.info("Metrics tracking not available for summarization")
+            
+        return jsonify({
+            "summary": summary,
+            "chunks": result["chunks"],
+            "cached_chunks": result["cached_chunks"],
+            "tokens": result["tokens"],
+            "truncated": result["truncated"]
+        })
     except Exception as e:
         execution_time = time.time() - start_time if 'start_time' in locals() else 0
         logger.error(f"Error during summarization: {e}")
@@ -147,7 +314,38 @@ def summarize_news():
             
         return jsonify({"error": "Failed to summarize text", "details": str(e)}), 500
 
+@news_routes.route('/sentiment', methods=['GET'])
+def get_currency_sentiment():
+    """
+    Rolling news sentiment per currency (precomputed, no model inference)
+
+    Query parameters:
+        currency: Currency code, e.g. BTC (default: every currency, with
+            'ALL' covering all articles)
+
+    Each window (1h, 24h, 7d) reports the exponentially decayed article
+    count and mean score (-1 negative to 1 positive); 'all' is undecayed.
+    """
+    from services.news_sentiment import news_sentiment
+    
+    currency = request.args.get('currency', '').strip()
+    try:
+        aggregates = news_sentiment.aggregates(currency or None)
+    except Exception as e:
+        logger.error(f"Error reading news sentiment: {e}")
+        return jsonify({"error": "Failed to read news sentiment", "details": str(e)}), 500
+    
+    if currency:
+        entry = aggregates.get(currency.upper())
+        if entry is None:
+            return jsonify({"error": f"No sentiment data for {currency.upper()}"}), 404
+        return jsonify(dict(entry, currency=currency.upper()))
+    
+    currencies = sorted(aggregates.items(), key=lambda item: -item[1]["windows"].get("24h", {}).get("count", 0))
+    return jsonify({"currencies": [dict(entry, currency=code) for code, entry in currencies]})
+
 @news_routes.route('/sentiment/analyze', methods=['POST'])
+@admitted("sentiment")
 def analyze_sentiment():
     """Analyzes sentiment of provided text using Hugging Face model"""
     if not request.is_json:
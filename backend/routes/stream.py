@@ -0,0 +1,76 @@
+from flask import Blueprint, Response, jsonify, request
+import logging
+import time
+from utils.config import PUSH_MAX_CLIENTS, PUSH_HEARTBEAT, PUSH_MAX_STREAM_SECONDS
+from utils.push import broadcaster, format_event
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+stream_routes = Blueprint('stream', __name__)
+
+TOPICS = ("market", "news", "metrics", "alerts")
+
+@stream_routes.route('', methods=['GET'])
+def stream_updates():
+    """
+    Server-sent event stream of live updates
+
+    Query parameters:
+        topics: Comma-separated topics (market, news, metrics, alerts; default all)
+
+    The first event is a `snapshot` of the current market values and
+    metrics; after that only changes are sent (`market` with the changed
+    items, `news` with newly archived articles, `metrics` with the changed
+    fields, `alerts` with alerts that fired). Reconnecting clients send
+    Last-Event-ID and resume without a new snapshot while the events are
+    still buffered. Streams are closed after PUSH_MAX_STREAM_SECONDS;
+    EventSource reconnects on its own.
+    """
+    from services.live_updates import snapshot
+
+    topics = {t.strip() for t in request.args.get('topics', ",".join(TOPICS)).split(',') if t.strip()}
+    invalid = topics - set(TOPICS)
+    if invalid:
+        return jsonify({"error": f"Unknown topics: {sorted(invalid)} (available: {list(TOPICS)})"}), 400
+
+    if not broadcaster.try_subscribe(PUSH_MAX_CLIENTS):
+        logger.warning("Push stream limit reached, rejecting connection")
+        return jsonify({"error": "Too many open streams, poll instead"}), 503, {"Retry-After": "30"}
+
+    try:
+        broadcaster.relay()
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+    except Exception:
+        broadcaster.unsubscribe()
+        raise
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            cursor = last_event_id
+            oldest = broadcaster.oldest_seq()
+            resumable = (
+                cursor is not None and cursor <= broadcaster.last_seq
+                and (cursor == broadcaster.last_seq or (oldest is not None and oldest <= cursor + 1))
+            )
+            if not resumable:
+                cursor = broadcaster.last_seq
+                state = snapshot()
+                data = {key: value for key, value in state.items() if key in topics}
+                yield format_event(cursor, "snapshot", data)
+
+            deadline = time.monotonic() + PUSH_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                events = broadcaster.wait(cursor, PUSH_HEARTBEAT)
+                frames = [frame for _, topic, frame in events if topic in topics]
+                if events:
+                    cursor = events[-1][0]
+                # A comment line keeps proxies from closing an idle stream
+                yield "".join(frames) if frames else ": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
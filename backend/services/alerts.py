@@ -0,0 +1,356 @@
+import ipaddress
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from utils.config import ALERTS_DB_PATH, ALERTS_MAX, ALERTS_SENTIMENT_WINDOW
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "alerts:version"
+KINDS = ("price", "fear_greed", "sentiment")
+DIRECTIONS = ("above", "below")
+WEBHOOK_TIMEOUT = 5
+PUSH_BATCH = 50  # Fired alerts listed per push event
+
+def validate_webhook(url):
+    """
+    Check a webhook URL is http(s) and resolves only to public addresses
+
+    Alerts are registered without authentication, so loopback, private,
+    link-local (cloud metadata) and other internal hosts are refused.
+
+    Raises:
+        ValueError: Invalid URL, unresolvable or internal host
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("Webhook must be an http(s) URL")
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Webhook host cannot be resolved: {parsed.hostname}") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Webhook host {parsed.hostname} resolves to a non-public address")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    metric TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    webhook TEXT,
+    note TEXT,
+    repeat INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1,
+    armed INTEGER NOT NULL DEFAULT 1,
+    fired_count INTEGER NOT NULL DEFAULT 0,
+    last_fired_at INTEGER,
+    last_value REAL,
+    created_at INTEGER NOT NULL
+);
+"""
+
+def metric_key(kind, asset=None):
+    """Metric an alert watches: price:<coin id or stock symbol>, fear_greed or sentiment:<currency code>"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown alert kind: {kind} (available: {list(KINDS)})")
+    if kind == "fear_greed":
+        return kind
+    if not asset:
+        raise ValueError(f"Missing asset for {kind} alert")
+    return f"{kind}:{asset.upper() if kind == 'sentiment' else asset}"
+
+class ThresholdIndex:
+    """
+    Thresholds of one metric in two sorted lists
+
+    `rising` holds entries that match once the value reaches their
+    threshold (value >= threshold: a prefix of the ascending list) and
+    `falling` entries that match once the value drops to it (value <=
+    threshold: a suffix). Strict entries only match once the value passes
+    the threshold (value > or < threshold); they sort on the far side of
+    equal thresholds. A tick finds its matches with one bisection per
+    list, O(log n + matches), and matched entries are removed.
+    """
+
+    __slots__ = ("rising", "falling")
+
+    def __init__(self):
+        self.rising = []  # (threshold, tie-break, alert id), ascending
+        self.falling = []
+
+    def add(self, threshold, alert_id, rising, strict=False):
+        if rising:
+            insort(self.rising, (threshold, int(strict), alert_id))
+        else:
+            insort(self.falling, (threshold, int(not strict), alert_id))
+
+    def pop_matches(self, value):
+        """Remove and return the alert ids matched by value"""
+        end = bisect_right(self.rising, (value, 0, float("inf")))
+        start = bisect_left(self.falling, (value, 1, -1))
+        matched = [alert_id for _, _, alert_id in self.rising[:end]] + [alert_id for _, _, alert_id in self.falling[start:]]
+        del self.rising[:end]
+        del self.falling[start:]
+        return matched
+
+    def __len__(self):
+        return len(self.rising) + len(self.falling)
+
+class AlertEngine:
+    """
+    Threshold alerts on prices, the Fear & Greed value and news sentiment
+
+    Alerts are stored in SQLite and shared by all workers; the process
+    running the alert job keeps them in a ThresholdIndex per metric, and
+    reloads the index when any worker changes an alert. An `above` alert
+    fires when the value reaches its threshold; a repeating alert is then
+    re-armed once the value goes back strictly below it (and conversely
+    for `below`), so a value resting on the threshold fires only once.
+    Fired alerts are published on the push channel (topic `alerts`) and
+    POSTed to their webhook, if any.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._alerts = {}  # id -> [threshold, direction, repeat, armed]
+        self._version = None
+        self._executor = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- Registration (any worker) ---
+    def create(self, kind, direction, threshold, asset=None, webhook=None, note=None, repeat=False):
+        """
+        Register an alert
+
+        Raises:
+            ValueError: Invalid kind, direction, threshold or webhook, or too many alerts
+        """
+        metric = metric_key(kind, asset)
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction} (available: {list(DIRECTIONS)})")
+        threshold = float(threshold)
+        if webhook:
+            validate_webhook(webhook)
+        conn = self._connection()
+        if conn.execute("SELECT COUNT(*) FROM alerts WHERE active = 1").fetchone()[0] >= ALERTS_MAX:
+            raise ValueError(f"Too many active alerts (maximum {ALERTS_MAX})")
+        cursor = conn.execute(
+            "INSERT INTO alerts (metric, direction, threshold, webhook, note, repeat, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (metric, direction, threshold, webhook, note, int(bool(repeat)), int(time.time()))
+        )
+        self._bump_version()
+        return self.get(cursor.lastrowid)
+
+    def delete(self, alert_id):
+        """Remove an alert; returns False if it does not exist"""
+        deleted = self._connection().execute("DELETE FROM alerts WHERE id = ?", (alert_id,)).rowcount
+        if deleted:
+            self._bump_version()
+        return bool(deleted)
+
+    def get(self, alert_id):
+        row = self._connection().execute("SELECT * FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, active=None):
+        sql = "SELECT * FROM alerts"
+        params = ()
+        if active is not None:
+            sql += " WHERE active = ?"
+            params = (int(active),)
+        return [dict(row) for row in self._connection().execute(sql + " ORDER BY id", params)]
+
+    def watched_metrics(self):
+        """Metrics with at least one active alert"""
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT metric FROM alerts WHERE active = 1")]
+
+    def _bump_version(self):
+        shared_store.update(VERSION_KEY, lambda version: version + 1, default=0)
+
+    # --- Evaluation (alert job) ---
+    def _load(self):
+        """Rebuild the indexes when any worker changed an alert since the last load"""
+        version = shared_store.get(VERSION_KEY, 0)
+        if version == self._version:
+            return
+        indexes, alerts = {}, {}
+        for row in self._connection().execute("SELECT * FROM alerts WHERE active = 1"):
+            # Armed alerts wait for their condition, disarmed ones for the value to cross back
+            rising = (row["direction"] == "above") == bool(row["armed"])
+            indexes.setdefault(row["metric"], ThresholdIndex()).add(
+                row["threshold"], row["id"], rising, strict=not row["armed"])
+            alerts[row["id"]] = [row["threshold"], row["direction"], bool(row["repeat"]), bool(row["armed"])]
+        self._indexes, self._alerts, self._version = indexes, alerts, version
+        logger.info(f"Loaded {len(alerts)} active alerts on {len(indexes)} metrics")
+
+    def evaluate(self, values):
+        """
+        Check new metric values against the alert indexes
+
+        Args:
+            values: Dict of metric key -> current value
+
+        Returns:
+            List of fired alert events
+        """
+        with self._lock:
+            self._load()
+            now = int(time.time())
+            fired, rearmed, finished = [], [], []
+            for metric, value in values.items():
+                index = self._indexes.get(metric)
+                if index is None or value is None:
+                    continue
+                for alert_id in index.pop_matches(value):
+                    alert = self._alerts[alert_id]
+                    threshold, direction, repeat, armed = alert
+                    alert[3] = not armed
+                    if armed:
+                        fired.append({"id": alert_id, "metric": metric, "direction": direction,
+                                      "threshold": threshold, "value": value, "fired_at": now})
+                        if repeat:
+                            # Wait for the value to cross back before firing again
+                            index.add(threshold, alert_id, rising=direction == "below", strict=True)
+                            rearmed.append((0, value, alert_id))
+                        else:
+                            finished.append(alert_id)
+                    else:
+                        index.add(threshold, alert_id, rising=direction == "above")
+                        rearmed.append((1, value, alert_id))
+            try:
+                self._save(fired, rearmed, finished, now)
+            except Exception:
+                # The index was already updated: rebuild it from the database
+                # on the next check, where these alerts are still armed
+                self._version = None
+                raise
+        if fired:
+            self._deliver(fired)
+        return fired
+
+    def _save(self, fired, rearmed, finished, now):
+        if not (fired or rearmed):
+            return
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE alerts SET fired_count = fired_count + 1, last_fired_at = ?, last_value = ? WHERE id = ?",
+                [(now, event["value"], event["id"]) for event in fired]
+            )
+            conn.executemany("UPDATE alerts SET armed = ?, last_value = ? WHERE id = ?", rearmed)
+            conn.executemany("UPDATE alerts SET active = 0 WHERE id = ?", [(alert_id,) for alert_id in finished])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for alert_id in finished:
+            del self._alerts[alert_id]
+
+    def _deliver(self, fired):
+        from utils.push import publish_events
+        try:
+            # Events stay in the push buffer, so a burst is summarized
+            # (the full list is available from /api/alerts)
+            publish_events([("alerts", {"alerts": fired[:PUSH_BATCH], "more": max(len(fired) - PUSH_BATCH, 0)})])
+        except Exception as e:
+            logger.error(f"Error publishing alerts: {e}")
+
+        ids = [event["id"] for event in fired]
+        webhooks = {}
+        conn = self._connection()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for row in conn.execute(
+                    f"SELECT id, webhook, note FROM alerts WHERE webhook IS NOT NULL AND id IN ({','.join('?' * len(chunk))})", chunk):
+                webhooks[row["id"]] = (row["webhook"], row["note"])
+        for event in fired:
+            if event["id"] in webhooks:
+                url, note = webhooks[event["id"]]
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="alert-webhook")
+                self._executor.submit(self._post_webhook, url, dict(event, note=note))
+        logger.info(f"Fired {len(fired)} alerts")
+
+    @staticmethod
+    def _post_webhook(url, event):
+        # Not through make_request: webhook replies are not JSON (Slack answers 'ok',
+        # others 204) and alert payloads don't belong in the upstream cassette
+        try:
+            # The host may resolve differently since the alert was registered
+            validate_webhook(url)
+            response = requests.post(url, json={"alert": event}, timeout=WEBHOOK_TIMEOUT, allow_redirects=False)
+            if not 200 <= response.status_code < 300:
+                logger.error(f"Alert webhook {url} failed: HTTP {response.status_code}")
+        except Exception as e:
+            logger.error(f"Alert webhook {url} failed: {e}")
+
+def collect_values(metrics):
+    """Current values of the given alert metrics"""
+    from services.tick_table import tick_table
+
+    values = {}
+    coins = [m[len("price:"):] for m in metrics if m.startswith("price:") and not m[len("price:"):].isupper()]
+    stocks = [m[len("price:"):] for m in metrics if m.startswith("price:") and m[len("price:"):].isupper()]
+    if coins or stocks:
+        prices, _ = tick_table.lookup(coins, stocks)
+        for group in prices.values():
+            for asset_id, tick in group.items():
+                values[f"price:{asset_id}"] = tick["price"]
+
+    if "fear_greed" in metrics:
+        try:
+            from routes.market import fetch_fear_greed
+            values["fear_greed"] = float(fetch_fear_greed()["value"])
+        except Exception as e:
+            logger.error(f"Alerts: Fear & Greed unavailable: {e}")
+
+    if any(m.startswith("sentiment:") for m in metrics):
+        try:
+            from services.news_sentiment import news_sentiment
+            for code, entry in news_sentiment.aggregates().items():
+                window = entry["windows"].get(ALERTS_SENTIMENT_WINDOW) or {}
+                if f"sentiment:{code}" in metrics and window.get("mean") is not None:
+                    values[f"sentiment:{code}"] = window["mean"]
+        except Exception as e:
+            logger.error(f"Alerts: news sentiment unavailable: {e}")
+    return values
+
+def check_alerts():
+    """Evaluate every active alert against the current values (alert job)"""
+    metrics = set(alert_engine.watched_metrics())
+    if not metrics:
+        return []
+    return alert_engine.evaluate(collect_values(metrics))
+
+# Process-wide engine instance
+alert_engine = AlertEngine(ALERTS_DB_PATH)
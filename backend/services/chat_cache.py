@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from utils.config import CHAT_CACHE_PATH, CHAT_CACHE_THRESHOLD, CHAT_CACHE_MAX_ENTRIES
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "metrics:chat_cache"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_cache (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    question TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    tools TEXT NOT NULL,
+    execution_time REAL NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_cache_expires ON chat_cache (expires_at);
+"""
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_SPACES_RE = re.compile(r"\s+")
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _PUNCTUATION_RE.sub(" ", (question or "").lower())
+    return _SPACES_RE.sub(" ", text).strip()
+
+class SemanticCache:
+    """
+    Cache of chat answers looked up by question similarity
+
+    Questions are embedded (after normalization) with the news embedding
+    model; a stored answer for the same chat model is reused when its
+    question's cosine similarity reaches the threshold and it has not
+    expired. Entries are shared by all workers through SQLite; each process
+    mirrors the live vectors in a matrix and only loads rows added since its
+    last lookup.
+    """
+
+    def __init__(self, path, threshold=CHAT_CACHE_THRESHOLD, max_entries=CHAT_CACHE_MAX_ENTRIES, encoder=None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._encoder = encoder
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._rows = {}  # id -> (model, expires_at, vector)
+        self._matrix = None
+        self._matrix_ids = []
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _embed(self, question):
+        if self._encoder is not None:
+            vector = np.asarray(self._encoder([question])[0], dtype=np.float32)
+            return vector / max(float(np.linalg.norm(vector)), 1e-12)
+        from services.news_embeddings import news_embeddings
+        return news_embeddings.encode([question])[0]
+
+    def _sync(self, now):
+        """Load rows added by any worker since the last sync and drop expired ones"""
+        rows = self._connection().execute(
+            "SELECT id, model, vector, expires_at FROM chat_cache WHERE id > ? AND expires_at > ?",
+            (self._last_id, now)
+        ).fetchall()
+        changed = False
+        for row in rows:
+            self._rows[row["id"]] = (row["model"], row["expires_at"], np.frombuffer(row["vector"], dtype=np.float32))
+            self._last_id = max(self._last_id, row["id"])
+            changed = True
+        expired = [i for i, (_, expires_at, _) in self._rows.items() if expires_at <= now]
+        for i in expired:
+            del self._rows[i]
+        if changed or expired or self._matrix is None:
+            self._matrix_ids = list(self._rows)
+            self._matrix = np.vstack([self._rows[i][2] for i in self._matrix_ids]) if self._rows else None
+
+    def lookup(self, question, model):
+        """
+        Best unexpired answer for a similar question asked of the same model
+
+        Returns:
+            Dict with answer, question, similarity, tools, age_s and
+            execution_time (of the original run), or None
+        """
+        start_time = time.perf_counter()
+        vector = self._embed(normalize_question(question))
+        now = time.time()
+        candidates = []
+        with self._lock:
+            self._sync(now)
+            if self._matrix is not None:
+                scores = self._matrix @ vector
+                for idx in np.argsort(-scores):
+                    if scores[idx] < self.threshold:
+                        break
+                    entry_id = self._matrix_ids[idx]
+                    if self._rows[entry_id][0] == model:
+                        candidates.append((entry_id, float(scores[idx])))
+
+        hit = None
+        for entry_id, score in candidates:
+            row = self._connection().execute("SELECT * FROM chat_cache WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                # Evicted by another worker's store(): forget it and try the next best
+                with self._lock:
+                    if self._rows.pop(entry_id, None) is not None:
+                        self._matrix = None
+                continue
+            hit = {
+                "answer": row["answer"],
+                "question": row["question"],
+                "similarity": round(score, 4),
+                "tools": json.loads(row["tools"]),
+                "age_s": round(now - row["created_at"], 1),
+                "execution_time": row["execution_time"],
+            }
+            break
+        lookup_ms = (time.perf_counter() - start_time) * 1000
+        self._record(hit, lookup_ms)
+        return hit
+
+    def store(self, question, model, answer, tools, execution_time, ttl):
+        """Cache an answer for ttl seconds"""
+        if ttl <= 0:
+            return
+        vector = self._embed(normalize_question(question))
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO chat_cache (model, question, vector, answer, tools, execution_time, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (model, question, vector.astype(np.float32).tobytes(), answer, json.dumps(sorted(tools)), execution_time, now, now + ttl)
+        )
+        conn.execute("DELETE FROM chat_cache WHERE expires_at <= ?", (now,))
+        # Keep the newest max_entries rows
+        conn.execute(
+            "DELETE FROM chat_cache WHERE id <= (SELECT id FROM chat_cache ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def _record(self, hit, lookup_ms):
+        def apply(stats):
+            stats["lookups"] += 1
+            stats["lookup_ms_total"] += lookup_ms
+            if hit:
+                stats["hits"] += 1
+                stats["latency_saved_s"] += max(hit["execution_time"] - lookup_ms / 1000, 0)
+            return stats
+        try:
+            shared_store.update(STATS_KEY, apply, default={"lookups": 0, "hits": 0, "latency_saved_s": 0.0, "lookup_ms_total": 0.0})
+        except Exception as e:
+            logger.error(f"Error updating chat cache stats: {e}")
+
+    def stats(self):
+        stats = shared_store.get(STATS_KEY) or {"lookups": 0, "hits": 0, "latency_saved_s": 0.0, "lookup_ms_total": 0.0}
+        lookups = stats["lookups"]
+        entries = self._connection().execute(
+            "SELECT COUNT(*) FROM chat_cache WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        return {
+            "lookups": lookups,
+            "hits": stats["hits"],
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "latency_saved_s": round(stats["latency_saved_s"], 2),
+            "average_lookup_ms": round(stats["lookup_ms_total"] / lookups, 2) if lookups else 0.0,
+            "entries": entries,
+            "threshold": self.threshold,
+        }
+
+# Process-wide cache instance
+chat_cache = SemanticCache(CHAT_CACHE_PATH)
@@ -0,0 +1,174 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+import numpy as np
+from utils.api_client import make_request
+from utils.config import FEAR_GREED_API_URL, FEAR_GREED_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATIONS = ["Extreme Fear", "Fear", "Neutral", "Greed", "Extreme Greed"]
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("value", "u1"), ("classification", "u1")])
+ROLLING_WINDOWS = [7, 30, 90, 365]
+DAY = 86400
+
+def classify(value):
+    """Classification band of a value (same bands as the dashboard gauge)"""
+    for limit, index in ((25, 0), (45, 1), (55, 2), (75, 3)):
+        if value <= limit:
+            return index
+    return 4
+
+def _rolling_mean(values, window):
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumsum = np.cumsum(np.r_[0.0, values])
+        out[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return out
+
+class FearGreedStore:
+    """
+    Daily Fear & Greed history kept in an append-only file of fixed-size records
+
+    The whole history (a few thousand days) is held in memory together with
+    precomputed rolling means, percentile ranks and regime changes, and is
+    reloaded only when another process appended to the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded_size = -1
+        self._data = np.empty(0, dtype=RECORD_DTYPE)
+        self._rolling = {}
+        self._stats = {}
+
+    # --- Loading and precomputation ---
+    def _refresh(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        size -= size % RECORD_DTYPE.itemsize
+        if size == self._loaded_size:
+            return
+        with self._lock:
+            if size == self._loaded_size:
+                return
+            data = np.fromfile(self.path, dtype=RECORD_DTYPE, count=size // RECORD_DTYPE.itemsize) if size else np.empty(0, dtype=RECORD_DTYPE)
+            self._rolling, self._stats = self._precompute(data)
+            self._data = data
+            self._loaded_size = size
+
+    @staticmethod
+    def _precompute(data):
+        if len(data) == 0:
+            return {}, {}
+        values = data["value"].astype(np.float64)
+        classes = data["classification"]
+        rolling = {window: _rolling_mean(values, window) for window in ROLLING_WINDOWS}
+
+        latest = float(values[-1])
+        sorted_all = np.sort(values)
+        last_year = np.sort(values[-365:])
+        change_idx = np.flatnonzero(classes[1:] != classes[:-1]) + 1
+        regime_start = int(change_idx[-1]) if len(change_idx) else 0
+
+        stats = {
+            "latest": {
+                "value": int(values[-1]),
+                "value_classification": CLASSIFICATIONS[classes[-1]],
+                "timestamp": int(data["ts"][-1]),
+            },
+            "days": len(data),
+            "first_timestamp": int(data["ts"][0]),
+            "rolling_mean": {f"{w}d": (None if np.isnan(rolling[w][-1]) else round(float(rolling[w][-1]), 2)) for w in ROLLING_WINDOWS},
+            "percentile": {
+                "all_time": round(100.0 * np.searchsorted(sorted_all, latest, side="right") / len(sorted_all), 1),
+                "365d": round(100.0 * np.searchsorted(last_year, latest, side="right") / len(last_year), 1),
+            },
+            "all_time": {"min": int(sorted_all[0]), "max": int(sorted_all[-1]), "mean": round(float(values.mean()), 2)},
+            "regime": {
+                "current": CLASSIFICATIONS[classes[-1]],
+                "since": int(data["ts"][regime_start]),
+                "days": len(data) - regime_start,
+                "changes_last_90d": int(np.count_nonzero(change_idx >= len(data) - 90)),
+                "recent_changes": [{
+                    "timestamp": int(data["ts"][i]),
+                    "from": CLASSIFICATIONS[classes[i - 1]],
+                    "to": CLASSIFICATIONS[classes[i]],
+                } for i in change_idx[-10:][::-1]],
+            },
+        }
+        return rolling, stats
+
+    # --- Writes ---
+    def append(self, records):
+        """
+        Append (ts, value, classification) records newer than the last stored day
+
+        Returns the number of records written.
+        """
+        if not records:
+            return 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            last_ts = int(self._data["ts"][-1]) if len(self._data) else None
+            new = sorted({ts: (ts, value, cls) for ts, value, cls in records if last_ts is None or ts > last_ts}.values())
+            if not new:
+                return 0
+            with open(self.path, "ab") as f:
+                f.write(np.array(new, dtype=RECORD_DTYPE).tobytes())
+        self._refresh()
+        logger.info(f"Appended {len(new)} Fear & Greed records")
+        return len(new)
+
+    def sync(self):
+        """Backfill the full history on first run, then fetch only the missing days"""
+        self._refresh()
+        if len(self._data) == 0:
+            limit = 0  # 0 returns the full history
+        else:
+            missing_days = (int(time.time()) - int(self._data["ts"][-1])) // DAY
+            if missing_days < 1:
+                return 0
+            limit = missing_days + 1
+
+        data = make_request(FEAR_GREED_API_URL, params={'limit': limit})
+        records = []
+        for item in data.get('data', []) if isinstance(data, dict) else []:
+            value = int(item['value'])
+            label = item.get('value_classification')
+            cls = CLASSIFICATIONS.index(label) if label in CLASSIFICATIONS else classify(value)
+            records.append((int(item['timestamp']), value, cls))
+        return self.append(records)
+
+    # --- Reads (served from memory) ---
+    def latest(self):
+        self._refresh()
+        return self._stats.get("latest")
+
+    def stats(self):
+        self._refresh()
+        return self._stats
+
+    def history(self, start=None, end=None, windows=None):
+        """Daily values between start and end with the requested rolling means"""
+        self._refresh()
+        data, rolling = self._data, self._rolling
+        ts = data["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+        result = {
+            "ts": ts[lo:hi].tolist(),
+            "value": data["value"][lo:hi].tolist(),
+            "classification": [CLASSIFICATIONS[c] for c in data["classification"][lo:hi]],
+        }
+        for window in windows or []:
+            if window in rolling:
+                result[f"mean_{window}d"] = [None if np.isnan(v) else round(float(v), 2) for v in rolling[window][lo:hi]]
+        return result
+
+# Process-wide store instance
+fear_greed_store = FearGreedStore(FEAR_GREED_STORE_PATH)
@@ -0,0 +1,281 @@
+import collections
+import logging
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.config import INDICATOR_LOOKBACK_BARS
+from services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+# Standard indicator periods
+SMA_PERIOD = 20
+EMA_PERIOD = 20
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_PERIOD, BOLLINGER_STDDEV = 20, 2.0
+
+# --- Vectorized series computations ---
+def ema(values, alpha):
+    """
+    Exponential moving average y[t] = (1 - alpha) * y[t-1] + alpha * x[t], seeded with x[0]
+
+    Computed in closed form over blocks short enough that the rescaling
+    factors stay well inside float64 range, so there is no per-element
+    Python loop.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    beta = 1.0 - alpha
+    if beta <= 0:
+        out[:] = x
+        return out
+    block = max(1, int(20 / -np.log(beta)))
+    prev = x[0]
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        powers = beta ** np.arange(len(chunk))
+        y = beta * powers * prev + alpha * powers * np.cumsum(chunk / powers)
+        out[start:start + len(chunk)] = y
+        prev = y[-1]
+    return out
+
+def sma(values, period):
+    """Simple moving average (NaN until `period` values are available)"""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        cumsum = np.cumsum(np.r_[0.0, x])
+        out[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    return out
+
+def rsi(values, period=RSI_PERIOD):
+    """Relative Strength Index with Wilder smoothing (alpha = 1 / period)"""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) <= period:
+        return out
+    delta = np.diff(x)
+    avg_gain = ema(np.clip(delta, 0, None), 1.0 / period)
+    avg_loss = ema(np.clip(-delta, 0, None), 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values_rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    out[1:] = values_rsi
+    out[:period] = np.nan
+    return out
+
+def macd(values, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """MACD line, signal line and histogram"""
+    line = ema(values, 2.0 / (fast + 1)) - ema(values, 2.0 / (slow + 1))
+    signal_line = ema(line, 2.0 / (signal + 1))
+    return line, signal_line, line - signal_line
+
+def bollinger(values, period=BOLLINGER_PERIOD, num_std=BOLLINGER_STDDEV):
+    """Bollinger bands (middle, upper, lower) using the population std deviation"""
+    x = np.asarray(values, dtype=np.float64)
+    middle = sma(x, period)
+    std = np.full(len(x), np.nan)
+    if len(x) >= period:
+        std[period - 1:] = sliding_window_view(x, period).std(axis=1)
+    return middle, middle + num_std * std, middle - num_std * std
+
+def compute_all(closes):
+    """Compute every indicator series over an array of closes"""
+    macd_line, macd_signal, macd_hist = macd(closes)
+    bb_middle, bb_upper, bb_lower = bollinger(closes)
+    return {
+        "sma": sma(closes, SMA_PERIOD),
+        "ema": ema(closes, 2.0 / (EMA_PERIOD + 1)),
+        "rsi": rsi(closes),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_hist,
+        "bb_middle": bb_middle,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+    }
+
+# --- Incremental state ---
+class IndicatorState:
+    """
+    Indicator state for one asset at one resolution, updated tick by tick
+
+    Holds the recursive state (EMAs, Wilder averages) as of the last
+    completed bar plus the close of the bar in progress. A tick inside the
+    current bar only replaces its close; a tick in a new bar commits the
+    current one. Both are O(1).
+    """
+
+    def __init__(self, resolution):
+        self.resolution = resolution
+        self.bars = 0
+        self.bucket = None
+        self.close = None
+        self.last_ts = None
+        self.prev_close = None
+        self.ema = None
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.window = collections.deque(maxlen=max(SMA_PERIOD, BOLLINGER_PERIOD) - 1)
+
+    @classmethod
+    def from_history(cls, ts, closes, resolution):
+        """Bootstrap the state from bucketed history in one vectorized pass"""
+        state = cls(resolution)
+        if len(closes) == 0:
+            return state
+        committed = np.asarray(closes[:-1], dtype=np.float64)
+        if len(committed):
+            a_ema, a_fast, a_slow = 2.0 / (EMA_PERIOD + 1), 2.0 / (MACD_FAST + 1), 2.0 / (MACD_SLOW + 1)
+            line = ema(committed, a_fast) - ema(committed, a_slow)
+            state.ema = float(ema(committed, a_ema)[-1])
+            state.ema_fast = float(ema(committed, a_fast)[-1])
+            state.ema_slow = float(ema(committed, a_slow)[-1])
+            state.signal = float(ema(line, 2.0 / (MACD_SIGNAL + 1))[-1])
+            if len(committed) > 1:
+                delta = np.diff(committed)
+                state.avg_gain = float(ema(np.clip(delta, 0, None), 1.0 / RSI_PERIOD)[-1])
+                state.avg_loss = float(ema(np.clip(-delta, 0, None), 1.0 / RSI_PERIOD)[-1])
+            state.prev_close = float(committed[-1])
+            state.window.extend(committed[-state.window.maxlen:].tolist())
+        state.bars = len(closes)
+        state.bucket = int(ts[-1]) // resolution
+        state.close = float(closes[-1])
+        state.last_ts = int(ts[-1])
+        return state
+
+    def _commit(self):
+        current = self.current()
+        self.ema = current["ema"]
+        self.ema_fast, self.ema_slow = current["_ema_fast"], current["_ema_slow"]
+        self.signal = current["macd_signal"]
+        self.avg_gain, self.avg_loss = current["_avg_gain"], current["_avg_loss"]
+        self.prev_close = self.close
+        self.window.append(self.close)
+
+    def update(self, ts, close):
+        """Apply one raw tick (Unix seconds, close price)"""
+        bucket = int(ts) // self.resolution
+        if self.bucket is not None and bucket < self.bucket:
+            return  # late tick for an already committed bar
+        if self.bucket is not None and bucket > self.bucket:
+            self._commit()
+            self.bars += 1
+        elif self.bucket is None:
+            self.bars = 1
+        self.bucket = bucket
+        self.close = float(close)
+        self.last_ts = int(ts)
+
+    def current(self):
+        """Indicator values including the bar in progress"""
+        c = self.close
+        if c is None:
+            return {}
+
+        def step(prev, alpha, value):
+            return value if prev is None else prev + alpha * (value - prev)
+
+        ema_value = step(self.ema, 2.0 / (EMA_PERIOD + 1), c)
+        ema_fast = step(self.ema_fast, 2.0 / (MACD_FAST + 1), c)
+        ema_slow = step(self.ema_slow, 2.0 / (MACD_SLOW + 1), c)
+        macd_line = ema_fast - ema_slow
+        signal = step(self.signal, 2.0 / (MACD_SIGNAL + 1), macd_line)
+
+        avg_gain = avg_loss = rsi_value = None
+        if self.prev_close is not None:
+            delta = c - self.prev_close
+            avg_gain = step(self.avg_gain, 1.0 / RSI_PERIOD, max(delta, 0.0))
+            avg_loss = step(self.avg_loss, 1.0 / RSI_PERIOD, max(-delta, 0.0))
+            if self.bars > RSI_PERIOD:
+                rsi_value = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+        window = np.fromiter(self.window, dtype=np.float64, count=len(self.window))
+        sma_value = bb_upper = bb_lower = None
+        if len(window) + 1 >= SMA_PERIOD:
+            closes = np.append(window[-(SMA_PERIOD - 1):], c)
+            sma_value = float(closes.mean())
+            std = float(closes.std())
+            bb_upper = sma_value + BOLLINGER_STDDEV * std
+            bb_lower = sma_value - BOLLINGER_STDDEV * std
+
+        return {
+            "close": c,
+            "sma": sma_value,
+            "ema": ema_value,
+            "rsi": rsi_value,
+            "macd": macd_line,
+            "macd_signal": signal,
+            "macd_hist": macd_line - signal,
+            "bb_middle": sma_value,
+            "bb_upper": bb_upper,
+            "bb_lower": bb_lower,
+            "_ema_fast": ema_fast,
+            "_ema_slow": ema_slow,
+            "_avg_gain": avg_gain,
+            "_avg_loss": avg_loss,
+        }
+
+class IndicatorEngine:
+    """
+    Keeps an IndicatorState per (asset, resolution) in sync with the price store
+
+    The first request bootstraps from the last INDICATOR_LOOKBACK_BARS bars;
+    later requests only feed the ticks appended since (by any process) into
+    the incremental state.
+    """
+
+    def __init__(self, store, lookback_bars=INDICATOR_LOOKBACK_BARS):
+        self.store = store
+        self.lookback_bars = lookback_bars
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _sync(self, asset, resolution):
+        key = (asset, resolution)
+        state = self._states.get(key)
+        if state is None:
+            last_ts = self.store.series(asset).last_timestamp()
+            if last_ts is None:
+                raise LookupError(f"No price history for {asset}")
+            start = (last_ts // resolution - self.lookback_bars + 1) * resolution
+            bars = self.store.query(asset, start, None, resolution)
+            state = IndicatorState.from_history(bars["ts"], bars["close"], resolution)
+            self._states[key] = state
+            return state
+
+        ticks = self.store.query(asset, state.last_ts + 1, None)
+        for ts, close in zip(ticks["ts"], ticks["close"]):
+            state.update(ts, close)
+        return state
+
+    def latest(self, asset, resolution):
+        """Current indicator values for an asset"""
+        with self._lock:
+            state = self._sync(asset, resolution)
+            values = state.current()
+        result = {k: v for k, v in values.items() if not k.startswith("_")}
+        result.update({"asset": asset, "resolution": resolution, "ts": state.bucket * resolution, "bars": state.bars})
+        return result
+
+    def series(self, asset, resolution, points=200):
+        """Full indicator series over the last `points` bars (vectorized)"""
+        last_ts = self.store.series(asset).last_timestamp()
+        if last_ts is None:
+            raise LookupError(f"No price history for {asset}")
+        # Extra bars so the recursive indicators have warmed up
+        warmup = max(MACD_SLOW + MACD_SIGNAL, RSI_PERIOD, BOLLINGER_PERIOD) * 3
+        start = (last_ts // resolution - points - warmup + 1) * resolution
+        bars = self.store.query(asset, start, None, resolution)
+        indicators = compute_all(bars["close"])
+        result = {"ts": np.asarray(bars["ts"])[-points:], "close": np.asarray(bars["close"])[-points:]}
+        result.update({name: values[-points:] for name, values in indicators.items()})
+        return result
+
+# Process-wide engine instance
+indicator_engine = IndicatorEngine(price_store)
@@ -0,0 +1,109 @@
+import logging
+from datetime import datetime, timezone
+from utils.config import FMP_API_KEY, PRICE_ASSETS
+from utils.push import STATE_KEY, publish_events
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+MAX_NEWS_PER_EVENT = 50
+
+def collect_market():
+    """Current market values shown on the dashboard, keyed by item"""
+    from routes.market import fetch_fear_greed, fetch_market_index
+    from services.price_store import price_store
+
+    market = {}
+    try:
+        market["fear_greed"] = fetch_fear_greed()
+    except Exception as e:
+        logger.error(f"Live updates: Fear & Greed unavailable: {e}")
+    if FMP_API_KEY:
+        try:
+            market["market_index"] = fetch_market_index()
+        except Exception as e:
+            logger.error(f"Live updates: market index unavailable: {e}")
+    for asset in PRICE_ASSETS:
+        try:
+            cols = price_store.series(asset).columns()
+            if len(cols["ts"]):
+                market[f"price:{asset}"] = {"asset": asset, "price": float(cols["close"][-1]), "ts": int(cols["ts"][-1])}
+        except Exception as e:
+            logger.error(f"Live updates: price of {asset} unavailable: {e}")
+    return market
+
+def metrics_delta(previous, current):
+    """Fields of each metrics entry that changed since the previous snapshot"""
+    delta = {}
+    for name, values in current.items():
+        before = previous.get(name) or {}
+        if not isinstance(values, dict):
+            if before != values:
+                delta[name] = values
+            continue
+        changed = {field: value for field, value in values.items() if before.get(field) != value}
+        if changed:
+            delta[name] = changed
+    return delta
+
+def _news_event_article(article):
+    return {
+        "id": article["id"],
+        "origin": article["origin"],
+        "source": article["source"],
+        "title": article["title"],
+        "description": article["description"],
+        "url": article["url"],
+        "currencies": article["currencies"],
+        "published_at": datetime.fromtimestamp(article["published_at"], tz=timezone.utc).isoformat(),
+    }
+
+def produce_updates():
+    """
+    Compare the current market values, new archived articles and LLM
+    metrics with the last published state, and publish only what changed
+
+    Runs in one process per host; every worker relays the resulting events
+    to its stream connections.
+
+    Returns:
+        Number of events published
+    """
+    from routes.llm import get_metrics_snapshot
+    from services.news_index import news_index
+
+    state = shared_store.get(STATE_KEY) or {}
+    events = []
+
+    market = collect_market()
+    previous_market = state.get("market", {})
+    changed = {key: value for key, value in market.items() if previous_market.get(key) != value}
+    if changed:
+        events.append(("market", changed))
+
+    metrics = get_metrics_snapshot()
+    if "metrics" in state:
+        delta = metrics_delta(state["metrics"], metrics)
+        if delta:
+            events.append(("metrics", delta))
+
+    news_cursor = state.get("news_cursor")
+    try:
+        if news_cursor is None:
+            # First run: only announce articles ingested from now on
+            news_cursor = news_index.last_id()
+        articles = news_index.articles_since(news_cursor, MAX_NEWS_PER_EVENT)
+        if articles:
+            events.append(("news", {"articles": [_news_event_article(a) for a in articles]}))
+            news_cursor = articles[-1]["id"]
+    except Exception as e:
+        logger.error(f"Live updates: news archive unavailable: {e}")
+
+    shared_store.set(STATE_KEY, {"market": dict(previous_market, **market), "metrics": metrics, "news_cursor": news_cursor})
+    publish_events(events)
+    return len(events)
+
+def snapshot():
+    """Last published market values and metrics, sent to clients when they connect"""
+    state = shared_store.get(STATE_KEY) or {}
+    return {"market": state.get("market", {}), "metrics": state.get("metrics")}
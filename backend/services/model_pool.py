@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from utils.config import LLM_POOL_SIZE, LLM_MODEL_CONCURRENCY, LLM_MODEL_LIMITS, LLM_ACQUIRE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+def pool_key(model_id, params):
+    """Pool key of a model id and its generation parameters"""
+    return (model_id, tuple(sorted(params.items())))
+
+class ModelPool:
+    """
+    Thread-safe LRU pool of model client instances
+
+    Instances are keyed by model id and generation parameters, so requests
+    for different models or settings each keep their own instance instead
+    of rebuilding a shared one. Building happens outside the pool lock
+    (one builder per key), and calls through lease() are limited per model
+    id by a semaphore.
+    """
+
+    def __init__(self, factory, capacity=LLM_POOL_SIZE, concurrency=LLM_MODEL_CONCURRENCY, limits=None,
+                 acquire_timeout=LLM_ACQUIRE_TIMEOUT):
+        """
+        Args:
+            factory: Callable(model_id, **params) building an instance
+            capacity: Maximum instances kept (least recently used are evicted)
+            concurrency: Default concurrent leases per model id
+            limits: Per-model overrides of concurrency {model_id: n}
+            acquire_timeout: Seconds to wait for a free slot in lease()
+        """
+        self.factory = factory
+        self.capacity = capacity
+        self.concurrency = concurrency
+        self.limits = dict(LLM_MODEL_LIMITS if limits is None else limits)
+        self.acquire_timeout = acquire_timeout
+        self._instances = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}
+        self._semaphores = {}
+        self._in_use = {}
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, model_id, **params):
+        """Return the pooled instance for model_id and params, building it on a miss"""
+        key = pool_key(model_id, params)
+        while True:
+            with self._lock:
+                instance = self._instances.get(key)
+                if instance is not None:
+                    self._instances.move_to_end(key)
+                    self.hits += 1
+                    return instance
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    break
+            # Another thread is building this instance: wait and look again
+            building.wait()
+
+        try:
+            logger.info(f"Building model instance: {model_id} {dict(params) or ''}")
+            instance = self.factory(model_id, **params)
+            with self._lock:
+                self._instances[key] = instance
+                self.builds += 1
+                self._evict()
+            return instance
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+
+    def _evict(self):
+        # Called with the lock held; instances in use are skipped (their
+        # borrowers keep them alive until they are done)
+        for key in list(self._instances):
+            if len(self._instances) <= self.capacity:
+                break
+            if self._in_use.get(key, 0) == 0:
+                del self._instances[key]
+                self.evictions += 1
+                logger.info(f"Evicted model instance: {key[0]}")
+
+    def _semaphore(self, model_id):
+        with self._lock:
+            semaphore = self._semaphores.get(model_id)
+            if semaphore is None:
+                limit = self.limits.get(model_id, self.concurrency)
+                semaphore = self._semaphores[model_id] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    @contextmanager
+    def lease(self, model_id, **params):
+        """
+        Borrow an instance while holding one of the model's concurrency slots
+
+        Raises:
+            TimeoutError: No slot became free within acquire_timeout
+        """
+        semaphore = self._semaphore(model_id)
+        start = time.monotonic()
+        if not semaphore.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"Timed out waiting for a free {model_id} slot")
+        waited_ms = (time.monotonic() - start) * 1000
+        if waited_ms > 100:
+            logger.info(f"Waited {waited_ms:.0f}ms for a {model_id} slot")
+        key = pool_key(model_id, params)
+        try:
+            with self._lock:
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+            yield self.get(model_id, **params)
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+                self._evict()
+            semaphore.release()
+
+    def preload(self, model_ids, **params):
+        """Build instances ahead of the first request (errors are logged, not raised)"""
+        for model_id in model_ids:
+            try:
+                self.get(model_id, **params)
+            except Exception as e:
+                logger.error(f"Failed to preload model {model_id}: {e}")
+
+    def evict(self, model_id):
+        """Drop every pooled instance of a model (e.g. after it failed)"""
+        with self._lock:
+            for key in [key for key in self._instances if key[0] == model_id]:
+                del self._instances[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": [{"model": key[0], "params": dict(key[1]), "in_use": self._in_use.get(key, 0)} for key in self._instances],
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "builds": self.builds,
+                "evictions": self.evictions,
+            }
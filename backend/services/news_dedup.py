@@ -0,0 +1,125 @@
+import logging
+import re
+import zlib
+import numpy as np
+from utils.config import NEWS_DEDUP_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# MinHash / LSH parameters: 16 bands of 4 rows puts the LSH candidate
+# threshold around Jaccard 0.5; candidates are then verified against
+# NEWS_DEDUP_THRESHOLD using the signature estimate
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1234)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9 ]+")
+_SPACES_RE = re.compile(r"\s+")
+
+def normalize(text):
+    text = _NORMALIZE_RE.sub(" ", (text or "").lower())
+    return _SPACES_RE.sub(" ", text).strip()
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed character shingles (31-bit) of normalized text"""
+    text = normalize(text)
+    if len(text) <= size:
+        grams = {text} if text else set()
+    else:
+        grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) & MERSENNE_PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+def minhash(shingle_hashes):
+    """MinHash signature using NUM_PERM universal hash functions (vectorized)"""
+    if len(shingle_hashes) == 0:
+        return np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint64)
+    # (a * x + b) mod p stays below 2^63 since a, x < 2^31
+    hashed = (np.outer(shingle_hashes, _PERM_A) + _PERM_B) % MERSENNE_PRIME
+    return hashed.min(axis=0)
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def cluster(texts, threshold=NEWS_DEDUP_THRESHOLD):
+    """
+    Group near-duplicate texts
+
+    Each text gets a MinHash signature; texts sharing any LSH band bucket
+    are candidates, and candidates whose estimated Jaccard similarity
+    reaches the threshold are merged (union-find). Runs in roughly linear
+    time in the number of texts.
+
+    Returns:
+        List of clusters, each a list of indices into texts (in input order)
+    """
+    n = len(texts)
+    if n == 0:
+        return []
+    signatures = np.vstack([minhash(shingles(text)) for text in texts])
+    parent = list(range(n))
+
+    for band in range(BANDS):
+        buckets = {}
+        band_rows = signatures[:, band * ROWS:(band + 1) * ROWS]
+        for i in range(n):
+            buckets.setdefault(band_rows[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                root_a, root_b = _find(parent, first), _find(parent, other)
+                if root_a == root_b:
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(_find(parent, i), []).append(i)
+    return list(clusters.values())
+
+def _article_text(article):
+    return " ".join(filter(None, [article.get("title"), article.get("description")]))
+
+def _richness(article):
+    return len(article.get("content") or "") + len(article.get("description") or "")
+
+def dedup_articles(articles, threshold=NEWS_DEDUP_THRESHOLD, text_fn=_article_text):
+    """
+    Collapse near-duplicate articles into one canonical item per story
+
+    The canonical item is the one with the most text (ties go to the first
+    listed, i.e. the feed's order). It gets an `alternate_sources` list with
+    the source and url of every duplicate.
+    """
+    if len(articles) < 2:
+        return [dict(article, alternate_sources=[]) for article in articles]
+
+    groups = cluster([text_fn(article) for article in articles], threshold)
+    result = []
+    for members in groups:
+        canonical_idx = max(members, key=lambda i: (_richness(articles[i]), -i))
+        canonical = dict(articles[canonical_idx])
+        canonical["alternate_sources"] = [{
+            "source": articles[i].get("source"),
+            "url": articles[i].get("url"),
+        } for i in members if i != canonical_idx]
+        result.append((min(members), canonical))
+
+    # Keep the position of each story's first appearance
+    result.sort(key=lambda item: item[0])
+    deduped = [article for _, article in result]
+    if len(deduped) < len(articles):
+        logger.info(f"News dedup collapsed {len(articles)} articles into {len(deduped)} stories")
+    return deduped
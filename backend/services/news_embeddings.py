@@ -0,0 +1,360 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import numpy as np
+from utils.config import (
+    EMBEDDING_MODEL, NEWS_EMBEDDINGS_DIR, NEWS_EMBEDDING_BATCH_SIZE,
+    NEWS_EMBEDDING_QUANTIZE, NEWS_ANN_MIN_VECTORS, NEWS_ANN_PROBES
+)
+
+logger = logging.getLogger(__name__)
+
+SCAN_CHUNK_ROWS = 65536  # Rows per matrix product when scanning the whole archive
+RESCORE_FACTOR = 4  # Candidates rescored in float32 per result when scanning int8
+
+_model = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    """Load the sentence-transformers model on first use (heavy import)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                logger.info(f"Loading embedding model {EMBEDDING_MODEL}")
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+def article_text(article):
+    """Text embedded for an article: title and description"""
+    return ". ".join(filter(None, [article.get("title"), article.get("description")]))
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _quantize(vectors):
+    """Symmetric int8 quantization with one scale per row"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+class IVFIndex:
+    """
+    Inverted-file approximate index over unit vectors
+
+    Vectors are clustered with spherical k-means (about sqrt(n) lists); a
+    query only scans the lists whose centroids are closest to it.
+    """
+
+    def __init__(self, centroids, order, offsets, rows):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.rows = rows
+
+    @staticmethod
+    def _assign(vectors, centroids):
+        return np.argmax(vectors @ centroids.T, axis=1)
+
+    @classmethod
+    def build(cls, vectors, rows, iterations=10, seed=0):
+        nlist = max(16, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        sample_idx = np.sort(rng.choice(rows, size=min(rows, nlist * 32), replace=False))
+        sample = np.asarray(vectors[sample_idx], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        assign = np.concatenate([
+            cls._assign(np.asarray(vectors[start:min(start + SCAN_CHUNK_ROWS, rows)], dtype=np.float32), centroids)
+            for start in range(0, rows, SCAN_CHUNK_ROWS)
+        ])
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return cls(centroids, order, offsets, rows)
+
+    def candidates(self, query, probes=NEWS_ANN_PROBES):
+        """Row indices in the `probes` lists closest to the query"""
+        scores = self.centroids @ query
+        lists = _top_k(scores, min(probes, len(scores)))
+        return np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+
+class NewsEmbeddings:
+    """
+    Article embeddings in append-only memory-mapped files
+
+    ids.bin holds the article id of every row (increasing, since articles
+    are embedded in id order) and vectors.f32 the unit-normalized float32
+    embeddings. With quantization enabled, vectors.i8 and scales.f32 hold an
+    int8 copy that is scanned instead, with the best candidates rescored
+    in float32.
+    """
+
+    def __init__(self, directory, encoder=None, quantize=NEWS_EMBEDDING_QUANTIZE):
+        """
+        Args:
+            directory: Directory holding the embedding files
+            encoder: Callable mapping a list of texts to vectors (defaults
+                to the EMBEDDING_MODEL sentence-transformer)
+            quantize: Keep and scan an int8 copy of the vectors
+        """
+        self.directory = directory
+        self.quantize = quantize
+        self._encoder = encoder
+        self._lock = threading.Lock()
+        self._mapped_rows = -1
+        self._maps = None
+        self._meta = None
+        self._ann = None
+        self._ann_building = False
+
+    # --- Files ---
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        path = self._path("meta.json")
+        if self._meta is None and os.path.exists(path):
+            with open(path) as f:
+                self._meta = json.load(f)
+        return self._meta
+
+    def _rows(self, name, row_bytes):
+        path = self._path(name)
+        return (os.path.getsize(path) // row_bytes) if os.path.exists(path) else 0
+
+    def _row_count(self, dim):
+        # ids are written last, so they bound the rows that are complete
+        return min(self._rows("ids.bin", 8), self._rows("vectors.f32", 4 * dim))
+
+    def _quantized_rows(self, dim):
+        return min(self._rows("vectors.i8", dim), self._rows("scales.f32", 4))
+
+    def _mapped(self):
+        """Return (ids, vectors, quantized, scales) memory maps, remapping if the files grew"""
+        meta = self._read_meta()
+        if meta is None:
+            return np.empty(0, dtype=np.int64), None, None, None
+        dim = meta["dim"]
+        rows = self._row_count(dim)
+        with self._lock:
+            if rows != self._mapped_rows:
+                if rows == 0:
+                    self._maps = (np.empty(0, dtype=np.int64), None, None, None)
+                else:
+                    ids = np.memmap(self._path("ids.bin"), dtype=np.int64, mode="r", shape=(rows,))
+                    vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, dim))
+                    quantized = scales = None
+                    if self.quantize and self._quantized_rows(dim) >= rows:
+                        quantized = np.memmap(self._path("vectors.i8"), dtype=np.int8, mode="r", shape=(rows, dim))
+                        scales = np.memmap(self._path("scales.f32"), dtype=np.float32, mode="r", shape=(rows,))
+                    self._maps = (ids, vectors, quantized, scales)
+                self._mapped_rows = rows
+            return self._maps
+
+    def count(self):
+        return len(self._mapped()[0])
+
+    # --- Writes ---
+    def encode(self, texts):
+        """Embed texts as unit-normalized float32 vectors"""
+        if self._encoder is not None:
+            return _normalize(self._encoder(texts))
+        model = _get_model()
+        vectors = model.encode(texts, batch_size=NEWS_EMBEDDING_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _truncate_partial_rows(self, dim):
+        rows = self._row_count(dim)
+        files = [("ids.bin", 8), ("vectors.f32", 4 * dim), ("vectors.i8", dim), ("scales.f32", 4)]
+        for name, row_bytes in files:
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > rows * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+
+    def _backfill_quantized(self, dim):
+        """Quantize rows written while quantization was disabled"""
+        rows, done = self._row_count(dim), self._quantized_rows(dim)
+        if done >= rows:
+            return
+        vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, dim))
+        for name in ("vectors.i8", "scales.f32"):
+            with open(self._path(name), "ab") as f:
+                f.truncate(done * (dim if name == "vectors.i8" else 4))
+        for start in range(done, rows, SCAN_CHUNK_ROWS):
+            quantized, scales = _quantize(np.asarray(vectors[start:start + SCAN_CHUNK_ROWS]))
+            with open(self._path("vectors.i8"), "ab") as f:
+                f.write(quantized.tobytes())
+            with open(self._path("scales.f32"), "ab") as f:
+                f.write(scales.tobytes())
+
+    def _append(self, ids, vectors):
+        if self.quantize:
+            quantized, scales = _quantize(vectors)
+            with open(self._path("vectors.i8"), "ab") as f:
+                f.write(quantized.tobytes())
+            with open(self._path("scales.f32"), "ab") as f:
+                f.write(scales.tobytes())
+        with open(self._path("vectors.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._path("ids.bin"), "ab") as f:
+            f.write(np.asarray(ids, dtype=np.int64).tobytes())
+
+    def embed_pending(self, index=None, batch_size=NEWS_EMBEDDING_BATCH_SIZE):
+        """
+        Embed every archived article that has no embedding yet, in batches
+
+        Returns:
+            Number of articles embedded
+        """
+        if index is None:
+            from services.news_index import news_index as index
+        os.makedirs(self.directory, exist_ok=True)
+        total = 0
+
+        # Serialize writers across processes
+        with open(self._path(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            meta = self._read_meta()
+            if meta is not None and meta["model"] != EMBEDDING_MODEL and self._encoder is None:
+                logger.error(f"Embeddings in {self.directory} were built with {meta['model']}, "
+                             f"not {EMBEDDING_MODEL}; delete the directory to re-embed")
+                return 0
+            if meta is not None:
+                self._truncate_partial_rows(meta["dim"])
+                if self.quantize:
+                    self._backfill_quantized(meta["dim"])
+
+            ids = self._mapped()[0]
+            last_id = int(ids[-1]) if len(ids) else 0
+            while True:
+                articles = index.articles_since(last_id, batch_size * 8)
+                if not articles:
+                    break
+                vectors = np.concatenate([
+                    self.encode([article_text(a) for a in articles[start:start + batch_size]])
+                    for start in range(0, len(articles), batch_size)
+                ])
+                if meta is None:
+                    meta = {"model": EMBEDDING_MODEL, "dim": int(vectors.shape[1])}
+                    with open(self._path("meta.json"), "w") as f:
+                        json.dump(meta, f)
+                    self._meta = meta
+                self._append([a["id"] for a in articles], vectors)
+                last_id = articles[-1]["id"]
+                total += len(articles)
+
+        if total:
+            logger.info(f"Embedded {total} news articles")
+        return total
+
+    # --- Approximate index ---
+    def _ann_index(self, vectors, rows):
+        """
+        Current IVF index, or None while the archive is small or the first
+        build is running. Builds run in a background thread and are redone
+        once 10% more rows have been appended; rows past the index are
+        scanned exactly.
+        """
+        if NEWS_ANN_MIN_VECTORS <= 0 or rows < NEWS_ANN_MIN_VECTORS:
+            return None
+        with self._lock:
+            stale = self._ann is None or rows > self._ann.rows * 1.1
+            if stale and not self._ann_building:
+                self._ann_building = True
+                threading.Thread(target=self._build_ann, args=(vectors, rows), name="news-ann-build", daemon=True).start()
+            return self._ann
+
+    def _build_ann(self, vectors, rows):
+        try:
+            index = IVFIndex.build(vectors, rows)
+            with self._lock:
+                self._ann = index
+            logger.info(f"Built approximate news index over {rows} embeddings ({len(index.centroids)} lists)")
+        except Exception as e:
+            logger.error(f"Approximate news index build failed: {e}")
+        finally:
+            self._ann_building = False
+
+    # --- Queries ---
+    def _scan(self, query, vectors, quantized, scales, rows, k):
+        """Exact top-k over all rows (int8 scan plus float32 rescoring when quantized)"""
+        matrix = quantized if quantized is not None else vectors
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, SCAN_CHUNK_ROWS):
+            stop = min(start + SCAN_CHUNK_ROWS, rows)
+            scores[start:stop] = np.asarray(matrix[start:stop], dtype=np.float32) @ query
+        if quantized is None:
+            rows_idx = _top_k(scores, k)
+            return rows_idx, scores[rows_idx]
+
+        scores *= scales[:rows]
+        candidates = np.sort(_top_k(scores, k * RESCORE_FACTOR))
+        exact = np.asarray(vectors[candidates]) @ query
+        best = _top_k(exact, k)
+        return candidates[best], exact[best]
+
+    def search(self, query, k=10, exclude_ids=(), exact=False):
+        """
+        Top-k articles by cosine similarity to a query vector
+
+        Returns:
+            List of (article_id, score) pairs, best first
+        """
+        ids, vectors, quantized, scales = self._mapped()
+        rows = len(ids)
+        if rows == 0:
+            return []
+        query = _normalize(query).reshape(-1)
+        want = k + len(exclude_ids)
+
+        index = None if exact else self._ann_index(vectors, rows)
+        if index is not None:
+            candidates = np.sort(np.concatenate([index.candidates(query), np.arange(index.rows, rows)]))
+            scores = np.asarray(vectors[candidates]) @ query
+            best = _top_k(scores, want)
+            rows_idx, top_scores = candidates[best], scores[best]
+        else:
+            rows_idx, top_scores = self._scan(query, vectors, quantized, scales, rows, want)
+
+        excluded = set(exclude_ids)
+        results = [(int(ids[i]), float(s)) for i, s in zip(rows_idx, top_scores) if int(ids[i]) not in excluded]
+        return results[:k]
+
+    def similar(self, text, k=10, exact=False):
+        """Top-k articles for a free-text query"""
+        # Skip loading the embedding model when there is nothing to search
+        if self.count() == 0:
+            return []
+        return self.search(self.encode([text])[0], k, exact=exact)
+
+    def related(self, article_id, k=10, exact=False):
+        """Top-k articles related to an archived article"""
+        ids, vectors = self._mapped()[:2]
+        row = int(np.searchsorted(ids, article_id))
+        if row >= len(ids) or ids[row] != article_id:
+            raise LookupError(f"No embedding for article {article_id}")
+        return self.search(np.asarray(vectors[row]), k, exclude_ids=(article_id,), exact=exact)
+
+# Process-wide embeddings instance
+news_embeddings = NewsEmbeddings(NEWS_EMBEDDINGS_DIR)
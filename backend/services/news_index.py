@@ -0,0 +1,368 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from utils.api_client import make_request
+from utils.config import (
+    NEWS_DB_PATH, NEWS_INGEST_MAX_PAGES, NEWS_INGEST_QUERY,
+    CRYPTOPANIC_API_KEY, CRYPTOPANIC_API_URL,
+    NEWSAPI_API_KEY, NEWSAPI_URL
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    origin TEXT NOT NULL,
+    source TEXT,
+    title TEXT NOT NULL,
+    description TEXT,
+    content TEXT,
+    published_at INTEGER NOT NULL,
+    ingested_at INTEGER NOT NULL,
+    currencies TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_at);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, published_at);
+CREATE INDEX IF NOT EXISTS idx_articles_ingested ON articles (ingested_at);
+
+CREATE TABLE IF NOT EXISTS article_currencies (
+    code TEXT NOT NULL,
+    published_at INTEGER NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    PRIMARY KEY (code, published_at, article_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_article_currencies_article ON article_currencies (article_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, description, content, content='articles', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, description, content)
+    VALUES (new.id, new.title, new.description, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+    VALUES ('delete', old.id, old.title, old.description, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+    VALUES ('delete', old.id, old.title, old.description, old.content);
+    INSERT INTO articles_fts (rowid, title, description, content)
+    VALUES (new.id, new.title, new.description, new.content);
+END;
+
+CREATE TABLE IF NOT EXISTS ingest_cursors (
+    feed TEXT PRIMARY KEY,
+    cursor INTEGER NOT NULL
+);
+"""
+
+ARTICLE_COLUMNS = "a.id, a.url, a.origin, a.source, a.title, a.description, a.content, a.published_at, a.currencies"
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp (as returned by Cryptopanic/NewsAPI) to Unix seconds"""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return None
+
+# Words dropped from "any term" queries, which would otherwise match most of the archive
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it its me of on or
+should tell that the their there this to was what when where which who why will with you
+""".split())
+
+def fts_query(text, match_any=False):
+    """
+    Turn free text into a safe FTS5 query
+
+    By default every word must match; with match_any, any non-stopword
+    may match (for natural-language questions ranked by BM25).
+    """
+    tokens = re.findall(r"\w+", text or "")
+    if match_any:
+        tokens = [token for token in tokens if token.lower() not in STOPWORDS]
+        return " OR ".join(f'"{token}"' for token in tokens)
+    return " ".join(f'"{token}"' for token in tokens)
+
+class NewsIndex:
+    """SQLite archive of news articles with an FTS5 full-text index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- Writes ---
+    def upsert(self, articles):
+        """
+        Insert or update articles in one transaction (keyed by url)
+
+        Args:
+            articles: Dicts with url, origin, source, title, description,
+                content, published_at (Unix seconds) and currencies (codes)
+
+        Returns:
+            Ids of the articles that were new to the archive
+        """
+        rows = [a for a in articles if a.get("url") and a.get("title") and a.get("published_at")]
+        if not rows:
+            return []
+
+        now = int(time.time())
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            urls = [a["url"] for a in rows]
+            existing = set()
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT url FROM articles WHERE url IN ({','.join('?' * len(chunk))})", chunk))
+
+            conn.executemany("""
+                INSERT INTO articles (url, origin, source, title, description, content, published_at, ingested_at, currencies)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    source = excluded.source, title = excluded.title,
+                    description = COALESCE(excluded.description, articles.description),
+                    content = COALESCE(excluded.content, articles.content),
+                    currencies = excluded.currencies
+                WHERE articles.title IS NOT excluded.title
+                   OR articles.currencies IS NOT excluded.currencies
+                   OR (excluded.description IS NOT NULL AND articles.description IS NOT excluded.description)
+                   OR (excluded.content IS NOT NULL AND articles.content IS NOT excluded.content)
+            """, [(
+                a["url"], a.get("origin", "unknown"), a.get("source"), a["title"], a.get("description"),
+                a.get("content"), int(a["published_at"]), now, " ".join(a.get("currencies") or [])
+            ) for a in rows])
+
+            id_rows = []
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                id_rows.extend(conn.execute(
+                    f"SELECT id, url, published_at, currencies FROM articles WHERE url IN ({','.join('?' * len(chunk))})", chunk))
+            ids = [row["id"] for row in id_rows]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                conn.execute(f"DELETE FROM article_currencies WHERE article_id IN ({','.join('?' * len(chunk))})", chunk)
+            conn.executemany(
+                "INSERT OR IGNORE INTO article_currencies (code, published_at, article_id) VALUES (?, ?, ?)",
+                [(code, row["published_at"], row["id"]) for row in id_rows for code in row["currencies"].split()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        new_ids = [row["id"] for row in id_rows if row["url"] not in existing]
+        logger.info(f"Upserted {len(rows)} articles into the news index ({len(new_ids)} new)")
+        return new_ids
+
+    def get_cursor(self, feed):
+        row = self._connection().execute("SELECT cursor FROM ingest_cursors WHERE feed = ?", (feed,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, feed, cursor):
+        self._connection().execute(
+            "INSERT INTO ingest_cursors (feed, cursor) VALUES (?, ?) "
+            "ON CONFLICT (feed) DO UPDATE SET cursor = MAX(cursor, excluded.cursor)",
+            (feed, int(cursor))
+        )
+
+    # --- Reads ---
+    @staticmethod
+    def _row_to_article(row):
+        article = dict(row)
+        article["currencies"] = article["currencies"].split() if article["currencies"] else []
+        return article
+
+    def search(self, query=None, currency=None, source=None, start=None, end=None, limit=20, sort="relevance",
+               match_any=False):
+        """
+        Search the archive
+
+        Args:
+            query: Free-text query matched against title, description and content
+            currency: Currency code filter (e.g. 'BTC')
+            source: Source name filter
+            start, end: Published time range in Unix seconds
+            limit: Maximum number of results
+            sort: 'relevance' (BM25, only with a query) or 'recent'
+            match_any: Match articles containing any query word instead of all
+
+        Returns:
+            List of article dicts (with a `score` when a query is given)
+        """
+        params = []
+        joins = []
+        where = []
+        match = fts_query(query, match_any) if query else ""
+        # With a currency, the time filter and order use the copy of published_at
+        # in the article_currencies key, so the plan walks that index in order
+        published_at = "c.published_at" if currency else "a.published_at"
+
+        if match:
+            joins.append("JOIN articles_fts f ON f.rowid = a.id")
+            where.append("articles_fts MATCH ?")
+            params.append(match)
+        if currency:
+            joins.append("JOIN article_currencies c ON c.article_id = a.id")
+            where.append("c.code = ?")
+            params.append(currency.upper())
+        if source:
+            where.append("a.source = ?")
+            params.append(source)
+        if start is not None:
+            where.append(f"{published_at} >= ?")
+            params.append(int(start))
+        if end is not None:
+            where.append(f"{published_at} <= ?")
+            params.append(int(end))
+
+        if match and sort == "relevance":
+            select = f"SELECT {ARTICLE_COLUMNS}, bm25(articles_fts, 10.0, 3.0, 1.0) AS score"
+            order = "ORDER BY score"
+        else:
+            select = f"SELECT {ARTICLE_COLUMNS}"
+            order = f"ORDER BY {published_at} DESC"
+
+        sql = f"{select} FROM articles a {' '.join(joins)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" {order} LIMIT ?"
+        params.append(int(limit))
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [self._row_to_article(row) for row in rows]
+
+    def get_articles(self, ids):
+        """Fetch articles by id, in the given order"""
+        if not ids:
+            return []
+        found = {}
+        for start in range(0, len(ids), 500):
+            chunk = [int(i) for i in ids[start:start + 500]]
+            for row in self._connection().execute(
+                    f"SELECT {ARTICLE_COLUMNS} FROM articles a WHERE a.id IN ({','.join('?' * len(chunk))})", chunk):
+                found[row["id"]] = self._row_to_article(row)
+        return [found[i] for i in ids if i in found]
+
+    def articles_since(self, after_id, limit=500):
+        """Articles with an id greater than after_id, oldest first (for downstream stages)"""
+        rows = self._connection().execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles a WHERE a.id > ? ORDER BY a.id LIMIT ?",
+            (int(after_id), int(limit))
+        ).fetchall()
+        return [self._row_to_article(row) for row in rows]
+
+    def last_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+# --- Ingestion ---
+def _ingest_cryptopanic(index):
+    feed = "cryptopanic"
+    cursor = index.get_cursor(feed) or 0
+    url = f"{CRYPTOPANIC_API_URL}/posts/"
+    articles = []
+    for page in range(1, NEWS_INGEST_MAX_PAGES + 1):
+        params = {'auth_token': CRYPTOPANIC_API_KEY, 'public': 'true', 'page': page}
+        data = make_request(url, params=params)
+        results = data.get('results', []) if isinstance(data, dict) else []
+        page_articles = [{
+            "url": item.get("url"),
+            "origin": "crypto",
+            "source": (item.get("source") or {}).get("title"),
+            "title": item.get("title"),
+            "description": None,
+            "content": None,
+            "published_at": parse_timestamp(item.get("published_at")),
+            "currencies": [c.get("code") for c in item.get("currencies") or [] if c and c.get("code")],
+        } for item in results]
+        # Articles at the cursor itself are re-read (upserts are idempotent) so
+        # posts sharing the cursor's second are not lost
+        articles.extend(a for a in page_articles if a["published_at"] and a["published_at"] >= cursor)
+        # Results are newest first: stop once we reach what was already ingested
+        if not results or not data.get('next') or any((a["published_at"] or 0) < cursor for a in page_articles):
+            break
+    return feed, articles
+
+def _ingest_newsapi(index):
+    feed = "newsapi"
+    cursor = index.get_cursor(feed)
+    params = {
+        'apiKey': NEWSAPI_API_KEY,
+        'q': NEWS_INGEST_QUERY,
+        'language': 'en',
+        'sortBy': 'publishedAt',
+        'pageSize': 100,
+    }
+    if cursor:
+        params['from'] = datetime.fromtimestamp(cursor, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    data = make_request(f"{NEWSAPI_URL}/everything", params=params, headers={'Accept': 'application/json'})
+    articles = [{
+        "url": item.get("url"),
+        "origin": "world",
+        "source": (item.get("source") or {}).get("name"),
+        "title": item.get("title"),
+        "description": item.get("description"),
+        "content": item.get("content"),
+        "published_at": parse_timestamp(item.get("publishedAt")),
+        "currencies": [],
+    } for item in (data.get('articles', []) if isinstance(data, dict) else [])]
+    return feed, [a for a in articles if a["published_at"] and a["published_at"] >= (cursor or 0)]
+
+def ingest_news(index=None):
+    """
+    Poll every configured feed from its since-cursor and upsert new articles
+
+    Returns:
+        Ids of the articles that were new to the archive
+    """
+    index = index or news_index
+    feeds = []
+    if CRYPTOPANIC_API_KEY:
+        feeds.append(_ingest_cryptopanic)
+    if NEWSAPI_API_KEY:
+        feeds.append(_ingest_newsapi)
+
+    new_ids = []
+    for fetch in feeds:
+        try:
+            feed, articles = fetch(index)
+        except Exception as e:
+            logger.error(f"News ingestion failed for {fetch.__name__}: {e}")
+            continue
+        if articles:
+            new_ids.extend(index.upsert(articles))
+            index.set_cursor(feed, max(a["published_at"] for a in articles))
+    return new_ids
+
+# Process-wide index instance
+news_index = NewsIndex(NEWS_DB_PATH)
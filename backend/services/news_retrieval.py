@@ -0,0 +1,151 @@
+import logging
+import re
+from datetime import datetime, timezone
+import numpy as np
+from utils.config import (
+    NEWS_EMBEDDINGS_ENABLED, NEWS_RETRIEVAL_CANDIDATES,
+    NEWS_RETRIEVAL_KEYWORD_WEIGHT, NEWS_RETRIEVAL_TOKEN_BUDGET
+)
+from services.news_dedup import cluster
+from services.news_index import news_index, fts_query, STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_WORDS = 60  # Maximum words per passage
+MAX_ARTICLES = 8  # Articles considered for the context
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_TRUNCATION_RE = re.compile(r"\s*\[\+\d+ chars\]\s*$")  # NewsAPI content suffix
+_WORD_RE = re.compile(r"\w+")
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English BPE vocabularies)"""
+    return (len(text) + 3) // 4 if text else 0
+
+def split_passages(text, max_words=PASSAGE_WORDS):
+    """Split text into passages of whole sentences, at most max_words each"""
+    passages, current = [], []
+    for sentence in _SENTENCE_RE.split((text or "").strip()):
+        words = sentence.split()
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        # Sentences longer than a passage are cut on word boundaries
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def _terms(text):
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS}
+
+def rank_articles(query, candidates=NEWS_RETRIEVAL_CANDIDATES, keyword_weight=NEWS_RETRIEVAL_KEYWORD_WEIGHT):
+    """
+    Rank archived articles by a hybrid of keyword and embedding scores
+
+    BM25 scores are min-max normalized over the keyword candidates and
+    combined with the cosine similarity of the article embeddings. Without
+    embeddings the keyword score is used alone. A question made only of
+    stopwords has no keyword score, and without embeddings either the most
+    recent articles are returned. Near-duplicate stories keep only the
+    article with the most text, at the story's best score.
+
+    Returns:
+        List of (article, score) pairs, best first
+    """
+    # Only rank rows that matched words of the query (a stopword-only query matches nothing)
+    keyword = news_index.search(query, limit=candidates, match_any=True) if fts_query(query, match_any=True) else []
+    keyword_scores = {}
+    if keyword:
+        bm25 = -np.array([article["score"] for article in keyword])  # FTS5 bm25 is lower-is-better
+        spread = bm25.max() - bm25.min()
+        normalized = (bm25 - bm25.min()) / spread if spread > 0 else np.ones(len(bm25))
+        keyword_scores = {article["id"]: float(score) for article, score in zip(keyword, normalized)}
+
+    semantic_scores = {}
+    if NEWS_EMBEDDINGS_ENABLED:
+        try:
+            from services.news_embeddings import news_embeddings
+            semantic_scores = {i: max(score, 0.0) for i, score in news_embeddings.similar(query, candidates)}
+        except Exception as e:
+            logger.warning(f"Semantic retrieval unavailable, using keyword scores only: {e}")
+    if not semantic_scores:
+        keyword_weight = 1.0
+    if not keyword and not semantic_scores:
+        # Nothing to rank on: most recent first
+        keyword = news_index.search(limit=candidates, sort="recent")
+        keyword_scores = {article["id"]: 1.0 / (1 + rank) for rank, article in enumerate(keyword)}
+
+    articles = {article["id"]: article for article in keyword}
+    missing = [i for i in semantic_scores if i not in articles]
+    articles.update((article["id"], article) for article in news_index.get_articles(missing))
+
+    scored = [
+        (article, keyword_weight * keyword_scores.get(i, 0.0) + (1.0 - keyword_weight) * semantic_scores.get(i, 0.0))
+        for i, article in articles.items()
+    ]
+    scored = [item for item in scored if item[1] > 0]
+
+    # One article per story: the one with the most text, at the story's best score
+    ranked = []
+    for members in cluster([article["title"] for article, _ in scored]):
+        canonical = max(members, key=lambda i: len(scored[i][0].get("content") or "") + len(scored[i][0].get("description") or ""))
+        ranked.append((scored[canonical][0], max(scored[i][1] for i in members)))
+    ranked.sort(key=lambda item: -item[1])
+    return ranked
+
+def _header(number, article):
+    published = datetime.fromtimestamp(article["published_at"], tz=timezone.utc).strftime("%Y-%m-%d")
+    return f"[{number}] {article['title']} ({article.get('source') or 'unknown source'}, {published}) {article['url']}"
+
+def build_context(query, token_budget=NEWS_RETRIEVAL_TOKEN_BUDGET, max_articles=MAX_ARTICLES):
+    """
+    Pack the most relevant passages of the best-ranked articles into a
+    context of at most token_budget (estimated) tokens
+
+    Passages are scored by their article's hybrid score, boosted by the
+    share of query terms they contain, and added greedily. Each article
+    included costs its header line (title, source, date, url) once.
+    Articles are listed in rank order with their passages in text order.
+
+    Returns:
+        Context text ('' when nothing matches)
+    """
+    ranked = rank_articles(query)[:max_articles]
+    terms = _terms(query)
+
+    candidates = []
+    for rank, (article, score) in enumerate(ranked):
+        body = " ".join(filter(None, [
+            article.get("description"),
+            _TRUNCATION_RE.sub("", article.get("content") or ""),
+        ]))
+        passages = split_passages(body)
+        if not passages:
+            # Feeds without a body (Cryptopanic) contribute their headline only
+            candidates.append((score, rank, -1, ""))
+        for position, passage in enumerate(passages):
+            overlap = len(terms & _terms(passage)) / len(terms) if terms else 0.0
+            candidates.append((score * (0.7 + 0.3 * overlap), rank, position, passage))
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+    remaining = token_budget
+    selected = {}
+    for _, rank, position, passage in candidates:
+        cost = estimate_tokens(passage) + 1
+        if rank not in selected:
+            cost += estimate_tokens(_header(len(selected) + 1, ranked[rank][0])) + 1
+        if cost > remaining:
+            continue
+        remaining -= cost
+        selected.setdefault(rank, []).append((position, passage))
+
+    blocks = []
+    for number, rank in enumerate(sorted(selected), start=1):
+        passages = [passage for _, passage in sorted(selected[rank]) if passage]
+        blocks.append("\n".join([_header(number, ranked[rank][0])] + ([" ".join(passages)] if passages else [])))
+    logger.info(f"Built news context with {len(blocks)} articles (~{token_budget - remaining} tokens)")
+    return "\n\n".join(blocks)
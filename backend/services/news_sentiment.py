@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from utils.admission import admit, BACKGROUND
+from utils.api_client import make_request
+from utils.config import (
+    NEWS_DB_PATH, NEWS_SENTIMENT_BATCH_SIZE, SENTIMENT_MODEL,
+    HUGGINGFACE_API_KEY, HUGGINGFACE_INFERENCE_API_URL
+)
+
+logger = logging.getLogger(__name__)
+
+# Decay time constants of the rolling aggregates; "all" never decays
+WINDOWS = {"1h": 3600, "24h": 86400, "7d": 604800, "all": None}
+MARKET = "ALL"  # Aggregate over every article, with or without currency codes
+MAX_TEXT_CHARS = 1000  # Longer texts are cut before inference
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_cache (
+    text_hash BLOB PRIMARY KEY,
+    label TEXT NOT NULL,
+    score REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS article_sentiment (
+    article_id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    score REAL NOT NULL,
+    scored_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS currency_sentiment (
+    code TEXT NOT NULL,
+    span TEXT NOT NULL,
+    weight REAL NOT NULL,
+    weighted_sum REAL NOT NULL,
+    last_ts INTEGER NOT NULL,
+    PRIMARY KEY (code, span)
+) WITHOUT ROWID;
+"""
+
+def sentiment_text(article):
+    return " ".join(filter(None, [article.get("title"), article.get("description")]))[:MAX_TEXT_CHARS]
+
+def _text_hash(text):
+    return hashlib.blake2b(f"{SENTIMENT_MODEL}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+def normalize_prediction(prediction):
+    """
+    Turn label/score pairs into (label, signed score in [-1, 1])
+
+    The signed score is P(positive) - P(negative); labels are normalized to
+    POSITIVE/NEGATIVE/NEUTRAL as in the sentiment endpoint.
+    """
+    positive = sum(p["score"] for p in prediction if "POS" in p["label"].upper())
+    negative = sum(p["score"] for p in prediction if "NEG" in p["label"].upper())
+    top = max(prediction, key=lambda p: p["score"])["label"].upper()
+    label = "POSITIVE" if "POS" in top else "NEGATIVE" if "NEG" in top else "NEUTRAL"
+    return label, positive - negative
+
+class DecayedMean:
+    """
+    Exponentially decayed count and mean of timestamped scores, O(1) per update
+
+    Each score is weighted exp(-age / tau). Scores older than the latest
+    one are weighted by their age at insertion, so arrival order does not
+    matter. With tau None nothing decays (plain count and mean).
+    """
+
+    __slots__ = ("tau", "weight", "weighted_sum", "last_ts")
+
+    def __init__(self, tau, weight=0.0, weighted_sum=0.0, last_ts=None):
+        self.tau = tau
+        self.weight = weight
+        self.weighted_sum = weighted_sum
+        self.last_ts = last_ts
+
+    def _factor(self, age):
+        return 1.0 if self.tau is None else math.exp(-max(age, 0) / self.tau)
+
+    def add(self, ts, score):
+        if self.last_ts is None or ts >= self.last_ts:
+            factor = self._factor(ts - self.last_ts) if self.last_ts is not None else 1.0
+            self.weight = self.weight * factor + 1.0
+            self.weighted_sum = self.weighted_sum * factor + score
+            self.last_ts = ts
+        else:
+            factor = self._factor(self.last_ts - ts)
+            self.weight += factor
+            self.weighted_sum += factor * score
+
+    def at(self, now):
+        """(decayed count, mean) as of `now`"""
+        if not self.weight:
+            return 0.0, None
+        factor = self._factor(now - self.last_ts)
+        return self.weight * factor, self.weighted_sum / self.weight
+
+class NewsSentiment:
+    """
+    Sentiment of archived articles with rolling aggregates per currency
+
+    Scores and aggregates live next to the articles in the news database.
+    Predictions are cached by text, so re-reported headlines are not scored
+    twice, and aggregates are updated in the same transaction as the scores.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- Scoring ---
+    @staticmethod
+    def _score_batch(texts):
+        """Score texts with one Hugging Face inference request"""
+        url = f"{HUGGINGFACE_INFERENCE_API_URL}{SENTIMENT_MODEL}"
+        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+        # Background batches yield to interactive sentiment requests
+        with admit("sentiment", priority=BACKGROUND):
+            start_time = time.time()
+            try:
+                data = make_request(url, headers=headers, method='POST', json_data={"inputs": texts})
+                if not isinstance(data, list) or len(data) != len(texts) or not all(isinstance(p, list) and p for p in data):
+                    raise ValueError(f"Unexpected response format from sentiment model: {str(data)[:200]}")
+            except Exception:
+                from routes.llm import update_metrics
+                update_metrics("sentiment", time.time() - start_time, error=True)
+                raise
+        from routes.llm import update_metrics
+        update_metrics("sentiment", time.time() - start_time)
+        return [normalize_prediction(prediction) for prediction in data]
+
+    def _predict(self, conn, texts):
+        """Predictions for texts, from the cache or in batches from the model"""
+        hashes = [_text_hash(text) for text in texts]
+        cached = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            for row in conn.execute(
+                    f"SELECT text_hash, label, score FROM sentiment_cache WHERE text_hash IN ({','.join('?' * len(chunk))})", chunk):
+                cached[row["text_hash"]] = (row["label"], row["score"])
+
+        misses = list({h: text for h, text in zip(hashes, texts) if h not in cached}.items())
+        fresh = {}
+        for start in range(0, len(misses), NEWS_SENTIMENT_BATCH_SIZE):
+            batch = misses[start:start + NEWS_SENTIMENT_BATCH_SIZE]
+            for (text_hash, _), prediction in zip(batch, self._score_batch([text for _, text in batch])):
+                fresh[text_hash] = prediction
+        cached.update(fresh)
+        return [cached[h] for h in hashes], fresh
+
+    def score_pending(self, index=None, batch_size=256):
+        """
+        Score every archived article that has no sentiment yet and fold it
+        into the rolling aggregates of its currencies
+
+        Returns:
+            Number of articles scored
+        """
+        if not HUGGINGFACE_API_KEY:
+            logger.warning("Hugging Face API key not configured, skipping news sentiment")
+            return 0
+        if index is None:
+            from services.news_index import news_index as index
+
+        conn = self._connection()
+        last_id = conn.execute("SELECT COALESCE(MAX(article_id), 0) FROM article_sentiment").fetchone()[0]
+        total = 0
+        while True:
+            articles = index.articles_since(last_id, batch_size)
+            if not articles:
+                break
+            predictions, fresh = self._predict(conn, [sentiment_text(a) for a in articles])
+            self._commit(conn, articles, predictions, fresh)
+            last_id = articles[-1]["id"]
+            total += len(articles)
+
+        if total:
+            logger.info(f"Scored sentiment of {total} news articles")
+        return total
+
+    def _commit(self, conn, articles, predictions, fresh):
+        now = int(time.time())
+        codes = {MARKET} | {code for article in articles for code in article["currencies"]}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            aggregates = {}
+            code_list = sorted(codes)
+            for row in conn.execute(
+                    f"SELECT * FROM currency_sentiment WHERE code IN ({','.join('?' * len(code_list))})", code_list):
+                aggregates[(row["code"], row["span"])] = DecayedMean(
+                    WINDOWS.get(row["span"]), row["weight"], row["weighted_sum"], row["last_ts"])
+
+            for article, (_, score) in zip(articles, predictions):
+                for code in [MARKET] + article["currencies"]:
+                    for span, tau in WINDOWS.items():
+                        aggregates.setdefault((code, span), DecayedMean(tau)).add(article["published_at"], score)
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (text_hash, label, score) VALUES (?, ?, ?)",
+                [(text_hash, label, score) for text_hash, (label, score) in fresh.items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO article_sentiment (article_id, label, score, scored_at) VALUES (?, ?, ?, ?)",
+                [(article["id"], label, score, now) for article, (label, score) in zip(articles, predictions)]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO currency_sentiment (code, span, weight, weighted_sum, last_ts) VALUES (?, ?, ?, ?, ?)",
+                [(code, span, agg.weight, agg.weighted_sum, agg.last_ts) for (code, span), agg in aggregates.items()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Reads ---
+    def aggregates(self, currency=None, now=None):
+        """
+        Rolling sentiment per currency as of `now`
+
+        Returns:
+            Dict of currency code -> {window: {"count", "mean"}, "last_article_at"}
+        """
+        now = now or time.time()
+        sql = "SELECT * FROM currency_sentiment"
+        params = ()
+        if currency:
+            sql += " WHERE code = ?"
+            params = (currency.upper(),)
+
+        result = {}
+        for row in self._connection().execute(sql, params):
+            agg = DecayedMean(WINDOWS.get(row["span"]), row["weight"], row["weighted_sum"], row["last_ts"])
+            count, mean = agg.at(now)
+            entry = result.setdefault(row["code"], {"windows": {}, "last_article_at": row["last_ts"]})
+            entry["windows"][row["span"]] = {
+                "count": int(count) if row["span"] == "all" else round(count, 2),
+                "mean": None if mean is None else round(mean, 4),
+            }
+            entry["last_article_at"] = max(entry["last_article_at"], row["last_ts"])
+        return result
+
+# Process-wide instance
+news_sentiment = NewsSentiment(NEWS_DB_PATH)
@@ -0,0 +1,237 @@
+import fcntl
+import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+from utils.config import PORTFOLIO_STORE_DIR, PORTFOLIO_TRACKED, PORTFOLIO_MAX_TRACKED
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+TRACKED_KEY = "portfolio:tracked"
+ADDRESS_RE = re.compile(r"^0x[0-9a-f]{40}$")
+SYMBOL_RE = re.compile(r"^[A-Za-z0-9._-]{1,32}$")
+
+def fill_forward(prices):
+    """Replace missing (zero) prices by the previous known one"""
+    known = np.where(prices > 0, np.arange(len(prices)), 0)
+    np.maximum.accumulate(known, out=known)
+    return prices[known]
+
+class PortfolioSeries:
+    """
+    Valuation snapshots of one address as fixed-width column files
+
+    Every snapshot is a row: the timestamp (int64) plus the balance and USD
+    price (float64) of each asset, one append-only file per column. An
+    asset seen for the first time gets zero-filled columns for the earlier
+    rows, so all columns stay aligned and can be memory-mapped as arrays.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def symbols(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".balance.bin")] for name in os.listdir(self.directory) if name.endswith(".balance.bin"))
+
+    def _column_names(self):
+        return ["ts"] + [f"{symbol}.{field}" for symbol in self.symbols() for field in ("balance", "price")]
+
+    def _row_count(self):
+        # The timestamp is written last, so it bounds the complete rows
+        path = self._path("ts")
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _read(self, name, rows, dtype):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,))
+
+    def last_timestamp(self):
+        rows = self._row_count()
+        return int(self._read("ts", rows, np.int64)[-1]) if rows else None
+
+    def append(self, ts, holdings):
+        """
+        Append one snapshot
+
+        Args:
+            ts: Unix seconds (snapshots at or before the last one are ignored)
+            holdings: Dict of symbol -> (balance, USD price)
+
+        Returns:
+            True if the row was written
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # Serialize writers across processes
+        with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            rows = self._row_count()
+            self._truncate_partial_rows(rows)
+            if rows and int(self._read("ts", rows, np.int64)[-1]) >= ts:
+                return False
+
+            symbols = set(self.symbols()) | set(holdings)
+            for symbol in sorted(symbols):
+                balance, price = holdings.get(symbol, (0.0, 0.0))
+                if not price > 0 and rows and os.path.exists(self._path(f"{symbol}.price")):
+                    # Unknown price (asset withdrawn, or no quote): carry the
+                    # last one forward, so the change is not booked as a market move
+                    price = float(self._read(f"{symbol}.price", rows, np.float64)[-1])
+                for field, value in (("balance", balance), ("price", price)):
+                    path = self._path(f"{symbol}.{field}")
+                    with open(path, "ab") as f:
+                        if f.tell() == 0 and rows:
+                            # New asset: align it with the earlier snapshots
+                            f.write(np.zeros(rows, dtype=np.float64).tobytes())
+                        f.write(np.float64(value).tobytes())
+            with open(self._path("ts"), "ab") as f:
+                f.write(np.int64(ts).tobytes())
+            return True
+
+    def _truncate_partial_rows(self, rows):
+        """Drop column tails left behind by an interrupted append"""
+        for name in self._column_names()[1:]:
+            path = self._path(name)
+            if os.path.getsize(path) > rows * 8:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * 8)
+
+    def history(self, start=None, end=None, resolution=None):
+        """
+        Valuation, P&L and allocation between start and end (inclusive)
+
+        P&L is the change in value since the first snapshot of the range;
+        market P&L is the part due to price moves (the previous balance
+        times the price change, summed), and net flows the remainder
+        (deposits and withdrawals). With a resolution (seconds) the last
+        snapshot of each bucket is returned; aggregates always use every
+        snapshot.
+
+        Returns:
+            Dict with points and summary, or None if there is no snapshot in range
+        """
+        with self._lock:
+            rows = self._row_count()
+            ts = self._read("ts", rows, np.int64)
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = rows if end is None else int(np.searchsorted(ts, end, side="right"))
+            if hi <= lo:
+                return None
+            ts = np.asarray(ts[lo:hi])
+            symbols = self.symbols()
+            balances = {s: np.asarray(self._read(f"{s}.balance", rows, np.float64)[lo:hi]) for s in symbols}
+            prices = {s: fill_forward(np.asarray(self._read(f"{s}.price", rows, np.float64)[lo:hi])) for s in symbols}
+
+        values = {s: balances[s] * prices[s] for s in symbols}
+        total = np.sum([values[s] for s in symbols], axis=0) if symbols else np.zeros(len(ts))
+        market = np.zeros(len(ts))
+        for s in symbols:
+            market[1:] += balances[s][:-1] * np.diff(prices[s])
+        market_pnl = np.cumsum(market)
+        pnl = total - total[0]
+        peak = np.maximum.accumulate(total)
+        drawdown = np.where(peak > 0, (peak - total) / np.where(peak > 0, peak, 1), 0.0)
+
+        picks = np.arange(len(ts))
+        if resolution and resolution > 1:
+            buckets = ts // resolution
+            picks = np.flatnonzero(np.r_[buckets[1:] != buckets[:-1], True])
+
+        points = []
+        for i in picks:
+            value = float(total[i])
+            points.append({
+                "ts": int(ts[i]),
+                "total_value_usd": value,
+                "pnl_usd": float(pnl[i]),
+                "market_pnl_usd": float(market_pnl[i]),
+                "allocation": {s: round(float(values[s][i]) / value, 6) for s in symbols if value > 0 and values[s][i] > 0},
+            })
+        start_value, end_value = float(total[0]), float(total[-1])
+        return {
+            "points": points,
+            "summary": {
+                "snapshots": len(ts),
+                "start": int(ts[0]),
+                "end": int(ts[-1]),
+                "start_value_usd": start_value,
+                "end_value_usd": end_value,
+                "pnl_usd": end_value - start_value,
+                "pnl_percent": (end_value - start_value) / start_value * 100 if start_value else None,
+                "market_pnl_usd": float(market_pnl[-1]),
+                "net_flows_usd": end_value - start_value - float(market_pnl[-1]),
+                "high_usd": float(total.max()),
+                "low_usd": float(total.min()),
+                "max_drawdown_percent": float(drawdown.max()) * 100,
+            },
+        }
+
+class PortfolioStore:
+    """Snapshot series of tracked addresses under PORTFOLIO_STORE_DIR"""
+
+    def __init__(self, root):
+        self.root = root
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, address):
+        address = address.lower()
+        if not ADDRESS_RE.match(address):
+            raise ValueError(f"Invalid Ethereum address: {address}")
+        with self._lock:
+            if address not in self._series:
+                self._series[address] = PortfolioSeries(os.path.join(self.root, address))
+            return self._series[address]
+
+    def track(self, address):
+        """Add an address to the snapshot job (addresses viewed least recently are dropped)"""
+        address = address.lower()
+        if not ADDRESS_RE.match(address):
+            return
+
+        def apply(tracked):
+            tracked[address] = int(time.time())
+            for old in sorted(tracked, key=tracked.get)[:max(len(tracked) - PORTFOLIO_MAX_TRACKED, 0)]:
+                del tracked[old]
+            return tracked
+        shared_store.update(TRACKED_KEY, apply, default={})
+
+    def tracked(self):
+        addresses = [a.lower() for a in PORTFOLIO_TRACKED] + list(shared_store.get(TRACKED_KEY) or {})
+        return list(dict.fromkeys(a for a in addresses if ADDRESS_RE.match(a)))
+
+    def snapshot(self, address, portfolio, ts=None):
+        """Store a valuation as returned by routes.portfolio.fetch_portfolio"""
+        holdings = {
+            asset["symbol"]: (float(asset["balance"]), float(asset["value_usd"]) / float(asset["balance"]))
+            for asset in portfolio["assets"]
+            if SYMBOL_RE.match(asset.get("symbol") or "") and asset["balance"]
+        }
+        return self.series(address).append(int(ts or time.time()), holdings)
+
+def snapshot_portfolios():
+    """Value every tracked address and append a snapshot (portfolio job)"""
+    from routes.portfolio import fetch_portfolio
+
+    taken = 0
+    for address in portfolio_store.tracked():
+        try:
+            if portfolio_store.snapshot(address, fetch_portfolio(address)):
+                taken += 1
+        except Exception as e:
+            logger.error(f"Portfolio snapshot of {address} failed: {e}")
+    if taken:
+        logger.info(f"Stored {taken} portfolio snapshots")
+    return taken
+
+# Process-wide store instance
+portfolio_store = PortfolioStore(PORTFOLIO_STORE_DIR)
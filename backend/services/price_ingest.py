@@ -0,0 +1,81 @@
+import argparse
+import logging
+import time
+from utils.api_client import make_request
+from utils.config import COINGECKO_API_URL, PRICE_ASSETS, PRICE_BACKFILL_DAYS, PRICE_INGEST_INTERVAL
+from services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+def backfill_asset(asset, days=PRICE_BACKFILL_DAYS):
+    """
+    Load price history for an asset from CoinGecko market_chart
+
+    CoinGecko only returns close prices and rolling 24h volumes, so each row
+    gets open = high = low = close. Granularity depends on the range
+    (5-minute for 1 day, hourly up to 90 days, daily beyond).
+    """
+    url = f"{COINGECKO_API_URL}/coins/{asset}/market_chart"
+    params = {'vs_currency': 'usd', 'days': days}
+    data = make_request(url, params=params)
+    prices = data.get('prices', []) if isinstance(data, dict) else []
+    if not prices:
+        logger.warning(f"No price history returned for {asset}")
+        return 0
+
+    volumes = {int(point[0]) // 1000: point[1] for point in data.get('total_volumes', [])}
+    ts = [int(point[0]) // 1000 for point in prices]
+    close = [float(point[1]) for point in prices]
+    volume = [float(volumes.get(t, 0) or 0) for t in ts]
+    return price_store.append(asset, ts, close, close, close, close, volume)
+
+def poll_latest(assets):
+    """Append the current price of every asset with one batched simple/price call"""
+    url = f"{COINGECKO_API_URL}/simple/price"
+    params = {
+        'ids': ",".join(assets),
+        'vs_currencies': 'usd',
+        'include_24hr_vol': 'true',
+        'include_last_updated_at': 'true'
+    }
+    data = make_request(url, params=params)
+    written = 0
+    for asset in assets:
+        quote = data.get(asset) if isinstance(data, dict) else None
+        if not quote or 'usd' not in quote:
+            logger.warning(f"No current price returned for {asset}")
+            continue
+        ts = int(quote.get('last_updated_at') or time.time())
+        price = float(quote['usd'])
+        volume = float(quote.get('usd_24h_vol') or 0)
+        written += price_store.append(asset, [ts], [price], [price], [price], [price], [volume])
+    return written
+
+def run_ingestion(assets=None):
+    """Backfill assets that have no history yet, then append the latest prices"""
+    assets = assets or PRICE_ASSETS
+    for asset in assets:
+        if price_store.series(asset).last_timestamp() is None:
+            try:
+                backfill_asset(asset)
+            except Exception as e:
+                logger.error(f"Price backfill failed for {asset}: {e}")
+    return poll_latest(assets)
+
+if __name__ == "__main__":
+    # Usage: python -m services.price_ingest [--assets bitcoin,ethereum] [--backfill-days 90] [--loop]
+    parser = argparse.ArgumentParser(description="Ingest prices into the local price store")
+    parser.add_argument("--assets", default=",".join(PRICE_ASSETS))
+    parser.add_argument("--backfill-days", type=int, default=None, help="Force a backfill of this many days")
+    parser.add_argument("--loop", action="store_true", help="Keep polling every PRICE_INGEST_INTERVAL seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asset_list = [asset.strip() for asset in args.assets.split(",") if asset.strip()]
+    if args.backfill_days:
+        for asset_id in asset_list:
+            backfill_asset(asset_id, args.backfill_days)
+    run_ingestion(asset_list)
+    while args.loop:
+        time.sleep(PRICE_INGEST_INTERVAL or 60)
+        run_ingestion(asset_list)
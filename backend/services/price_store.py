@@ -0,0 +1,199 @@
+import fcntl
+import logging
+import os
+import re
+import threading
+import numpy as np
+from utils.config import PRICE_ASSETS, PRICE_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# One append-only binary file per column, per asset
+COLUMNS = {
+    "ts": np.int64,  # Unix seconds, strictly increasing
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+VALUE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+RESOLUTIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+ASSET_RE = re.compile(r"^[a-z0-9][a-z0-9._-]{0,63}$")
+
+def parse_resolution(value):
+    """Parse a resolution like '1m', '15m', '4h', '1d' or a number of seconds"""
+    value = str(value).strip().lower()
+    if value.isdigit():
+        seconds = int(value)
+    else:
+        match = re.fullmatch(r"(\d+)([smhdw])", value)
+        if not match:
+            raise ValueError(f"Invalid resolution: {value}")
+        seconds = int(match.group(1)) * RESOLUTIONS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"Invalid resolution: {value}")
+    return seconds
+
+class AssetSeries:
+    """Columnar OHLCV series of a single asset, memory-mapped for reads"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._mapped_rows = -1
+
+    def _path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def _row_count(self):
+        # Value columns are written before timestamps, so the shortest column
+        # bounds the rows that are complete
+        counts = []
+        for column, dtype in COLUMNS.items():
+            path = self._path(column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        return min(counts)
+
+    def columns(self):
+        """Return memory-mapped column arrays, remapping if the files grew"""
+        rows = self._row_count()
+        with self._lock:
+            if rows != self._mapped_rows:
+                if rows == 0:
+                    self._maps = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+                else:
+                    self._maps = {
+                        column: np.memmap(self._path(column), dtype=dtype, mode="r", shape=(rows,))
+                        for column, dtype in COLUMNS.items()
+                    }
+                self._mapped_rows = rows
+            return self._maps
+
+    def last_timestamp(self):
+        ts = self.columns()["ts"]
+        return int(ts[-1]) if len(ts) else None
+
+    def append(self, ts, open_, high, low, close, volume):
+        """
+        Append rows (arrays of equal length, sorted by timestamp)
+
+        Rows at or before the last stored timestamp are dropped, so
+        re-running an ingestion is idempotent. Returns the number of rows
+        written.
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        values = {
+            "open": np.asarray(open_, dtype=np.float64),
+            "high": np.asarray(high, dtype=np.float64),
+            "low": np.asarray(low, dtype=np.float64),
+            "close": np.asarray(close, dtype=np.float64),
+            "volume": np.asarray(volume, dtype=np.float64),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Serialize writers across processes
+        with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._truncate_partial_rows()
+
+            last = self.last_timestamp()
+            order = np.argsort(ts, kind="stable")
+            ts = ts[order]
+            keep = np.ones(len(ts), dtype=bool)
+            keep[1:] = ts[1:] > ts[:-1]  # drop duplicate timestamps within the batch
+            if last is not None:
+                keep &= ts > last
+            if not keep.any():
+                return 0
+
+            for column in VALUE_COLUMNS:
+                with open(self._path(column), "ab") as f:
+                    f.write(values[column][order][keep].tobytes())
+            with open(self._path("ts"), "ab") as f:
+                f.write(ts[keep].tobytes())
+            return int(keep.sum())
+
+    def _truncate_partial_rows(self):
+        """Drop column tails left behind by an interrupted append"""
+        rows = self._row_count()
+        for column, dtype in COLUMNS.items():
+            path = self._path(column)
+            expected = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+
+    def query(self, start=None, end=None, resolution=None):
+        """
+        Return OHLCV columns between start and end (inclusive, Unix seconds)
+
+        When resolution (seconds) is given, rows are aggregated into buckets
+        aligned to multiples of it: first open, max high, min low, last close
+        and summed volume.
+        """
+        cols = self.columns()
+        ts = cols["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+        if hi <= lo:
+            return {column: [] for column in COLUMNS}
+
+        ts = ts[lo:hi]
+        if not resolution or resolution <= 1:
+            return {column: np.asarray(cols[column][lo:hi]) for column in COLUMNS}
+
+        buckets = ts // resolution
+        # Index of the first row of every bucket (ts is sorted, so buckets are too)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        return {
+            "ts": buckets[starts] * resolution,
+            "open": np.asarray(cols["open"][lo:hi])[starts],
+            "high": np.maximum.reduceat(cols["high"][lo:hi], starts),
+            "low": np.minimum.reduceat(cols["low"][lo:hi], starts),
+            "close": np.asarray(cols["close"][lo:hi])[ends],
+            "volume": np.add.reduceat(cols["volume"][lo:hi], starts),
+        }
+
+class PriceStore:
+    """Collection of per-asset columnar series under PRICE_STORE_DIR"""
+
+    def __init__(self, root):
+        self.root = root
+        self._series = {}
+        self._known = {a.lower() for a in PRICE_ASSETS}
+        self._lock = threading.Lock()
+
+    def series(self, asset):
+        asset = asset.lower()
+        if not ASSET_RE.match(asset):
+            raise ValueError(f"Invalid asset id: {asset}")
+        with self._lock:
+            series = self._series.get(asset)
+            if series is None:
+                series = AssetSeries(os.path.join(self.root, asset))
+                # Ids from query strings are unbounded: only keep known assets
+                if asset in self._known or os.path.isdir(series.directory):
+                    self._series[asset] = series
+            return series
+
+    def assets(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def append(self, asset, ts, open_, high, low, close, volume):
+        written = self.series(asset).append(ts, open_, high, low, close, volume)
+        if written:
+            logger.info(f"Appended {written} price rows for {asset}")
+        return written
+
+    def query(self, asset, start=None, end=None, resolution=None):
+        return self.series(asset).query(start, end, resolution)
+
+# Process-wide store instance
+price_store = PriceStore(PRICE_STORE_DIR)
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from utils.api_client import make_request
+from utils.config import (
+    HUGGINGFACE_API_KEY, HUGGINGFACE_INFERENCE_API_URL,
+    SUMMARIZATION_CHUNK_TOKENS, SUMMARIZATION_MAX_TOKENS,
+    SUMMARIZATION_PARALLELISM, SUMMARIZATION_CACHE_TTL
+)
+from utils.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PARAMS = {"max_length": 150, "min_length": 30}  # Final summary length (tokens)
+MIN_PARTIAL_LENGTH = 60  # Shortest partial summary requested per chunk
+MAX_REDUCE_LEVELS = 3  # Partial summaries are combined at most this many times
+
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*\s+")
+_WORD_RE = re.compile(r"\S+")
+
+_tokenizers = {}
+_tokenizer_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def get_tokenizer(model_id):
+    """
+    Fast tokenizer of the model, loaded on first use (heavy import)
+
+    Returns None when transformers is missing or the tokenizer cannot be
+    loaded (e.g. offline); callers then fall back to estimated counts.
+    """
+    if model_id not in _tokenizers:
+        with _tokenizer_lock:
+            if model_id not in _tokenizers:
+                tokenizer = None
+                try:
+                    from transformers import AutoTokenizer
+                    logger.info(f"Loading tokenizer of {model_id}")
+                    tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+                    if not tokenizer.is_fast:
+                        # Offsets (needed to cut the text) are only available on fast tokenizers
+                        tokenizer = None
+                except Exception as e:
+                    logger.warning(f"Tokenizer of {model_id} unavailable, estimating token counts: {e}")
+                _tokenizers[model_id] = tokenizer
+    return _tokenizers[model_id]
+
+def token_ends(text, model_id):
+    """
+    Character offset where each token of text ends
+
+    Uses the model tokenizer when available, otherwise about 4 characters
+    per token within each word.
+    """
+    tokenizer = get_tokenizer(model_id)
+    if tokenizer is not None:
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return [end for _, end in encoding["offset_mapping"]]
+    ends = []
+    for match in _WORD_RE.finditer(text):
+        ends.extend([match.end()] * max(1, (len(match.group()) + 3) // 4))
+    return ends
+
+def split_chunks(text, model_id, chunk_tokens=SUMMARIZATION_CHUNK_TOKENS, max_tokens=SUMMARIZATION_MAX_TOKENS):
+    """
+    Split text into chunks of at most chunk_tokens model tokens
+
+    Chunks end on sentence boundaries where possible (on a word boundary for
+    sentences longer than a chunk). Text beyond max_tokens is dropped.
+
+    Returns:
+        (chunks, token count of the whole text, truncated flag)
+    """
+    ends = token_ends(text, model_id)
+    total = len(ends)
+    truncated = total > max_tokens
+    if truncated:
+        ends = ends[:max_tokens]
+    if not ends:
+        return [], total, truncated
+    limit = ends[-1]
+    boundaries = [match.end() for match in _SENTENCE_END_RE.finditer(text, 0, limit)]
+
+    chunks, start, first = [], 0, 0
+    while first < len(ends):
+        last = first + chunk_tokens
+        if last >= len(ends):
+            cut = limit
+        else:
+            cut = ends[last - 1]
+            sentence = bisect_right(boundaries, cut) - 1
+            if sentence >= 0 and boundaries[sentence] > start:
+                cut = boundaries[sentence]
+            else:
+                space = text.rfind(" ", start, cut)
+                cut = space + 1 if space > start else cut
+        chunk = text[start:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = cut
+        first = max(bisect_right(ends, cut), first + 1)
+    return chunks, total, truncated
+
+def _get_executor():
+    """Thread pool shared by the requests of this process (recreated after a fork)"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=SUMMARIZATION_PARALLELISM, thread_name_prefix="summarize")
+                _executor_pid = os.getpid()
+    return _executor
+
+def _cache_key(model_id, params, text):
+    digest = hashlib.blake2b(f"{model_id}\0{sorted(params.items())}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+    return digest
+
+def summarize_chunk(text, model_id, params=SUMMARY_PARAMS):
+    """
+    Summarize one chunk with the Hugging Face Inference API (cached by content)
+
+    Returns:
+        (summary, cached flag)
+
+    Raises:
+        ValueError: The model returned an unexpected response
+    """
+    computed = []
+
+    def produce():
+        url = f"{HUGGINGFACE_INFERENCE_API_URL}{model_id}"
+        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+        payload = {"inputs": text, "parameters": params}
+        summary_data = make_request(url, headers=headers, method='POST', json_data=payload)
+        if not isinstance(summary_data, list) or not summary_data:
+            raise ValueError(f"Unexpected response format from summarization model: {summary_data}")
+        computed.append(True)
+        return summary_data[0].get('summary_text', '')
+
+    # Identical chunks summarized concurrently (on any node) share one call
+    summary = cache.get_or_set("summaries", _cache_key(model_id, params, text), produce, ttl=SUMMARIZATION_CACHE_TTL)
+    return summary, not computed
+
+def summarize(text, model_id):
+    """
+    Map-reduce summary of a text of any length
+
+    The text (up to SUMMARIZATION_MAX_TOKENS tokens) is split into chunks
+    that fit the model input, the chunks are summarized in parallel and the
+    partial summaries are summarized again until they fit in one call.
+    Short texts take a single call, as before.
+
+    Returns:
+        Dict with summary, chunks, cached_chunks, tokens and truncated
+    """
+    chunks, total, truncated = split_chunks(text, model_id)
+    stats = {"chunks": len(chunks), "cached_chunks": 0, "tokens": total, "truncated": truncated}
+    if truncated:
+        logger.info(f"Summarizing the first {SUMMARIZATION_MAX_TOKENS} of {total} tokens")
+
+    for level in range(MAX_REDUCE_LEVELS):
+        if len(chunks) <= 1:
+            break
+        # Shorter partial summaries when there are many, so they fit in one reduce call
+        max_length = max(MIN_PARTIAL_LENGTH, min(SUMMARY_PARAMS["max_length"], SUMMARIZATION_CHUNK_TOKENS // len(chunks)))
+        params = {"max_length": max_length, "min_length": min(SUMMARY_PARAMS["min_length"], max_length // 2)}
+        results = list(_get_executor().map(lambda chunk: summarize_chunk(chunk, model_id, params), chunks))
+        stats["cached_chunks"] += sum(cached for _, cached in results)
+        logger.info(f"Summarized {len(chunks)} chunks (level {level + 1}, {sum(c for _, c in results)} cached)")
+        combined = " ".join(summary for summary, _ in results if summary)
+        chunks, _, _ = split_chunks(combined, model_id)
+
+    # After MAX_REDUCE_LEVELS only the first chunk of the partial summaries is kept
+    summary, cached = summarize_chunk(chunks[0] if chunks else text.strip(), model_id)
+    stats["cached_chunks"] += cached
+    return dict(stats, summary=summary)
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import threading
+import time
+from utils.api_client import make_request
+from utils.config import (
+    COINGECKO_API_URL, FMP_API_KEY, FMP_API_URL,
+    TICK_INTERVAL, TICK_COINS, TICK_STOCKS, TICK_MAX_ASSETS, TICK_IDLE_SECONDS
+)
+from utils.cache import cache
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+WATCH_KEY = "ticks:watch"
+COINGECKO_BATCH = 250  # Ids per simple/price call
+FMP_BATCH = 100  # Symbols per multi-quote call
+
+COIN = "coin"
+STOCK = "stock"
+
+def _batch_key(source, ids):
+    digest = hashlib.blake2b(",".join(ids).encode("utf-8"), digest_size=12).hexdigest()
+    return f"ticks:{source}:{digest}"
+
+def fetch_coin_ticks(coin_ids):
+    """Latest USD prices of CoinGecko ids, one simple/price call per batch"""
+    ticks = {}
+    for start in range(0, len(coin_ids), COINGECKO_BATCH):
+        batch = coin_ids[start:start + COINGECKO_BATCH]
+        params = {
+            'ids': ",".join(batch), 'vs_currencies': 'usd',
+            'include_24hr_change': 'true', 'include_last_updated_at': 'true'
+        }
+        # Workers watching the same assets share one upstream call per interval
+        data = cache.get_or_set(
+            "upstream", _batch_key("coingecko", batch),
+            lambda: make_request(f"{COINGECKO_API_URL}/simple/price", params=params),
+            ttl=TICK_INTERVAL
+        )
+        for coin_id, values in (data or {}).items():
+            if isinstance(values, dict) and "usd" in values:
+                ticks[coin_id] = {
+                    "id": coin_id,
+                    "type": COIN,
+                    "price": values["usd"],
+                    "change_percent": values.get("usd_24h_change"),
+                    "last_updated": values.get("last_updated_at") or int(time.time()),
+                }
+    return ticks
+
+def fetch_stock_ticks(symbols):
+    """Latest stock quotes from FMP, one multi-symbol quote call per batch"""
+    ticks = {}
+    for start in range(0, len(symbols), FMP_BATCH):
+        batch = symbols[start:start + FMP_BATCH]
+        data = cache.get_or_set(
+            "upstream", _batch_key("fmp", batch),
+            lambda: make_request(f"{FMP_API_URL}/quote/{','.join(batch)}", params={'apikey': FMP_API_KEY}),
+            ttl=TICK_INTERVAL
+        )
+        for quote in data if isinstance(data, list) else []:
+            symbol = quote.get("symbol")
+            if symbol:
+                ticks[symbol] = {
+                    "id": symbol,
+                    "type": STOCK,
+                    "name": quote.get("name"),
+                    "price": quote.get("price"),
+                    "change_percent": quote.get("changesPercentage"),
+                    "last_updated": quote.get("timestamp") or int(time.time()),
+                }
+    return ticks
+
+class TickTable:
+    """
+    In-memory table of the latest coin and stock prices of this process
+
+    A background job (one per worker) refreshes the table with batched
+    upstream calls and swaps in the new tables, so lookups never wait for
+    the upstream. The watched assets are the configured ones plus any asset
+    requested in the last TICK_IDLE_SECONDS (on any worker); an asset seen
+    for the first time is reported as pending until the next refresh.
+    """
+
+    def __init__(self, coins=TICK_COINS, stocks=TICK_STOCKS):
+        self.coins = list(coins)
+        self.stocks = list(stocks)
+        self._ticks = {COIN: {}, STOCK: {}}
+        self._registered = {}  # (type, id) -> time this process last announced it
+        self._lock = threading.Lock()
+        self.refreshed_at = None
+
+    def lookup(self, coins=(), stocks=()):
+        """
+        Current ticks of the requested assets (no upstream call)
+
+        Returns:
+            (ticks {"coins": {...}, "stocks": {...}}, pending [(type, id)])
+        """
+        table = self._ticks
+        found = {"coins": {}, "stocks": {}}
+        pending = []
+        for kind, ids, out in ((COIN, coins, found["coins"]), (STOCK, stocks, found["stocks"])):
+            for asset_id in ids:
+                tick = table[kind].get(asset_id)
+                if tick is not None:
+                    out[asset_id] = tick
+                else:
+                    pending.append((kind, asset_id))
+        self._watch([(COIN, c) for c in coins] + [(STOCK, s) for s in stocks])
+        return found, pending
+
+    def _watch(self, assets):
+        """Announce requested assets to the refresh jobs of every worker"""
+        now = time.time()
+        with self._lock:
+            stale = [asset for asset in assets if now - self._registered.get(asset, 0) > TICK_IDLE_SECONDS / 2]
+            for asset in stale:
+                self._registered[asset] = now
+        if not stale:
+            return
+
+        def apply(watch):
+            for kind, asset_id in stale:
+                watch[f"{kind}:{asset_id}"] = now
+            if len(watch) > TICK_MAX_ASSETS:
+                # Forget the assets requested longest ago
+                for key in sorted(watch, key=watch.get)[:len(watch) - TICK_MAX_ASSETS]:
+                    del watch[key]
+            return watch
+        try:
+            shared_store.update(WATCH_KEY, apply, default={})
+        except Exception as e:
+            logger.error(f"Error registering watched assets: {e}")
+
+    def watched(self):
+        """Configured assets plus those requested recently, as (coins, stocks)"""
+        cutoff = time.time() - TICK_IDLE_SECONDS
+        coins, stocks = list(self.coins), list(self.stocks)
+        for key, last_seen in (shared_store.get(WATCH_KEY) or {}).items():
+            if last_seen < cutoff:
+                continue
+            kind, _, asset_id = key.partition(":")
+            target = coins if kind == COIN else stocks
+            if asset_id not in target:
+                target.append(asset_id)
+        return sorted(coins), sorted(stocks)
+
+    def refresh(self):
+        """Fetch every watched asset and swap in the new tables"""
+        coins, stocks = self.watched()
+        table = {COIN: dict(self._ticks[COIN]), STOCK: dict(self._ticks[STOCK])}
+        if coins:
+            try:
+                table[COIN] = fetch_coin_ticks(coins)
+            except Exception as e:
+                logger.error(f"Tick refresh: coin prices unavailable: {e}")
+        if stocks and FMP_API_KEY:
+            try:
+                table[STOCK] = fetch_stock_ticks(stocks)
+            except Exception as e:
+                logger.error(f"Tick refresh: stock quotes unavailable: {e}")
+        # A single assignment, so readers see either the old or the new tables
+        self._ticks = table
+        self.refreshed_at = int(time.time())
+        return len(table[COIN]) + len(table[STOCK])
+
+# Process-wide table instance
+tick_table = TickTable()
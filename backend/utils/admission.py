@@ -0,0 +1,240 @@
+import functools
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils.config import ADMISSION_LIMITS, ADMISSION_QUEUE_TIMEOUT
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "metrics:admission"
+
+# Priorities (lower is served first)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class Overloaded(Exception):
+    """Raised when an operation's queue is full or the wait timed out (answered with 429)"""
+
+    def __init__(self, operation, retry_after):
+        super().__init__(f"Too many pending {operation} requests, retry in {retry_after}s")
+        self.operation = operation
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded priority queue for one operation
+
+    At most `limit` callers run at once; up to `max_queue` more wait in
+    priority order (FIFO within a priority) and are handed a slot directly
+    when one is released. Callers beyond that, or waiting longer than
+    `timeout`, get Overloaded with a Retry-After estimate from the recent
+    service time.
+    """
+
+    def __init__(self, operation, limit, max_queue, timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.operation = operation
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = []  # heap of [priority, seq, event, granted]
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._service_time = 1.0  # Moving average of seconds a slot is held
+        # Metrics not yet folded into the shared store (written outside _lock)
+        self._pending = None
+        self._depth = 0
+        self._flush_lock = threading.Lock()
+
+    def retry_after(self):
+        """Seconds until a queued request would likely be served"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._service_time * backlog / max(self.limit, 1)))
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """
+        Take a slot, waiting in the queue if all are busy
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            Overloaded: The queue is full or no slot was free within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                self._record(admitted=1)
+                outcome = "admitted"
+            elif len(self._waiters) >= self.max_queue:
+                retry_after = self.retry_after()
+                self._record(rejected=1)
+                outcome = "rejected"
+            else:
+                waiter = [priority, next(self._seq), threading.Event(), False]
+                heapq.heappush(self._waiters, waiter)
+                self._record()
+                outcome = "queued"
+        self._flush()
+        if outcome == "admitted":
+            return 0.0
+        if outcome == "rejected":
+            raise Overloaded(self.operation, retry_after)
+
+        start = time.monotonic()
+        waiter[2].wait(timeout)
+        waited = time.monotonic() - start
+        with self._lock:
+            granted = waiter[3]
+            if not granted:
+                # Timed out before a slot was handed over
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                retry_after = self.retry_after()
+                self._record(rejected=1)
+            else:
+                self._record(admitted=1, wait=waited)
+        self._flush()
+        if not granted:
+            raise Overloaded(self.operation, retry_after)
+        return waited
+
+    def release(self, held=None):
+        """Free a slot, handing it to the first queued caller if any"""
+        with self._lock:
+            if held is not None:
+                self._service_time = self._service_time * 0.8 + held * 0.2
+            if self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                waiter[3] = True
+                waiter[2].set()
+                self._record()
+            else:
+                self.active -= 1
+        self._flush()
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, timeout=None):
+        self.acquire(priority, timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def _record(self, admitted=0, rejected=0, wait=0.0):
+        """Count an event in memory (called with _lock held)"""
+        pending = self._pending
+        if pending is None:
+            pending = self._pending = {"admitted": 0, "rejected": 0, "wait_s_total": 0.0, "max_wait_s": 0.0}
+        pending["admitted"] += admitted
+        pending["rejected"] += rejected
+        pending["wait_s_total"] += wait
+        pending["max_wait_s"] = max(pending["max_wait_s"], wait)
+        self._depth = len(self._waiters)
+
+    def _flush(self):
+        """
+        Fold the pending events into the metrics shared by all workers
+
+        Runs outside _lock, so admissions never wait on the store's file
+        lock. Concurrent callers coalesce: one thread writes while the
+        others leave their events to it.
+        """
+        while self._pending is not None:
+            if not self._flush_lock.acquire(blocking=False):
+                return
+            try:
+                while True:
+                    with self._lock:
+                        pending, depth = self._pending, self._depth
+                        self._pending = None
+                    if pending is None:
+                        break
+                    self._publish(pending, depth)
+            finally:
+                self._flush_lock.release()
+
+    def _publish(self, pending, depth):
+        """Write counters to the shared store (queue depth is kept per process, dead workers are dropped)"""
+        def apply(current):
+            stats = current.setdefault(self.operation, {
+                "admitted": 0, "rejected": 0, "wait_s_total": 0.0, "max_wait_s": 0.0, "queued": {}
+            })
+            stats["admitted"] += pending["admitted"]
+            stats["rejected"] += pending["rejected"]
+            stats["wait_s_total"] += pending["wait_s_total"]
+            stats["max_wait_s"] = max(stats["max_wait_s"], pending["max_wait_s"])
+            stats["queued"] = {pid: n for pid, n in stats["queued"].items() if _alive(int(pid))}
+            stats["queued"][str(os.getpid())] = depth
+            return current
+        try:
+            shared_store.update(METRICS_KEY, apply, default={})
+        except Exception as e:
+            logger.error(f"Error updating admission metrics: {e}")
+
+def _alive(pid):
+    """Whether a worker process still exists (the shared store is local to the host)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+def get_controller(operation):
+    """Controller of an operation in this process, configured from ADMISSION_LIMITS"""
+    with _controllers_lock:
+        controller = _controllers.get(operation)
+        if controller is None:
+            limit, max_queue = ADMISSION_LIMITS[operation]
+            controller = _controllers[operation] = AdmissionController(operation, limit, max_queue)
+        return controller
+
+@contextmanager
+def admit(operation, priority=INTERACTIVE, timeout=None):
+    """Run the block within the operation's concurrency limit (raises Overloaded)"""
+    with get_controller(operation).slot(priority, timeout):
+        yield
+
+def admitted(operation, priority=INTERACTIVE):
+    """Decorator form of admit() for route handlers"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with admit(operation, priority):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def admission_metrics():
+    """Per-operation admission counters, current queue depth and wait times"""
+    try:
+        current = shared_store.get(METRICS_KEY) or {}
+    except Exception as e:
+        logger.error(f"Error reading admission metrics: {e}")
+        current = {}
+    metrics = {}
+    for operation, stats in current.items():
+        limit, max_queue = ADMISSION_LIMITS.get(operation, (None, None))
+        metrics[operation] = {
+            "limit": limit,
+            "max_queue": max_queue,
+            "queue_depth": sum(n for pid, n in stats["queued"].items() if _alive(int(pid))),
+            "admitted": stats["admitted"],
+            "rejected": stats["rejected"],
+            "average_wait_s": round(stats["wait_s_total"] / stats["admitted"], 3) if stats["admitted"] else 0.0,
+            "max_wait_s": round(stats["max_wait_s"], 3),
+        }
+    return metrics
@@ -2,9 +2,36 @@ import requests
 import logging
 import time
 from flask import jsonify
+from utils.cassette import Cassette
+from utils.config import UPSTREAM_MODE, UPSTREAM_CASSETTE, UPSTREAM_REPLAY_LATENCY
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Cassette used when UPSTREAM_MODE is 'record' or 'replay'
+cassette = Cassette(UPSTREAM_CASSETTE) if UPSTREAM_MODE in ('record', 'replay') else None
+if cassette:
+    logger.info(f"Upstream {UPSTREAM_MODE} mode using cassette {UPSTREAM_CASSETTE}")
+
+def _replay_request(url, params, method, json_data):
+    """Serve a request from the cassette, simulating upstream latency"""
+    recorded = cassette.lookup(method, url, params, json_data)
+    if recorded is None:
+        raise requests.exceptions.ConnectionError(f"No recorded response for {method} {url} in replay mode")
+    
+    status, body, recorded_latency_ms = recorded
+    if UPSTREAM_REPLAY_LATENCY == 'recorded':
+        time.sleep(recorded_latency_ms / 1000)
+    elif UPSTREAM_REPLAY_LATENCY not in ('none', '0', ''):
+        time.sleep(float(UPSTREAM_REPLAY_LATENCY) / 1000)
+    
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.url = url
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
 def make_request(url, params=None, headers=None, method='GET', json_data=None, timeout=30):
     """
     Centralized request handler with error handling, logging, and metrics
@@ -20,21 +47,38 @@ def make_request(url, params=None, headers=None, method='GET', json_data=None, t
     Returns:
         Parsed JSON response or raises an exception
     """
+    # Part of the request trace, if any (the query string is left out: it may hold API keys)
+    with span(f"http.{method.upper()}", url=url) as current:
+        return _send_request(url, params, headers, method, json_data, timeout, current)
+
+def _send_request(url, params, headers, method, json_data, timeout, current):
     start_time = time.time()
     logger.info(f"Making {method} request to {url}")
     
     try:
-        if method.upper() == 'GET':
-            response = requests.get(url, params=params, headers=headers, timeout=timeout)
-        elif method.upper() == 'POST':
-            response = requests.post(url, params=params, headers=headers, json=json_data, timeout=timeout)
-        else:
+        if method.upper() not in ('GET', 'POST'):
             logger.error(f"Unsupported method: {method}")
             raise ValueError(f"Unsupported method: {method}")
         
+        if UPSTREAM_MODE == 'replay':
+            response = _replay_request(url, params, method, json_data)
+        elif method.upper() == 'GET':
+            response = requests.get(url, params=params, headers=headers, timeout=timeout)
+        else:
+            response = requests.post(url, params=params, headers=headers, json=json_data, timeout=timeout)
+        
         # Log request time
         elapsed_ms = (time.time() - start_time) * 1000
+        
+        # Capture the exchange (credentials are stripped by the cassette)
+        if UPSTREAM_MODE == 'record':
+            try:
+                cassette.record(method, url, params, json_data, response.status_code, response.content, elapsed_ms)
+            except Exception as rec_err:
+                logger.error(f"Failed to record response for {url}: {rec_err}")
         logger.info(f"Request to {url} completed in {elapsed_ms:.2f}ms with status {response.status_code}")
+        if current is not None:
+            current.set(status=response.status_code, replayed=UPSTREAM_MODE == 'replay')
         
         # Raise for HTTP errors
         response.raise_for_status()
@@ -0,0 +1,78 @@
+import fcntl
+import logging
+import os
+import threading
+from utils.config import SHARED_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Registered periodic jobs: name -> job settings
+_jobs = {}
+_started_pid = None
+_stop_event = threading.Event()
+_leader_locks = {}
+
+def register_job(name, target, interval, leader=True, run_at_start=True):
+    """
+    Register a function to run periodically in a daemon thread
+
+    Args:
+        name: Unique job name
+        target: Callable taking no arguments
+        interval: Seconds between runs (jobs with interval <= 0 are skipped)
+        leader: Run in only one process per host (workers elect a leader
+            through a file lock); set False for per-process work such as
+            refreshing an in-memory table
+        run_at_start: Run once immediately instead of after the first interval
+    """
+    _jobs[name] = {"target": target, "interval": interval, "leader": leader, "run_at_start": run_at_start}
+
+def try_acquire_leader(name):
+    """Try to become the single process on this host running `name` (non-blocking)"""
+    if name in _leader_locks:
+        return True
+    path = f"{SHARED_STATE_PATH}.{name}.lock"
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    # Keep the descriptor open for the life of the process to hold the lock
+    _leader_locks[name] = fd
+    return True
+
+def _run_job(name, job):
+    if job["leader"] and not try_acquire_leader(name):
+        # Another worker is running this job; retry in case it exits
+        while not _stop_event.wait(job["interval"]):
+            if try_acquire_leader(name):
+                break
+        else:
+            return
+
+    logger.info(f"Background job '{name}' started (pid: {os.getpid()}, every {job['interval']}s)")
+    if not job["run_at_start"] and _stop_event.wait(job["interval"]):
+        return
+    while True:
+        try:
+            job["target"]()
+        except Exception as e:
+            logger.error(f"Background job '{name}' failed: {e}")
+        if _stop_event.wait(job["interval"]):
+            return
+
+def start_jobs():
+    """Start all registered jobs in this process (once per process)"""
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    _started_pid = os.getpid()
+    for name, job in _jobs.items():
+        if job["interval"] <= 0:
+            continue
+        thread = threading.Thread(target=_run_job, args=(name, job), name=f"job-{name}", daemon=True)
+        thread.start()
+
+def stop_jobs():
+    _stop_event.set()
@@ -0,0 +1,424 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse, unquote
+from utils.config import (
+    CACHE_BACKEND, CACHE_REDIS_URL, CACHE_PREFIX, CACHE_LOCAL_SIZE,
+    CACHE_LOCAL_TTL, CACHE_LOCK_TIMEOUT, CACHE_REDIS_TIMEOUT
+)
+from utils.shared_state import shared_store
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("local", "shared", "redis")
+LOCK_POLL_INTERVAL = 0.05  # Seconds between checks while another node computes a value
+REDIS_RETRY_AFTER = 5  # Seconds a failing Redis tier is bypassed
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+def loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+class LocalTier:
+    """In-process LRU of serialized values with per-entry expiry"""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, payload, ttl):
+        if self.size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SharedStoreTier:
+    """Tier backed by the SQLite shared store: shared by the workers of one host"""
+
+    name = "shared"
+
+    def get(self, key):
+        payload = shared_store.get(key)
+        return None if payload is None else payload.encode("utf-8")
+
+    def set(self, key, payload, ttl):
+        shared_store.set(key, payload.decode("utf-8"), ttl=ttl)
+
+    def delete(self, key):
+        shared_store.delete(key)
+
+    def try_lock(self, key, token, ttl):
+        now = time.time()
+
+        def apply(current):
+            if current and current["expires_at"] > now:
+                return current
+            return {"token": token, "expires_at": now + ttl}
+        return shared_store.update(f"lock:{key}", apply)["token"] == token
+
+    def unlock(self, key, token):
+        current = shared_store.get(f"lock:{key}")
+        if current and current["token"] == token:
+            shared_store.delete(f"lock:{key}")
+
+    def available(self):
+        return True
+
+class RedisError(Exception):
+    """Error reply from the Redis server"""
+
+class RedisTier:
+    """
+    Tier on a server speaking the Redis protocol: shared by every node
+
+    A minimal RESP client over one socket per thread (GET, SET with EX/NX,
+    DEL). Connection errors do not fail requests: the tier is bypassed for
+    REDIS_RETRY_AFTER seconds and the cache keeps working in-process.
+    """
+
+    name = "redis"
+
+    def __init__(self, url, timeout):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL scheme: {parsed.scheme} (use redis://)")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0
+        self.errors = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        if self.password:
+            self._send(conn, "AUTH", self.password)
+        if self.db:
+            self._send(conn, "SELECT", self.db)
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None and self._local.pid == os.getpid():
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _send(conn, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts += [b"$%d\r\n" % len(arg), arg, b"\r\n"]
+        conn[0].sendall(b"".join(parts))
+        return RedisTier._read_reply(conn[1])
+
+    @staticmethod
+    def _read_reply(reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the cache server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the cache server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [RedisTier._read_reply(reader) for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from the cache server: {line[:40]!r}")
+
+    def command(self, *args):
+        """Run one command; returns None if the server is unreachable"""
+        if not self.available():
+            return None
+        try:
+            return self._send(self._connection(), *args)
+        except (OSError, ConnectionError, RedisError) as e:
+            self._close()
+            self.errors += 1
+            self._down_until = time.monotonic() + REDIS_RETRY_AFTER
+            logger.warning(f"Cache server {self.host}:{self.port} unavailable, bypassing it for {REDIS_RETRY_AFTER}s: {e}")
+            return None
+
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, payload, ttl):
+        self.command("SET", key, payload, "EX", max(int(ttl), 1))
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+    def try_lock(self, key, token, ttl):
+        reply = self.command("SET", f"lock:{key}", token, "PX", max(int(ttl * 1000), 1), "NX")
+        # An unreachable server cannot coordinate: compute locally
+        return reply == "OK" or not self.available()
+
+    def unlock(self, key, token):
+        if self.command("GET", f"lock:{key}") == token.encode("utf-8"):
+            self.command("DEL", f"lock:{key}")
+
+class _Flight:
+    """A value being computed in this process, awaited by concurrent callers"""
+
+    __slots__ = ("event", "payload", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.payload = None
+        self.error = None
+
+class Cache:
+    """
+    Two-tier cache of JSON-serializable values
+
+    Lookups go to an in-process LRU first, then to the shared tier (the
+    SQLite shared store of this host, or a Redis-protocol server shared by
+    every node), whose hits are copied into the LRU. With a shared tier,
+    LRU entries live at most `local_ttl` seconds so nodes do not drift far
+    apart. Keys are prefixed with CACHE_PREFIX and a namespace.
+
+    get_or_set protects producers from stampedes: concurrent misses in one
+    process wait for a single computation, and across processes or nodes a
+    short lock in the shared tier lets one caller compute while the others
+    poll for the result. None is never cached.
+    """
+
+    def __init__(self, backend=CACHE_BACKEND, redis_url=CACHE_REDIS_URL, prefix=CACHE_PREFIX,
+                 local_size=CACHE_LOCAL_SIZE, local_ttl=CACHE_LOCAL_TTL, lock_timeout=CACHE_LOCK_TIMEOUT):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown cache backend: {backend} (available: {list(BACKENDS)})")
+        self.backend = backend
+        self.prefix = prefix
+        self.local = LocalTier(local_size)
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        if backend == "redis":
+            self.remote = RedisTier(redis_url, CACHE_REDIS_TIMEOUT)
+        elif backend == "shared":
+            self.remote = SharedStoreTier()
+        else:
+            self.remote = None
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "remote_hits": 0, "misses": 0, "computed": 0, "waited": 0}
+
+    def namespace(self, name):
+        return CacheNamespace(self, name)
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _local_ttl(self, ttl):
+        return ttl if self.remote is None else min(ttl, self.local_ttl)
+
+    def _lookup(self, full_key, ttl):
+        payload = self.local.get(full_key)
+        if payload is not None:
+            self._count("local_hits")
+            return payload
+        if self.remote is not None:
+            payload = self.remote.get(full_key)
+            if payload is not None:
+                self._count("remote_hits")
+                self.local.set(full_key, payload, self._local_ttl(ttl))
+                return payload
+        self._count("misses")
+        return None
+
+    def _store(self, full_key, payload, ttl):
+        self.local.set(full_key, payload, self._local_ttl(ttl))
+        if self.remote is not None:
+            self.remote.set(full_key, payload, ttl)
+
+    def get(self, namespace, key, default=None, ttl=None):
+        payload = self._lookup(self._key(namespace, key), ttl or self.local_ttl)
+        return default if payload is None else loads(payload)
+
+    def set(self, namespace, key, value, ttl):
+        if value is not None and ttl and ttl > 0:
+            self._store(self._key(namespace, key), dumps(value), ttl)
+
+    def delete(self, namespace, key):
+        full_key = self._key(namespace, key)
+        self.local.delete(full_key)
+        if self.remote is not None:
+            self.remote.delete(full_key)
+
+    def get_or_set(self, namespace, key, producer, ttl):
+        """Return the cached value for key, computing it once on a miss"""
+        if not ttl or ttl <= 0:
+            return producer()
+        full_key = self._key(namespace, key)
+        payload = self._lookup(full_key, ttl)
+        if payload is not None:
+            return loads(payload)
+
+        with self._lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+        if not leader:
+            self._count("waited")
+            if not flight.event.wait(self.lock_timeout):
+                return producer()
+            if flight.error is not None:
+                raise flight.error
+            return None if flight.payload is None else loads(flight.payload)
+
+        try:
+            flight.payload = self._compute(full_key, producer, ttl)
+            return None if flight.payload is None else loads(flight.payload)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[full_key]
+            flight.event.set()
+
+    def _compute(self, full_key, producer, ttl):
+        token = None
+        if self.remote is not None:
+            token = uuid.uuid4().hex
+            deadline = time.monotonic() + self.lock_timeout
+            while not self.remote.try_lock(full_key, token, self.lock_timeout):
+                # Another process or node is computing the value
+                if time.monotonic() >= deadline:
+                    token = None
+                    break
+                time.sleep(LOCK_POLL_INTERVAL)
+                payload = self.remote.get(full_key)
+                if payload is not None:
+                    self._count("waited")
+                    self.local.set(full_key, payload, self._local_ttl(ttl))
+                    return payload
+            else:
+                # The previous holder may have stored the value just before releasing
+                payload = self.remote.get(full_key)
+                if payload is not None:
+                    self.remote.unlock(full_key, token)
+                    self.local.set(full_key, payload, self._local_ttl(ttl))
+                    return payload
+        try:
+            self._count("computed")
+            value = producer()
+            if value is None:
+                return None
+            payload = dumps(value)
+            self._store(full_key, payload, ttl)
+            return payload
+        finally:
+            if token is not None:
+                self.remote.unlock(full_key, token)
+
+    def clear_local(self):
+        self.local.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["remote_hits"] + stats["misses"]
+        stats.update({
+            "backend": self.backend,
+            "local_entries": len(self.local),
+            "hit_rate": (stats["local_hits"] + stats["remote_hits"]) / lookups if lookups else None,
+        })
+        if isinstance(self.remote, RedisTier):
+            stats["remote_available"] = self.remote.available()
+            stats["remote_errors"] = self.remote.errors
+        return stats
+
+class CacheNamespace:
+    """Cache view whose keys are scoped to one namespace"""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.cache.get(self.name, key, default)
+
+    def set(self, key, value, ttl):
+        self.cache.set(self.name, key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.name, key)
+
+    def get_or_set(self, key, producer, ttl):
+        return self.cache.get_or_set(self.name, key, producer, ttl)
+
+# Process-wide cache instance
+cache = Cache()
@@ -0,0 +1,171 @@
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Query parameters and JSON fields that carry credentials and are never recorded
+SECRET_PARAMS = {"apikey", "api_key", "auth_token", "token", "access_token", "key"}
+
+# Record layout: header, metadata JSON, zlib-compressed response body
+#   digest (16s) | latency_ms (f) | status (H) | meta_len (I) | body_len (I)
+HEADER = struct.Struct("<16sfHII")
+MAGIC = b"CTCASS01"
+REDACTED = b"REDACTED"
+
+# Credentials echoed back in response bodies (e.g. Cryptopanic next/previous page URLs)
+_SECRET_URL_PARAM_RE = re.compile(
+    rb"([?&](?:" + b"|".join(re.escape(p.encode()) for p in sorted(SECRET_PARAMS)) + rb")=)[^&\"\s\\<]+",
+    re.IGNORECASE
+)
+
+def redact(params):
+    """Return params without credentials, sorted for stable keys"""
+    if not params:
+        return []
+    items = params.items() if isinstance(params, dict) else params
+    return sorted((str(k), str(v)) for k, v in items if str(k).lower() not in SECRET_PARAMS)
+
+def scrub_body(body, params=None):
+    """Remove credentials from a response body: secret URL parameters and the secret values sent"""
+    items = params.items() if isinstance(params, dict) else params or []
+    for k, v in items:
+        if str(k).lower() in SECRET_PARAMS and v and len(str(v)) >= 4:
+            body = body.replace(str(v).encode("utf-8"), REDACTED)
+    return _SECRET_URL_PARAM_RE.sub(rb"\1" + REDACTED, body)
+
+def request_key(method, url, params=None, json_data=None):
+    """Stable digest identifying an upstream request (credentials excluded)"""
+    material = json.dumps({
+        "method": method.upper(),
+        "url": url,
+        "params": redact(params),
+        "json": json_data,
+    }, sort_keys=True, default=str)
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).digest()
+
+class Cassette:
+    """
+    Append-only on-disk store of upstream request/response pairs
+
+    Recording appends one compact record per response, with credentials
+    removed from the request and the body. Replay memory-maps the
+    file and builds an index of record offsets from the fixed-size headers
+    only, so bodies are decompressed on demand. When a request was recorded
+    several times, replay cycles through the recordings in order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._index = None
+        self._cursors = {}
+
+    # --- Recording ---
+    def record(self, method, url, params, json_data, status, body, latency_ms):
+        key = request_key(method, url, params, json_data)
+        meta = json.dumps({
+            "method": method.upper(),
+            "url": url,
+            "params": redact(params),
+            "recorded_at": int(time.time()),
+        }).encode("utf-8")
+        compressed = zlib.compress(scrub_body(body, params), 6)
+        record = HEADER.pack(key, float(latency_ms), int(status), len(meta), len(compressed)) + meta + compressed
+
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "ab")
+            # Workers append to the same file: one whole record at a time
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._file.fileno()).st_size == 0:
+                    self._file.write(MAGIC)
+                self._file.write(record)
+                self._file.flush()
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    # --- Replay ---
+    def _load_index(self):
+        index = {}
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._mmap
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a cassette file: {self.path}")
+
+        offset = len(MAGIC)
+        size = len(data)
+        while offset + HEADER.size <= size:
+            key, latency_ms, status, meta_len, body_len = HEADER.unpack_from(data, offset)
+            body_offset = offset + HEADER.size + meta_len
+            if body_offset + body_len > size:
+                logger.warning(f"Truncated record at offset {offset} in {self.path}")
+                break
+            index.setdefault(key, []).append((body_offset, body_len, latency_ms, status))
+            offset = body_offset + body_len
+
+        logger.info(f"Loaded cassette {self.path}: {sum(len(v) for v in index.values())} responses for {len(index)} requests")
+        return index
+
+    def lookup(self, method, url, params=None, json_data=None):
+        """
+        Find a recorded response
+
+        Returns:
+            Tuple of (status, body bytes, recorded latency in ms), or None
+            if the request was never recorded
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            key = request_key(method, url, params, json_data)
+            entries = self._index.get(key)
+            if not entries:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = (cursor + 1) % len(entries)
+            body_offset, body_len, latency_ms, status = entries[cursor]
+            compressed = self._mmap[body_offset:body_offset + body_len]
+        return status, zlib.decompress(compressed), latency_ms
+
+    def entries(self):
+        """Iterate over recorded metadata (for inspection)"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = len(MAGIC)
+        while offset + HEADER.size <= len(data):
+            key, latency_ms, status, meta_len, body_len = HEADER.unpack_from(data, offset)
+            meta_start = offset + HEADER.size
+            meta = json.loads(data[meta_start:meta_start + meta_len])
+            meta.update({"status": status, "latency_ms": round(latency_ms, 2), "body_bytes": body_len})
+            yield meta
+            offset = meta_start + meta_len + body_len
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            if self._mmap:
+                self._mmap.close()
+                self._mmap = None
+            self._index = None
+
+if __name__ == "__main__":
+    # Usage: python -m utils.cassette <cassette file>
+    import sys
+    for entry in Cassette(sys.argv[1]).entries():
+        print(json.dumps(entry))
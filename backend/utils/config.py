@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,13 +12,14 @@ CRYPTOPANIC_API_KEY = os.getenv('CRYPTOPANIC_API_KEY', '')
 FMP_API_KEY = os.getenv('FMP_API_KEY', '')
 NEWSAPI_API_KEY = os.getenv('NEWSAPI_API_KEY', '')
 
-# API URLs
-COINGECKO_API_URL = 'https://api.coingecko.com/api/v3'
-ETHERSCAN_API_URL = 'https://api.etherscan.io/api'
-HUGGINGFACE_INFERENCE_API_URL = "https://api-inference.huggingface.co/models/"
-CRYPTOPANIC_API_URL = 'https://cryptopanic.com/api/v1'
-FMP_API_URL = 'https://financialmodelingprep.com/api/v3'
-NEWSAPI_URL = 'https://newsapi.org/v2'
+# API URLs (overridable, e.g. to point at the benchmark stub server)
+COINGECKO_API_URL = os.getenv('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+ETHERSCAN_API_URL = os.getenv('ETHERSCAN_API_URL', 'https://api.etherscan.io/api')
+HUGGINGFACE_INFERENCE_API_URL = os.getenv('HUGGINGFACE_INFERENCE_API_URL', "https://api-inference.huggingface.co/models/")
+CRYPTOPANIC_API_URL = os.getenv('CRYPTOPANIC_API_URL', 'https://cryptopanic.com/api/v1')
+FMP_API_URL = os.getenv('FMP_API_URL', 'https://financialmodelingprep.com/api/v3')
+NEWSAPI_URL = os.getenv('NEWSAPI_URL', 'https://newsapi.org/v2')
+FEAR_GREED_API_URL = os.getenv('FEAR_GREED_API_URL', 'https://api.alternative.me/fng/')
 
 # Default Models
 SUMMARIZATION_MODEL = os.getenv('SUMMARIZATION_MODEL', "facebook/bart-large-cnn")
@@ -59,8 +61,149 @@ METRICS = {
 }
 
 # Logging
-MAX_LOGS = 100
+MAX_LOGS = int(os.getenv('MAX_LOGS', 100))  # Capacity of the in-memory log ring buffer
 LOGS_STORE = []
 
+# Upstream Record/Replay
+UPSTREAM_MODE = os.getenv('UPSTREAM_MODE', 'live').lower()  # live, record or replay
+UPSTREAM_CASSETTE = os.getenv('UPSTREAM_CASSETTE', 'cassettes/upstream.cassette')
+UPSTREAM_REPLAY_LATENCY = os.getenv('UPSTREAM_REPLAY_LATENCY', 'recorded')  # recorded, none or a fixed number of ms
+
+# Historical Price Store
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', 'data/prices')
+PRICE_ASSETS = [a.strip() for a in os.getenv('PRICE_ASSETS', 'bitcoin,ethereum').split(',') if a.strip()]  # CoinGecko ids
+PRICE_INGEST_INTERVAL = int(os.getenv('PRICE_INGEST_INTERVAL', 0))  # Seconds between polls, 0 disables the in-app job
+PRICE_BACKFILL_DAYS = int(os.getenv('PRICE_BACKFILL_DAYS', 90))
+MAX_HISTORY_POINTS = int(os.getenv('MAX_HISTORY_POINTS', 5000))
+INDICATOR_LOOKBACK_BARS = int(os.getenv('INDICATOR_LOOKBACK_BARS', 500))  # Bars used to bootstrap incremental indicators
+
+# Fear & Greed History
+FEAR_GREED_STORE_PATH = os.getenv('FEAR_GREED_STORE_PATH', 'data/fear_greed.bin')
+FEAR_GREED_SYNC_INTERVAL = int(os.getenv('FEAR_GREED_SYNC_INTERVAL', 3600))  # Seconds between sync checks, 0 disables
+
+# News Deduplication
+NEWS_DEDUP_THRESHOLD = float(os.getenv('NEWS_DEDUP_THRESHOLD', 0.6))  # Estimated Jaccard similarity for near-duplicates
+
+# News Archive
+NEWS_DB_PATH = os.getenv('NEWS_DB_PATH', 'data/news.db')
+NEWS_INGEST_INTERVAL = int(os.getenv('NEWS_INGEST_INTERVAL', 600))  # Seconds between polls, 0 disables
+NEWS_INGEST_MAX_PAGES = int(os.getenv('NEWS_INGEST_MAX_PAGES', 5))  # Cryptopanic pages per poll
+NEWS_INGEST_QUERY = os.getenv('NEWS_INGEST_QUERY', 'crypto OR bitcoin OR ethereum OR blockchain')  # NewsAPI /everything query
+
+# News Embeddings
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+NEWS_EMBEDDINGS_ENABLED = os.getenv('NEWS_EMBEDDINGS_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Embed articles after each ingestion
+NEWS_EMBEDDINGS_DIR = os.getenv('NEWS_EMBEDDINGS_DIR', 'data/news_embeddings')
+NEWS_EMBEDDING_BATCH_SIZE = int(os.getenv('NEWS_EMBEDDING_BATCH_SIZE', 64))
+NEWS_EMBEDDING_QUANTIZE = os.getenv('NEWS_EMBEDDING_QUANTIZE', 'false').lower() in ('1', 'true', 'yes')  # Scan an int8 copy (4x less memory)
+NEWS_ANN_MIN_VECTORS = int(os.getenv('NEWS_ANN_MIN_VECTORS', 50000))  # Build the approximate index above this size, 0 disables
+NEWS_ANN_PROBES = int(os.getenv('NEWS_ANN_PROBES', 8))  # Inverted lists scanned per approximate query
+
+# News Retrieval (chat)
+NEWS_RETRIEVAL_CANDIDATES = int(os.getenv('NEWS_RETRIEVAL_CANDIDATES', 30))  # Articles fetched from each ranker
+NEWS_RETRIEVAL_KEYWORD_WEIGHT = float(os.getenv('NEWS_RETRIEVAL_KEYWORD_WEIGHT', 0.4))  # Keyword share of the hybrid score
+NEWS_RETRIEVAL_TOKEN_BUDGET = int(os.getenv('NEWS_RETRIEVAL_TOKEN_BUDGET', 1200))  # Context tokens returned to the model
+
+# News Sentiment
+NEWS_SENTIMENT_ENABLED = os.getenv('NEWS_SENTIMENT_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Score articles after each ingestion
+NEWS_SENTIMENT_BATCH_SIZE = int(os.getenv('NEWS_SENTIMENT_BATCH_SIZE', 32))  # Texts per inference request
+
+# Push Updates
+PUSH_INTERVAL = int(os.getenv('PUSH_INTERVAL', 5))  # Seconds between change checks, 0 disables the stream producer
+PUSH_BUFFER_SIZE = int(os.getenv('PUSH_BUFFER_SIZE', 256))  # Events kept for reconnecting clients
+PUSH_MAX_CLIENTS = int(os.getenv('PUSH_MAX_CLIENTS', 8))  # Open streams per worker (each holds a thread)
+PUSH_HEARTBEAT = int(os.getenv('PUSH_HEARTBEAT', 15))  # Seconds between keep-alive comments
+PUSH_MAX_STREAM_SECONDS = int(os.getenv('PUSH_MAX_STREAM_SECONDS', 300))  # Streams are closed (and resumed by the client) after this
+
+# Response Encoding
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', 1024))  # Smaller bodies are sent uncompressed
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 6))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 5))  # Used when the brotli package is installed
+RESPONSE_VARIANT_CACHE_SIZE = int(os.getenv('RESPONSE_VARIANT_CACHE_SIZE', 256))  # Compressed bodies kept per process
+
+# Chat Response Cache
+CHAT_CACHE_ENABLED = os.getenv('CHAT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CHAT_CACHE_PATH = os.getenv('CHAT_CACHE_PATH', 'data/chat_cache.db')
+CHAT_CACHE_THRESHOLD = float(os.getenv('CHAT_CACHE_THRESHOLD', 0.92))  # Minimum cosine similarity of questions
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', 1000))
+CHAT_CACHE_DEFAULT_TTL = int(os.getenv('CHAT_CACHE_DEFAULT_TTL', 3600))  # Seconds, for answers that used no tools
+
+# Chat Model Pool
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 4))  # Model instances kept per process (least recently used evicted)
+LLM_MODEL_CONCURRENCY = int(os.getenv('LLM_MODEL_CONCURRENCY', 4))  # Concurrent calls per model and process
+LLM_MODEL_LIMITS = {  # Per-model overrides, e.g. "mistralai/Mistral-7B-Instruct-v0.2=2,google/flan-t5-large=8"
+    model_id.strip(): int(limit)
+    for model_id, limit in (item.rsplit('=', 1) for item in os.getenv('LLM_MODEL_LIMITS', '').split(',') if '=' in item)
+}
+LLM_ACQUIRE_TIMEOUT = float(os.getenv('LLM_ACQUIRE_TIMEOUT', 30))  # Seconds to wait for a free model slot
+CHAT_PRELOAD_MODELS = [m.strip() for m in os.getenv('CHAT_PRELOAD_MODELS', CHAT_MODEL).split(',') if m.strip()]  # Built by warm_up()
+
+# Long Text Summarization
+SUMMARIZATION_CHUNK_TOKENS = int(os.getenv('SUMMARIZATION_CHUNK_TOKENS', 900))  # Model tokens per chunk (BART accepts 1024)
+SUMMARIZATION_MAX_TOKENS = int(os.getenv('SUMMARIZATION_MAX_TOKENS', 8000))  # Per-document budget, longer texts are cut
+SUMMARIZATION_PARALLELISM = int(os.getenv('SUMMARIZATION_PARALLELISM', 4))  # Chunks summarized concurrently per process
+SUMMARIZATION_CACHE_TTL = int(os.getenv('SUMMARIZATION_CACHE_TTL', 86400))  # Seconds chunk summaries are reused
+
+# Admission Control (per worker process: concurrent calls, queued callers)
+ADMISSION_LIMITS = {
+    "chat": (int(os.getenv('ADMISSION_CHAT_CONCURRENCY', 2)), int(os.getenv('ADMISSION_CHAT_QUEUE', 4))),
+    "summarization": (int(os.getenv('ADMISSION_SUMMARIZATION_CONCURRENCY', 2)), int(os.getenv('ADMISSION_SUMMARIZATION_QUEUE', 4))),
+    "sentiment": (int(os.getenv('ADMISSION_SENTIMENT_CONCURRENCY', 4)), int(os.getenv('ADMISSION_SENTIMENT_QUEUE', 16))),
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))  # Seconds queued before answering 429
+
+# Live Price Tick Table (/api/market/prices)
+TICK_INTERVAL = int(os.getenv('TICK_INTERVAL', 15))  # Seconds between refreshes, 0 disables the job
+TICK_COINS = [c.strip() for c in os.getenv('TICK_COINS', ','.join(PRICE_ASSETS)).split(',') if c.strip()]  # Always watched CoinGecko ids
+TICK_STOCKS = [s.strip().upper() for s in os.getenv('TICK_STOCKS', 'AAPL').split(',') if s.strip()]  # Always watched stock symbols
+TICK_MAX_ASSETS = int(os.getenv('TICK_MAX_ASSETS', 500))  # Requested assets kept in the watchlist
+TICK_IDLE_SECONDS = int(os.getenv('TICK_IDLE_SECONDS', 3600))  # Requested assets stop being refreshed after this
+TICK_MAX_REQUEST = int(os.getenv('TICK_MAX_REQUEST', 250))  # Assets per /prices request
+
+# Alerts
+ALERTS_DB_PATH = os.getenv('ALERTS_DB_PATH', 'data/alerts.db')
+ALERTS_INTERVAL = int(os.getenv('ALERTS_INTERVAL', 15))  # Seconds between checks, 0 disables the job
+ALERTS_MAX = int(os.getenv('ALERTS_MAX', 10000))  # Active alerts allowed
+ALERTS_SENTIMENT_WINDOW = os.getenv('ALERTS_SENTIMENT_WINDOW', '24h')  # Rolling sentiment window compared (1h, 24h, 7d, all)
+
+# Portfolio Snapshots
+PORTFOLIO_STORE_DIR = os.getenv('PORTFOLIO_STORE_DIR', 'data/portfolios')
+PORTFOLIO_SNAPSHOT_INTERVAL = int(os.getenv('PORTFOLIO_SNAPSHOT_INTERVAL', 3600))  # Seconds between snapshots, 0 disables the job
+PORTFOLIO_TRACKED = [a.strip() for a in os.getenv('PORTFOLIO_TRACKED', '').split(',') if a.strip()]  # Always snapshotted addresses
+PORTFOLIO_MAX_TRACKED = int(os.getenv('PORTFOLIO_MAX_TRACKED', 100))  # Viewed addresses kept in the snapshot job
+
+# Cache (upstream responses, summaries and portfolios)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'shared')  # local (per process), shared (per host) or redis (every node)
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')  # Used by the redis backend
+CACHE_PREFIX = os.getenv('CACHE_PREFIX', 'crypto-tracker')  # Key prefix, to share a server between deployments
+CACHE_LOCAL_SIZE = int(os.getenv('CACHE_LOCAL_SIZE', 1024))  # Entries kept in each process
+CACHE_LOCAL_TTL = int(os.getenv('CACHE_LOCAL_TTL', 5))  # Seconds a process reuses a shared entry without checking again
+CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', 10))  # Seconds callers wait for another one computing the same value
+CACHE_REDIS_TIMEOUT = float(os.getenv('CACHE_REDIS_TIMEOUT', 0.5))  # Socket timeout of the redis backend
+
+# Admin API (/api/admin, requests must send the X-Admin-Token header)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # Empty disables the admin API
+
+# Request Profiling (managed through /api/admin/profiling)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))  # Fraction of requests profiled and kept
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', 2000))  # Requests slower than this are kept, 0 disables
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 5))  # Stack sampling interval
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', 50))  # Profiles kept (oldest dropped)
+
+# Tracing (chat requests, listed at /api/traces)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Trace every chat request (else only those asking for it)
+TRACING_BUFFER_SIZE = int(os.getenv('TRACING_BUFFER_SIZE', 100))  # Traces kept (shared by the workers)
+TRACING_MAX_SPANS = int(os.getenv('TRACING_MAX_SPANS', 500))  # Spans kept per trace
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', '')  # OTLP/HTTP traces URL (e.g. http://localhost:4318/v1/traces), empty disables export
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'crypto-tracker-backend')
+
+# Startup
+CHAT_WARMUP = os.getenv('CHAT_WARMUP', 'false').lower() in ('1', 'true', 'yes')  # Preload chat dependencies at startup
+
+# Shared State (used by all worker processes on a host)
+SHARED_STATE_PATH = os.getenv('SHARED_STATE_PATH', os.path.join(tempfile.gettempdir(), 'crypto_tracker_state.db'))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 60))  # Seconds upstream responses are reused
+
 # CORS Configuration 
 CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"] 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from flask import Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+from utils.cache import cache
+from utils.config import (
+    RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_GZIP_LEVEL,
+    RESPONSE_BROTLI_QUALITY, RESPONSE_VARIANT_CACHE_SIZE
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson (several times faster than the stdlib encoder)"""
+
+    @property
+    def options(self):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return options | orjson.OPT_SORT_KEYS if self.sort_keys else options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Explicit stdlib options (indent, sort_keys, ...) keep the default encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+class VariantCache:
+    """
+    LRU of compressed bodies keyed by strong ETag and encoding
+
+    Payloads served repeatedly (cached upstream data, polled endpoints) are
+    compressed only once.
+    """
+
+    def __init__(self, capacity=RESPONSE_VARIANT_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, etag, encoding, body):
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compressed
+        compressed = compress(body, encoding)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = compressed
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return compressed
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    # mtime=0 keeps the output (and so the cache) deterministic
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+def negotiate_encoding(accept_encodings):
+    """Preferred supported encoding from Accept-Encoding (None for identity)"""
+    candidates = [("br", accept_encodings["br"])] if brotli else []
+    candidates.append(("gzip", accept_encodings["gzip"]))
+    encoding, quality = max(candidates, key=lambda item: item[1])
+    return encoding if quality > 0 else None
+
+variant_cache = VariantCache()
+
+def _digest(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def _response_encoding(size):
+    return negotiate_encoding(request.accept_encodings) if size >= RESPONSE_COMPRESSION_MIN_BYTES else None
+
+def cached_json(namespace, key, producer, ttl):
+    """
+    JSON response for a payload kept in the shared cache
+
+    The ETag is computed once, when the payload is cached, and stored with
+    it. A matching If-None-Match is answered with 304 before the payload is
+    serialized; other responses reuse the stored digest instead of hashing
+    the body again.
+
+    Without caching (ttl <= 0) the payload is serialized once and the
+    ETag left to _finalize_response.
+
+    Returns:
+        Tuple of (payload, response)
+    """
+    if not ttl or ttl <= 0:
+        payload = producer()
+        return payload, current_app.json.response(payload)
+
+    def produce():
+        payload = producer()
+        body = current_app.json.response(payload).get_data()
+        return {"data": payload, "etag": _digest(body), "size": len(body)}
+
+    entry = cache.get_or_set(namespace, key, produce, ttl)
+    encoding = _response_encoding(entry["size"])
+    etag = f"{entry['etag']}-{encoding}" if encoding else entry["etag"]
+    if request.method in ("GET", "HEAD") and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = "no-cache"
+        return entry["data"], response
+
+    response = current_app.json.response(entry["data"])
+    response.payload_digest = entry["etag"]
+    return entry["data"], response
+
+def _finalize_response(response):
+    """Add a strong ETag (answering 304 when it matches) and compress the body"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    cacheable = request.method in ("GET", "HEAD")
+    encoding = _response_encoding(len(body))
+    if encoding or cacheable:
+        response.vary.add("Accept-Encoding")
+
+    if cacheable:
+        # Payloads served through cached_json carry the digest computed when cached
+        digest = getattr(response, "payload_digest", None) or _digest(body)
+        # Each encoding is a different representation, so it gets its own tag
+        etag = f"{digest}-{encoding}" if encoding else digest
+        response.set_etag(etag)
+        if "Cache-Control" not in response.headers:
+            # Let browsers keep the body but revalidate it on every request
+            response.headers["Cache-Control"] = "no-cache"
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+    else:
+        etag = _digest(body) if encoding else None
+
+    if encoding:
+        response.set_data(variant_cache.get_or_compress(etag, encoding, body))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def init_app(app):
+    """Install the fast JSON provider and the ETag/compression response layer"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        logger.info("orjson not installed, using the standard JSON encoder")
+    app.after_request(_finalize_response)
@@ -0,0 +1,151 @@
+import bisect
+import collections
+import itertools
+import logging
+import threading
+
+_formatter = logging.Formatter()
+
+class LogRingBuffer:
+    """
+    Fixed-capacity ring buffer of compact log records
+
+    Records are stored as tuples (seq, created, levelno, name, message) and
+    only turned into dicts when they are read. The message is rendered when
+    the record is logged (so mutable arguments show their state at that
+    time), with the traceback of exc_info if any. Every record gets a
+    monotonically increasing sequence number that clients can pass back as
+    a `since` cursor to fetch only newer entries.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._records = collections.deque(maxlen=capacity)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _message(record):
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = f"{record.msg} {record.args}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _formatter.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        if record.stack_info:
+            message = f"{message}\n{_formatter.formatStack(record.stack_info)}"
+        return message
+
+    def append(self, record):
+        """Store a LogRecord in compact form (thread-safe)"""
+        message = self._message(record)
+        # Numbering and appending together keep the buffer sorted by sequence
+        with self._lock:
+            self._records.append((next(self._seq), record.created, record.levelno, record.name, message))
+
+    def __len__(self):
+        return len(self._records)
+
+    def clear(self):
+        self._records.clear()
+
+    @staticmethod
+    def _format(entry):
+        seq, created, levelno, name, message = entry
+        return {
+            "seq": seq,
+            "timestamp": int(created),
+            "level": levelno,
+            "level_name": logging.getLevelName(levelno),
+            "name": name,
+            "message": message
+        }
+
+    def query(self, since=None, level=None, name=None, limit=None):
+        """
+        Return formatted log entries matching the given filters
+
+        Args:
+            since: Only return entries with a sequence number greater than this
+            level: Minimum log level (int)
+            name: Logger name prefix, e.g. 'routes' matches 'routes.chat'
+            limit: Maximum number of entries to return (newest kept, 0 for none)
+
+        Returns:
+            Tuple of (entries, last_seq) where last_seq is the cursor to pass
+            as `since` on the next call
+
+        Raises:
+            ValueError: Negative limit
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"Invalid limit: {limit} (must be 0 or more)")
+        snapshot = list(self._records)
+        last_seq = snapshot[-1][0] if snapshot else (since or 0)
+
+        if since:
+            start = bisect.bisect_right(snapshot, since, key=lambda entry: entry[0])
+            snapshot = snapshot[start:]
+
+        if level is not None:
+            snapshot = [entry for entry in snapshot if entry[2] >= level]
+
+        if name:
+            prefix = name + "."
+            snapshot = [entry for entry in snapshot if entry[3] == name or entry[3].startswith(prefix)]
+
+        if limit is not None:
+            snapshot = snapshot[len(snapshot) - limit:] if limit else []
+
+        return [self._format(entry) for entry in snapshot], last_seq
+
+class MemoryLogHandler(logging.Handler):
+    """Log handler that appends records to a LogRingBuffer"""
+
+    def __init__(self, buffer, level=logging.NOTSET):
+        super().__init__(level)
+        self.buffer = buffer
+
+    def handle(self, record):
+        # Skip the handler lock: the ring buffer has its own
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            self.buffer.append(record)
+        except Exception:
+            self.handleError(record)
+
+def parse_cursor(value, worker):
+    """
+    Parse a `since` cursor for this worker
+
+    Sequence numbers are per process, so clients polling several workers
+    send one cursor per worker as 'pid:seq,pid:seq'; a worker missing from
+    the list reads from the start. A plain number is used as is.
+    """
+    if value is None or value == "":
+        return None
+    if ":" not in value:
+        return int(value)
+    for item in value.split(","):
+        pid, _, seq = item.partition(":")
+        if int(pid) == worker:
+            return int(seq)
+    return None
+
+def parse_level(value):
+    """Parse a log level given as a number or a name like 'WARNING'"""
+    if value is None or value == "":
+        return None
+    if str(value).isdigit():
+        return int(value)
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {value}")
+    return level
@@ -0,0 +1,238 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, request
+from utils.config import (
+    PROFILING_ENABLED, PROFILING_SAMPLE_RATE, PROFILING_SLOW_MS,
+    PROFILING_INTERVAL_MS, PROFILING_MAX_PROFILES
+)
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_KEY = "profiling:settings"
+INDEX_KEY = "profiling:index"
+SETTINGS_REFRESH = 2  # Seconds between checks for settings changed by another worker
+MAX_STACK_DEPTH = 128
+
+class Capture:
+    """Stack samples of one request"""
+
+    __slots__ = ("stacks", "samples")
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+
+class StackSampler:
+    """
+    Statistical profiler of the threads serving profiled requests
+
+    One daemon thread per process wakes every interval, reads the current
+    frame of each registered thread (sys._current_frames) and counts the
+    call stack. The profiled code runs unmodified: the cost is the sampler
+    wake-ups while at least one request is registered, and none otherwise.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}  # thread id -> Capture
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._labels = {}
+
+    def start(self, thread_id):
+        capture = Capture()
+        with self._lock:
+            self._active[thread_id] = capture
+            if self._thread is None or self._pid != os.getpid():
+                # The sampler does not survive a fork: start one per worker
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return capture
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, None)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            # Most specific import root first (site-packages before the stdlib)
+            for path in sorted((os.path.abspath(p) for p in sys.path if p), key=len, reverse=True):
+                if filename.startswith(path + os.sep):
+                    filename = filename[len(path) + 1:]
+                    break
+            # Flame graph tools split frames on ';' and the count on the last space
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.clear()
+                if not self._active:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                active = list(self._active.items())
+            for thread_id, capture in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    capture.stacks[self._stack(frame)] += 1
+                    capture.samples += 1
+            del frames
+
+class Profiler:
+    """
+    Request profiling: a sampled fraction of requests plus every slow one
+
+    With sample_rate r, each request is kept with probability r; with
+    slow_ms set, every request is sampled and kept only if it took longer.
+    Kept profiles go to a bounded store shared by the workers (the oldest
+    are dropped), readable as collapsed stacks for flame graph tools. When
+    disabled, a request costs one flag check.
+    """
+
+    def __init__(self):
+        self.sampler = StackSampler(PROFILING_INTERVAL_MS / 1000)
+        self.settings = {
+            "enabled": PROFILING_ENABLED,
+            "sample_rate": PROFILING_SAMPLE_RATE,
+            "slow_ms": PROFILING_SLOW_MS,
+        }
+        self._checked_at = 0
+
+    def current_settings(self):
+        """Settings, including changes made through the admin API by any worker"""
+        now = time.monotonic()
+        if now - self._checked_at >= SETTINGS_REFRESH:
+            self._checked_at = now
+            try:
+                self.settings = dict(self.settings, **(shared_store.get(SETTINGS_KEY) or {}))
+            except Exception as e:
+                logger.error(f"Error reading profiling settings: {e}")
+        return self.settings
+
+    def configure(self, enabled=None, sample_rate=None, slow_ms=None):
+        """
+        Change the settings of every worker
+
+        Raises:
+            ValueError: sample_rate outside [0, 1] or negative slow_ms
+        """
+        changes = {}
+        if enabled is not None:
+            changes["enabled"] = bool(enabled)
+        if sample_rate is not None:
+            if not 0 <= float(sample_rate) <= 1:
+                raise ValueError("sample_rate must be between 0 and 1")
+            changes["sample_rate"] = float(sample_rate)
+        if slow_ms is not None:
+            if float(slow_ms) < 0:
+                raise ValueError("slow_ms must be positive (0 disables slow request capture)")
+            changes["slow_ms"] = float(slow_ms)
+        shared_store.update(SETTINGS_KEY, lambda current: dict(current, **changes), default={})
+        self._checked_at = 0
+        return self.current_settings()
+
+    # --- Request hooks ---
+    def before_request(self):
+        settings = self.current_settings()
+        if not settings["enabled"]:
+            return
+        sampled = random.random() < settings["sample_rate"]
+        if not (sampled or settings["slow_ms"]):
+            return
+        g.profile = (self.sampler.start(threading.get_ident()), time.perf_counter(), sampled)
+
+    def teardown_request(self, exc):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        capture, started, sampled = profile
+        self.sampler.stop(threading.get_ident())
+        duration_ms = (time.perf_counter() - started) * 1000
+        slow_ms = self.settings["slow_ms"]
+        slow = bool(slow_ms) and duration_ms >= slow_ms
+        if (sampled or slow) and capture.samples:
+            try:
+                self.store(capture, duration_ms, "slow" if slow else "sampled", exc)
+            except Exception as e:
+                logger.error(f"Error storing profile: {e}")
+
+    # --- Profile store ---
+    def store(self, capture, duration_ms, reason, exc=None):
+        profile_id = uuid.uuid4().hex[:12]
+        summary = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("utf-8", "replace"),
+            "duration_ms": round(duration_ms, 1),
+            "reason": reason,
+            "error": repr(exc) if exc else None,
+            "samples": capture.samples,
+            "interval_ms": self.sampler.interval * 1000,
+            "captured_at": int(time.time()),
+            "worker": os.getpid(),
+        }
+        stacks = [[";".join(stack), count] for stack, count in capture.stacks.most_common()]
+        shared_store.set(f"profiling:profile:{profile_id}", dict(summary, stacks=stacks))
+
+        dropped = []
+
+        def apply(index):
+            index.append(summary)
+            while len(index) > PROFILING_MAX_PROFILES:
+                dropped.append(index.pop(0)["id"])
+            return index
+        shared_store.update(INDEX_KEY, apply, default=[])
+        for old_id in dropped:
+            shared_store.delete(f"profiling:profile:{old_id}")
+        logger.info(f"Captured {reason} profile {profile_id} of {request.method} {request.path} ({duration_ms:.0f} ms)")
+        return profile_id
+
+    def list(self):
+        """Summaries of the stored profiles, newest first"""
+        return list(reversed(shared_store.get(INDEX_KEY) or []))
+
+    def get(self, profile_id):
+        return shared_store.get(f"profiling:profile:{profile_id}")
+
+    def clear(self):
+        for summary in shared_store.get(INDEX_KEY) or []:
+            shared_store.delete(f"profiling:profile:{summary['id']}")
+        shared_store.delete(INDEX_KEY)
+
+def collapsed_stacks(profile):
+    """Profile as collapsed stacks ('frame;frame;frame count' lines, as read by flamegraph.pl and speedscope)"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"])
+
+# Process-wide profiler instance
+profiler = Profiler()
+
+def init_app(app):
+    """Install the request profiling hooks"""
+    app.before_request(profiler.before_request)
+    app.teardown_request(profiler.teardown_request)
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+from collections import deque
+from utils.config import PUSH_BUFFER_SIZE
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+# Host-wide event log written by the producer (leader) and relayed by every worker
+EVENTS_KEY = "push:events"
+SEQ_KEY = "push:seq"
+STATE_KEY = "push:state"
+
+def publish_events(events):
+    """
+    Append (topic, data) events to the host-wide event log
+
+    Returns:
+        Sequence number of the last event
+    """
+    if not events:
+        return None
+
+    def apply(log):
+        seq = log["seq"]
+        for topic, data in events:
+            seq += 1
+            log["events"].append([seq, topic, data])
+        log["events"] = log["events"][-PUSH_BUFFER_SIZE:]
+        log["seq"] = seq
+        return log
+
+    log = shared_store.update(EVENTS_KEY, apply, default={"seq": 0, "events": []})
+    # Small key polled by the relays, so they only read the log when it changed
+    shared_store.set(SEQ_KEY, log["seq"])
+    return log["seq"]
+
+def format_event(seq, topic, data):
+    """Server-sent event frame"""
+    return f"id: {seq}\nevent: {topic}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+class EventBroadcaster:
+    """
+    Fan-out of events to every stream connection of this process
+
+    Events are formatted once and kept in one bounded ring; each subscriber
+    reads it from its own cursor, so publishing costs the same whatever the
+    number of open connections.
+    """
+
+    def __init__(self, capacity=PUSH_BUFFER_SIZE):
+        self._events = deque(maxlen=capacity)  # (seq, topic, frame)
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self.last_seq = 0
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def try_subscribe(self, limit):
+        with self._cond:
+            if self._subscribers >= limit:
+                return False
+            self._subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def publish(self, seq, topic, data):
+        frame = format_event(seq, topic, data)
+        with self._cond:
+            if seq < self.last_seq:
+                # The event log was reset (server restart): start over
+                self._events.clear()
+            self._events.append((seq, topic, frame))
+            self.last_seq = seq
+            self._cond.notify_all()
+
+    def oldest_seq(self):
+        with self._cond:
+            return self._events[0][0] if self._events else None
+
+    def wait(self, after, timeout):
+        """
+        Events with a sequence number above `after`, waiting up to timeout
+        seconds for one to arrive
+
+        Returns:
+            List of (seq, topic, frame), oldest first
+        """
+        with self._cond:
+            if self.last_seq <= after:
+                self._cond.wait(timeout)
+            if after > self.last_seq:
+                after = 0  # cursor from before a reset
+            new = []
+            for event in reversed(self._events):
+                if event[0] <= after:
+                    break
+                new.append(event)
+            new.reverse()
+            return new
+
+    def relay(self):
+        """Publish events appended to the host-wide log since the last relay"""
+        if not self._subscribers:
+            return 0
+        seq = shared_store.get(SEQ_KEY, 0)
+        if seq == self.last_seq:
+            return 0
+        log = shared_store.get(EVENTS_KEY) or {"seq": 0, "events": []}
+        new = [event for event in log["events"] if event[0] > self.last_seq or seq < self.last_seq]
+        for event_seq, topic, data in new:
+            self.publish(event_seq, topic, data)
+        return len(new)
+
+# Process-wide broadcaster instance
+broadcaster = EventBroadcaster()
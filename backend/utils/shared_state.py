@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from utils.config import SHARED_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+class SharedStore:
+    """
+    Small key/value store shared by every worker process on this host
+
+    Backed by a SQLite database in WAL mode, so gunicorn workers (forked from a
+    preloaded master) see the same metrics, model selection and cached
+    responses. Values are stored as JSON. Connections are opened lazily per
+    process and per thread, which keeps the store fork-safe.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default if missing or expired"""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return default
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value, optionally expiring after ttl seconds"""
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at)
+        )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def update(self, key, fn, default=None):
+        """
+        Atomically read, modify and write a value across processes
+
+        Args:
+            key: Key to update
+            fn: Function receiving the current value (or default) and
+                returning the new one
+            default: Value passed to fn when the key does not exist
+
+        Returns:
+            The new value
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            current = json.loads(row[0]) if row else default
+            new_value = fn(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, NULL)",
+                (key, json.dumps(new_value))
+            )
+            conn.execute("COMMIT")
+            return new_value
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_set(self, key, producer, ttl):
+        """Return the cached value for key, computing and storing it on a miss"""
+        if not ttl or ttl <= 0:
+            return producer()
+        value = self.get(key)
+        if value is None:
+            value = producer()
+            if value is not None:
+                self.set(key, value, ttl=ttl)
+        return value
+
+    def purge_expired(self):
+        self._connection().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+
+    def reset(self):
+        """Remove every key (called once when the server starts)"""
+        self._connection().execute("DELETE FROM kv")
+        logger.info(f"Shared state reset at {self.path}")
+
+# Process-wide store instance
+shared_store = SharedStore(SHARED_STATE_PATH)
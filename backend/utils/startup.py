@@ -0,0 +1,86 @@
+import importlib
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Startup timing report, filled in as the app boots
+startup_report = {
+    "pid": os.getpid(),
+    "started_at": int(time.time()),
+    "imports": [],
+    "warmup": None,
+    "total_ms": 0
+}
+
+_boot_start = time.perf_counter()
+
+def timed_import(module_name):
+    """Import a module and record how long it took (only the first import is costly)"""
+    already_loaded = module_name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    startup_report["imports"].append({
+        "module": module_name,
+        "ms": round(elapsed_ms, 2),
+        "cached": already_loaded
+    })
+    return module
+
+def record_warmup(elapsed_ms, modules):
+    """Record the duration of the optional warm-up step"""
+    startup_report["warmup"] = {"ms": round(elapsed_ms, 2), "modules": modules}
+
+def finish_startup():
+    """Mark the end of app startup and log the import breakdown"""
+    startup_report["total_ms"] = round((time.perf_counter() - _boot_start) * 1000, 2)
+    breakdown = ", ".join(f"{entry['module']}={entry['ms']:.0f}ms" for entry in startup_report["imports"])
+    logger.info(f"Startup completed in {startup_report['total_ms']:.0f}ms ({breakdown})")
+    return startup_report
+
+def import_time_report(target="app", top=25):
+    """
+    Break down import cost per module using `python -X importtime`
+
+    Args:
+        target: Module to import in a fresh interpreter
+        top: Number of most expensive modules to return
+
+    Returns:
+        List of dicts with module name, self and cumulative time in ms,
+        sorted by cumulative time
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    line_re = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = line_re.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            "module": module,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(indent) - 1) // 2
+        })
+    entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return entries[:top]
+
+if __name__ == "__main__":
+    # Usage: python -m utils.startup [module] [top]
+    target_module = sys.argv[1] if len(sys.argv) > 1 else "app"
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for entry in import_time_report(target_module, top_n):
+        print(f"{entry['cumulative_ms']:>14.1f} {entry['self_ms']:>10.1f}  {'  ' * entry['depth']}{entry['module']}")
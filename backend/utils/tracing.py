@@ -0,0 +1,283 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from utils.config import (
+    TRACING_BUFFER_SIZE, TRACING_MAX_SPANS, TRACING_OTLP_ENDPOINT, TRACING_SERVICE_NAME
+)
+from utils.shared_state import shared_store
+
+logger = logging.getLogger(__name__)
+
+EXPORT_QUEUE_SIZE = 1000  # Traces waiting for the exporter (newer ones are dropped when full)
+EXPORT_BATCH = 50
+EXPORT_TIMEOUT = 5
+INDEX_KEY = "tracing:index"
+
+# Span the code currently runs in (None outside traced requests)
+_current_span = ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "_t0")
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+        self._t0 = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._t0
+
+    @property
+    def duration_ms(self):
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self, origin_ns):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start_ns - origin_ns) / 1e6, 3),
+            "duration_ms": None if self.end_ns is None else round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class Trace:
+    """Spans of one request, linked to a root span"""
+
+    def __init__(self, name, attributes=None):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self.dropped = 0
+        self.root = Span(self, name, attributes=attributes)
+
+    def add(self, span):
+        # list.append is atomic: spans can finish in other threads
+        if len(self.spans) < TRACING_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def to_dict(self):
+        origin = self.root.start_ns
+        spans = [self.root] + sorted(self.spans, key=lambda s: s.start_ns)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": origin / 1e9,
+            "start_ns": origin,
+            "duration_ms": None if self.root.end_ns is None else round(self.root.duration_ms, 3),
+            "error": self.root.error,
+            "worker": os.getpid(),
+            "spans": [span.to_dict(origin) for span in spans],
+            "dropped_spans": self.dropped,
+        }
+
+def current_span():
+    return _current_span.get()
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """
+    Time a block as a child of the current span
+
+    Outside a traced request this does nothing and yields None.
+
+    Args:
+        name: Span name
+        parent: Span to attach to when the context has none (code running
+            in threads that do not inherit the request context)
+        attributes: Initial span attributes (more can be added with .set())
+    """
+    parent_span = _current_span.get() or parent
+    if parent_span is None:
+        yield None
+        return
+    child = Span(parent_span.trace, name, parent_span.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+        parent_span.trace.add(child)
+
+@contextmanager
+def start_trace(name, **attributes):
+    """Trace a request: spans opened inside the block are linked to it, and the trace is stored when it ends"""
+    trace = Trace(name, attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.root.finish()
+        data = trace.to_dict()
+        try:
+            trace_store.append(data)
+        except Exception as e:
+            logger.error(f"Error storing trace {trace.trace_id}: {e}")
+        if TRACING_OTLP_ENDPOINT:
+            exporter.submit(data)
+
+class TraceStore:
+    """
+    Last finished traces, in the store shared by the workers
+
+    Each trace is kept under its own key, with a bounded index of summaries
+    (the oldest traces are dropped), so a trace listed by one worker can be
+    read through any other.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+
+    def append(self, data):
+        summary = {
+            "trace_id": data["trace_id"],
+            "name": data["name"],
+            "start": data["start"],
+            "duration_ms": data["duration_ms"],
+            "error": data["error"],
+            "spans": len(data["spans"]),
+            "attributes": data["spans"][0]["attributes"],
+            "worker": data["worker"],
+        }
+        shared_store.set(f"tracing:trace:{data['trace_id']}", data)
+
+        dropped = []
+
+        def apply(index):
+            index.append(summary)
+            while len(index) > self.capacity:
+                dropped.append(index.pop(0)["trace_id"])
+            return index
+        shared_store.update(INDEX_KEY, apply, default=[])
+        for old_id in dropped:
+            shared_store.delete(f"tracing:trace:{old_id}")
+
+    def query(self, name=None, min_ms=None, limit=None):
+        """Summaries of the stored traces (newest first) matching the filters"""
+        summaries = []
+        if limit == 0:
+            return summaries
+        for summary in reversed(shared_store.get(INDEX_KEY) or []):
+            if name and not summary["name"].startswith(name):
+                continue
+            if min_ms is not None and (summary["duration_ms"] or 0) < min_ms:
+                continue
+            summaries.append(summary)
+            if limit and len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, trace_id):
+        """Trace as stored by to_dict(), or None"""
+        return shared_store.get(f"tracing:trace:{trace_id}")
+
+# --- OpenTelemetry export ---
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_span(trace, span):
+    start_ns = trace["start_ns"] + int(span["start_ms"] * 1e6)
+    end_ns = start_ns + int((span["duration_ms"] or 0) * 1e6)
+    encoded = {
+        "traceId": trace["trace_id"],
+        "spanId": span["span_id"],
+        "name": span["name"],
+        # Upstream calls are client spans, everything else runs in-process
+        "kind": 3 if span["name"].startswith("http.") else 1,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items() if value is not None],
+        "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+    }
+    if span["parent_id"]:
+        encoded["parentSpanId"] = span["parent_id"]
+    return encoded
+
+def to_otlp(traces):
+    """Traces (as stored by to_dict()) as an OTLP/JSON ExportTraceServiceRequest (OpenTelemetry collectors, Jaeger, Tempo)"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(trace, span) for trace in traces for span in trace["spans"]],
+            }],
+        }]
+    }
+
+class OtlpExporter:
+    """Posts finished traces to an OTLP/HTTP endpoint from a background thread"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def submit(self, trace):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                # The exporter thread does not survive a fork: start one per worker
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        import requests
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                # Not through make_request, which is itself traced
+                requests.post(self.endpoint, json=to_otlp(batch), timeout=EXPORT_TIMEOUT).raise_for_status()
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"Exporting {len(batch)} traces to {self.endpoint} failed: {e}")
+
+# Process-wide store and exporter
+trace_store = TraceStore(TRACING_BUFFER_SIZE)
+exporter = OtlpExporter(TRACING_OTLP_ENDPOINT) if TRACING_OTLP_ENDPOINT else None
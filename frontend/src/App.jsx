@@ -13,6 +13,9 @@ import './App.css'
 
 // Use the backend URL defined in environment variable or default
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:3001';
+// Fallback when the live update stream is refused: poll, and try the stream again later
+const STREAM_POLL_INTERVAL = 30000;
+const STREAM_RETRY_DELAY = 60000;
 
 // MUI Imports
 import Container from '@mui/material/Container';
@@ -330,6 +333,76 @@ function App({ currentThemeMode, toggleThemeCallback }) {
     fetchInitialData();
   }, []); // Runs only once on mount
 
+  // Live market values and new articles pushed by the backend, instead of re-fetching.
+  // A refused stream (e.g. 503 when the worker has PUSH_MAX_CLIENTS streams) is closed
+  // by the browser for good: poll the routes meanwhile and open a new stream later.
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    let source = null;
+    let pollTimer = null;
+    let retryTimer = null;
+
+    const poll = async () => {
+        const [fearGreed, marketIndex, cryptoNews, worldNews] = await Promise.allSettled([
+            axios.get(`${BACKEND_URL}/api/market/fear-greed`),
+            axios.get(`${BACKEND_URL}/api/market/index`),
+            axios.get(`${BACKEND_URL}/api/news/crypto`),
+            axios.get(`${BACKEND_URL}/api/news/world`)
+        ]);
+        if (fearGreed.status === 'fulfilled') setFearGreedData(fearGreed.value.data);
+        if (marketIndex.status === 'fulfilled') setSp500Data(marketIndex.value.data);
+        if (cryptoNews.status === 'fulfilled' && cryptoNews.value.data.articles) setCryptoNewsData(cryptoNews.value.data.articles);
+        if (worldNews.status === 'fulfilled' && worldNews.value.data.articles) setWorldNewsData(worldNews.value.data.articles);
+    };
+    const stopPolling = () => {
+        if (pollTimer) clearInterval(pollTimer);
+        pollTimer = null;
+    };
+
+    const applyMarket = (market) => {
+        if (market.fear_greed) setFearGreedData(market.fear_greed);
+        if (market.market_index) setSp500Data(market.market_index);
+    };
+    const prependArticles = (setter, articles) => {
+        if (articles.length === 0) return;
+        setter(prev => {
+            const urls = new Set(articles.map(a => a.url));
+            return [...articles, ...(prev || []).filter(a => !urls.has(a.url))].slice(0, 15);
+        });
+    };
+
+    const connect = () => {
+        retryTimer = null;
+        source = new EventSource(`${BACKEND_URL}/api/stream?topics=market,news`);
+        source.onopen = stopPolling;
+        source.onerror = () => {
+            // The browser retries on its own unless the stream was refused
+            if (source.readyState !== EventSource.CLOSED) return;
+            console.warn("Live updates unavailable, polling instead");
+            if (!pollTimer) {
+                poll();
+                pollTimer = setInterval(poll, STREAM_POLL_INTERVAL);
+            }
+            if (!retryTimer) retryTimer = setTimeout(connect, STREAM_RETRY_DELAY);
+        };
+        source.addEventListener('snapshot', (event) => applyMarket(JSON.parse(event.data).market || {}));
+        source.addEventListener('market', (event) => applyMarket(JSON.parse(event.data)));
+        source.addEventListener('news', (event) => {
+            // Newest first, like the news endpoints
+            const articles = [...(JSON.parse(event.data).articles || [])].reverse();
+            prependArticles(setCryptoNewsData, articles.filter(a => a.origin === 'crypto'));
+            prependArticles(setWorldNewsData, articles.filter(a => a.origin === 'world'));
+        });
+    };
+    connect();
+
+    return () => {
+        if (source) source.close();
+        stopPolling();
+        if (retryTimer) clearTimeout(retryTimer);
+    };
+  }, []);
+
   // Fetch available models on mount
   useEffect(() => {
     const fetchModels = async () => {
@@ -42,6 +42,9 @@ function AdminPanel({
     const [isLoadingLogs, setIsLoadingLogs] = useState(false);
     const [error, setError] = useState('');
     const intervalRef = useRef(null); // Ref to hold interval ID
+    const logCursorsRef = useRef({}); // Sequence cursor of the last log entry received, per worker
+    const [traces, setTraces] = useState([]);
+    const [selectedTrace, setSelectedTrace] = useState(null);
 
     useEffect(() => {
         if (isVisible) {
@@ -64,27 +67,90 @@ function AdminPanel({
     };
 
     const fetchLogs = async () => {
-        setIsLoadingLogs(true);
+        if (Object.keys(logCursorsRef.current).length === 0) setIsLoadingLogs(true);
         try {
-            const response = await axios.get(`${BACKEND_URL}/api/logs`);
-            setLogs(response.data.logs || []);
+            // Only fetch entries newer than the last one we have from whichever worker answers
+            const since = Object.entries(logCursorsRef.current).map(([pid, seq]) => `${pid}:${seq}`).join(',');
+            const response = await axios.get(`${BACKEND_URL}/api/logs`, { params: { since } });
+            const { worker, next_since: nextSince } = response.data;
+            const newLogs = (response.data.logs || []).map(log => ({ ...log, worker }));
+            if (nextSince) logCursorsRef.current[worker] = nextSince;
+            if (newLogs.length > 0) {
+                setLogs(prev => [...prev, ...newLogs].sort((a, b) => a.timestamp - b.timestamp).slice(-100));
+            }
         } catch (err) {
             console.error("Error fetching logs:", err);
-            setError(prev => prev + (prev ? ' ' : '') + 'Failed to fetch logs.');
+            setError(prev => prev.includes('logs') ? prev : prev + (prev ? ' ' : '') + 'Failed to fetch logs.');
             setLogs([]);
+            logCursorsRef.current = {};
         } finally {
             setIsLoadingLogs(false);
         }
     };
 
+    const fetchTraces = async () => {
+        try {
+            const response = await axios.get(`${BACKEND_URL}/api/traces`, { params: { limit: 10 } });
+            setTraces(response.data.traces || []);
+        } catch (err) {
+            console.error("Error fetching traces:", err);
+            setError(prev => prev.includes('traces') ? prev : prev + (prev ? ' ' : '') + 'Failed to fetch traces.');
+        }
+    };
+
+    const openTrace = async (traceId) => {
+        if (selectedTrace && selectedTrace.trace_id === traceId) {
+            setSelectedTrace(null);
+            return;
+        }
+        try {
+            const response = await axios.get(`${BACKEND_URL}/api/traces/${traceId}`);
+            setSelectedTrace(response.data);
+        } catch (err) {
+            console.error("Error fetching trace:", err);
+            setSelectedTrace(null);
+        }
+    };
+
+    // Merge a pushed metrics delta (changed fields per entry) into the current metrics
+    const mergeMetrics = (prev, delta) => {
+        const next = { ...(prev || {}) };
+        Object.entries(delta).forEach(([key, value]) => {
+            next[key] = value && typeof value === 'object' && !Array.isArray(value)
+                ? { ...(next[key] || {}), ...value }
+                : value;
+        });
+        return next;
+    };
+
     useEffect(() => {
         if (isVisible) {
             fetchMetrics();
             fetchLogs();
+            fetchTraces();
 
-            intervalRef.current = setInterval(fetchMetrics, 10000);
+            // Metrics changes are pushed; fall back to polling if the stream is refused
+            let source = null;
+            if (typeof EventSource !== 'undefined') {
+                source = new EventSource(`${BACKEND_URL}/api/stream?topics=metrics`);
+                source.addEventListener('snapshot', (event) => {
+                    const data = JSON.parse(event.data);
+                    if (data.metrics) setMetrics(data.metrics);
+                });
+                source.addEventListener('metrics', (event) => {
+                    setMetrics(prev => mergeMetrics(prev, JSON.parse(event.data)));
+                });
+            }
+
+            // Logs and traces are not pushed, so they are still polled
+            intervalRef.current = setInterval(() => {
+                if (!source || source.readyState === EventSource.CLOSED) fetchMetrics();
+                fetchLogs();
+                fetchTraces();
+            }, 10000);
 
             return () => {
+                if (source) source.close();
                 if (intervalRef.current) {
                     clearInterval(intervalRef.current);
                 }
@@ -199,13 +265,60 @@ function AdminPanel({
             <Paper variant="outlined" sx={{ maxHeight: 300, overflow: 'auto', p: 1, mt: 1, bgcolor: 'rgba(0,0,0,0.05)' }}>
                 <pre style={{ margin: 0, fontSize: '0.8em', whiteSpace: 'pre-wrap', wordBreak: 'break-all' }}>
                     {logs.slice(-20).reverse().map((log, index) => (
-                        <span key={index}>{JSON.stringify(log)}\n</span>
+                        <span key={log.seq !== undefined ? `${log.worker}-${log.seq}` : index}>{JSON.stringify(log)}\n</span>
                     ))}
                 </pre>
             </Paper>
         );
     };
 
+    // Span waterfall: nesting depth from parent links, bar offset and width relative to the trace
+    const renderSpans = (trace) => {
+        const depths = {};
+        const total = trace.duration_ms || 1;
+        return trace.spans.map(span => {
+            const depth = span.parent_id ? (depths[span.parent_id] ?? 0) + 1 : 0;
+            depths[span.span_id] = depth;
+            const left = Math.min(100, (span.start_ms / total) * 100);
+            const width = Math.max(0.5, Math.min(100 - left, ((span.duration_ms || 0) / total) * 100));
+            return (
+                <Box key={span.span_id} sx={{ pl: depth * 1.5, mb: 0.5 }}>
+                    <Typography variant="caption" color={span.error ? 'error' : 'text.primary'}>
+                        {span.name} - {(span.duration_ms || 0).toFixed(1)} ms
+                        {span.attributes && span.attributes.url ? ` (${span.attributes.url})` : ''}
+                    </Typography>
+                    <Box sx={{ position: 'relative', height: 4, bgcolor: 'rgba(128,128,128,0.2)' }}>
+                        <Box sx={{ position: 'absolute', left: `${left}%`, width: `${width}%`, height: 4, bgcolor: span.error ? '#ff8080' : '#8884d8' }} />
+                    </Box>
+                </Box>
+            );
+        });
+    };
+
+    const renderTraces = () => {
+        if (!traces || traces.length === 0) return <Typography variant="body2" color="text.secondary">No traces recorded.</Typography>;
+
+        return (
+            <List dense disablePadding>
+                {traces.map(trace => (
+                    <React.Fragment key={trace.trace_id}>
+                        <ListItem button onClick={() => openTrace(trace.trace_id)} sx={{ px: 1 }}>
+                            <ListItemText
+                                primary={`${trace.name} - ${trace.duration_ms.toFixed(0)} ms${trace.error ? ' (error)' : ''}`}
+                                secondary={`${new Date(trace.start * 1000).toLocaleTimeString()} - ${trace.spans} spans${trace.attributes && trace.attributes.model ? ` - ${trace.attributes.model}` : ''}`}
+                            />
+                        </ListItem>
+                        {selectedTrace && selectedTrace.trace_id === trace.trace_id && (
+                            <Paper variant="outlined" sx={{ p: 1, mb: 1 }}>
+                                {renderSpans(selectedTrace)}
+                            </Paper>
+                        )}
+                    </React.Fragment>
+                ))}
+            </List>
+        );
+    };
+
     return (
         <Drawer
             anchor="right"
@@ -226,7 +339,7 @@ function AdminPanel({
                  {error && <Alert severity="error" sx={{ mb: 2 }}>{error}</Alert>}
 
                  <Button
-                     onClick={() => {fetchMetrics(); fetchLogs();}}
+                     onClick={() => {fetchMetrics(); fetchLogs(); fetchTraces();}}
                      disabled={isLoadingMetrics || isLoadingLogs}
                      startIcon={isLoadingMetrics || isLoadingLogs ? <CircularProgress size={16} /> : <RefreshIcon />}
                      variant="outlined"
@@ -251,6 +364,11 @@ function AdminPanel({
                  <Typography variant="subtitle1" gutterBottom>Recent Logs</Typography>
                  {renderLogs()}
 
+                 <Divider sx={{ my: 2 }}/>
+
+                 <Typography variant="subtitle1" gutterBottom>Recent Chat Traces</Typography>
+                 {renderTraces()}
+
             </Box>
         </Drawer>
     );